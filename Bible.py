@@ -5,49 +5,95 @@
 
 import tkinter as tk
 from tkinter import ttk
-import pandas as pd
-import edge_tts
 import os
-import csv
 import asyncio
-import pyaudio
-import wave
+import time
 import threading
-from pydub import AudioSegment
-import configparser
 from tkinter import messagebox
 import pyperclip
-from tkinter import filedialog
-from datetime import datetime
+from tkinter import filedialog, simpledialog
+from datetime import datetime, date
 from tkinter import Toplevel, Label, Button, StringVar, IntVar
 from tkinter.ttk import Progressbar
-import time
+import logging
+import argparse
+import functools
+import contextlib
+import instrumentation
+from notes_index import NotesIndex
+from profiles import Profiles, valid_profile_name
+from translations import TranslationManager, DEFAULT_MEMORY_BUDGET_MB
+from audio import (EdgeTTS, Player, SPEEDS, DEFAULT_CHUNK_FRAMES, DEFAULT_BUFFER_CHUNKS,
+                   DEFAULT_SILENCE_PAD_MS, DEFAULT_TARGET_DBFS)
+from mp3_export import render_verses, write_json_sidecar, write_lrc_sidecar
+from reading_session import ReadingSession, SYNTHESIZING, PLAYING
+from duration_model import DurationEstimator, coefficient_weight, format_duration
+from audio_bundle import open_bundle, BUNDLE_DIR
+import reading_plans
+from ui_dispatch import UIDispatcher
+from file_watcher import FileWatcher
+
+log = logging.getLogger(__name__)
+
+
+def single_redraw(method):
+    """Run a method as one navigation transaction, so the chapter is redrawn at most once."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.navigation():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class BibleApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
         self.title("Bible Reader")
         self.geometry("1000x700")
+        self.ui = UIDispatcher(self)  # Worker threads update widgets through this
+        self._navigation_depth = 0  # Nesting of navigation() blocks
+        self._redraw_pending = False
 
         # Constants
         self.default_voice = "en-US-SteffanNeural"
         self.default_skip_read_verses = False
         self.default_text_size = 12
         self.default_translation = "net.csv"
+        self.default_speed = 1.0
 
         # Initialize settings
-        self.config_file = "config.ini"
+        self.tts = EdgeTTS()
+        self.voice_options = asyncio.run(self.tts.list_voices())
+        self.profiles = Profiles(on_error=self.on_storage_error)
+        self.profile = profile or self.profiles.last_used()
+        if not self.profiles.exists(self.profile):
+            self.profiles.create(self.profile)
+        self.profiles.remember(self.profile)
+        self.storage = self.profiles.open(self.profile)  # Settings, read verses, notes and compiled plans of the profile
+        self.shared_storage = self.profiles.shared  # Voice duration models, shared by all profiles
+        self.durations = DurationEstimator(self.shared_storage)  # Calibrated by every verse that is synthesized
+        self.config_file = "config.ini"  # Only read once, to migrate older installs
         self.load_settings()
 
-        # Initialize storage files
-        self.read_verses_file = "read_verses.csv"
-        self.notes_file = "notes.csv"
-        self.load_storage_files()
-
         # Initialize the current translation
-        self.current_translation = "net.csv"
+        self.translations = TranslationManager(".", self.translation_memory_mb)
+        self.translation_files = {name.split('.')[0].upper(): name for name in self.translations.discover()}
         self.load_bible_data()
 
+        # Initialize the reading engine, read verses and notes
+        self.session = ReadingSession(self.corpus, self.voice, translation=self.translation_key(),
+                                      storage=self.storage, tts=self.tts, estimator=self.durations,
+                                      player=Player(chunk_frames=self.playback_chunk_frames,
+                                                    buffer_chunks=self.playback_buffer_chunks))
+        self.session.speed = self.speed
+        self.session.silence_pad_ms = self.silence_pad_ms
+        self.session.target_dbfs = self.target_dbfs
+        self.load_plan()
+        self.load_bundle()
+        self.notes_file = "notes.csv"  # Only read once, to migrate older installs
+        self.load_storage_files()
+        self.notes_index = NotesIndex.from_notes(self.notes)  # Kept up to date by save_notes
+
         # Create a list of full book names for the dropdown
         self.full_book_names = self.books_data["Full Book Name"].tolist()
 
@@ -122,7 +168,7 @@ class BibleApp(tk.Tk):
         self.translation_var = tk.StringVar(value=self.current_translation.split('.')[0].upper())
         self.translation_dropdown = ttk.Combobox(control_frame, textvariable=self.translation_var, 
                                             state="readonly", width=5, height=30)
-        self.translation_dropdown['values'] = ['NET', 'KJV', 'WEB']
+        self.translation_dropdown['values'] = list(self.translation_files)
         self.translation_dropdown.grid(row=0, column=1, padx=5)
         self.translation_dropdown.bind('<<ComboboxSelected>>', self.update_translation)
         self.translation_dropdown.bind('<FocusIn>', lambda e: self.save_notes())
@@ -141,12 +187,48 @@ class BibleApp(tk.Tk):
         ttk.Button(size_frame, text="-", command=lambda: self.change_text_size(-1), style='Square.TButton', width=2).grid(row=0, column=1, padx=2)
         ttk.Button(size_frame, text="+", command=lambda: self.change_text_size(1), style='Square.TButton', width=2).grid(row=0, column=2, padx=2)
 
+        # Playback speed selection
+        speed_frame = tk.Frame(control_frame)
+        speed_frame.grid(row=0, column=3, padx=5)
+
+        ttk.Label(speed_frame, text="Speed:").grid(row=0, column=0, padx=2)
+        self.speed_var = tk.StringVar(value=f"{self.speed:g}x")
+        self.speed_dropdown = ttk.Combobox(speed_frame, textvariable=self.speed_var, state="readonly", width=5)
+        self.speed_dropdown['values'] = [f"{speed:g}x" for speed in SPEEDS]
+        self.speed_dropdown.grid(row=0, column=1, padx=2)
+        self.speed_dropdown.bind('<<ComboboxSelected>>', self.update_speed)
+
         # Add Skip read verses checkbox
         self.skip_read_verses = tk.BooleanVar(value=self.skip_read_verses)
         self.skip_checkbox = ttk.Checkbutton(control_frame, text="Skip read verses",
                                             variable=self.skip_read_verses)
         self.skip_checkbox.grid(row=0, column=4, padx=5)  # Changed from column=2 to column=3
 
+        # Reading plan selection
+        plan_frame = tk.Frame(control_frame)
+        plan_frame.grid(row=1, column=0, columnspan=6, pady=2)
+
+        ttk.Label(plan_frame, text="Plan:").grid(row=0, column=0, padx=2)
+        self.plan_var = tk.StringVar(value=self.plan_name or "None")
+        self.plan_dropdown = ttk.Combobox(plan_frame, textvariable=self.plan_var, state="readonly", width=30)
+        self.plan_dropdown['values'] = ["None"] + list(reading_plans.PLANS)
+        self.plan_dropdown.grid(row=0, column=1, padx=2)
+        self.plan_dropdown.bind('<<ComboboxSelected>>', self.update_plan)
+        self.plan_label = ttk.Label(plan_frame, text="")
+        self.plan_label.grid(row=0, column=2, padx=5)
+
+        # Profile selection
+        ttk.Label(plan_frame, text="Profile:").grid(row=0, column=3, padx=2)
+        self.profile_var = tk.StringVar(value=self.profile)
+        self.profile_dropdown = ttk.Combobox(plan_frame, textvariable=self.profile_var, state="readonly", width=15)
+        self.profile_dropdown['values'] = self.profiles.names()
+        self.profile_dropdown.grid(row=0, column=4, padx=2)
+        self.profile_dropdown.bind('<<ComboboxSelected>>', lambda e: self.switch_profile(self.profile_var.get()))
+        self.profile_dropdown.bind('<FocusIn>', lambda e: self.save_notes())
+        ttk.Button(plan_frame, text="New Profile", command=self.create_profile, width=11).grid(row=0, column=5, padx=2)
+        ttk.Button(plan_frame, text="Audio Settings", command=self.create_audio_settings_dialog,
+                   width=14).grid(row=0, column=6, padx=2)
+
         # Reset buttons
         reset_frame = tk.Frame(control_frame)
         reset_frame.grid(row=0, column=5, padx=5)  # Changed from column=3 to column=4
@@ -199,287 +281,484 @@ class BibleApp(tk.Tk):
         self.copy_notes_button = ttk.Button(notes_frame, text="Copy\nNotes", command=self.copy_notes, width=8)
         self.copy_notes_button.grid(row=0, column=3, padx=5, sticky="w")  # Justify right
 
+        # Search Notes Button
+        self.search_notes_button = ttk.Button(notes_frame, text="Search\nNotes", command=self.create_search_notes_dialog, width=8)
+        self.search_notes_button.grid(row=0, column=4, padx=5, sticky="w")
+
         # Configure grid weights for better resizing
         self.grid_rowconfigure(2, weight=1)  # Verse Display
         self.grid_columnconfigure(1, weight=1)  # Center column
 
-        # Initialize reading state variables
-        self.reading = False
-        self.current_verse = None
-        self.audio_stream = None
-        self.audio_wave = None
-        self.audio_paused = False
-        self.audio_data = None
-        self.audio_index = 0
+        # Follow the reading engine
+        self.connect_session()
+        self.ui.start()
 
         # Load last read verse or default to Genesis 1:1
         self.load_last_read_verse()
 
+        # Pick up translation fixes and changes made by other instances or sync tools while running
+        self.watcher = FileWatcher(".", ["*.csv"], self.on_files_changed)
+        self.watcher.start()
+        self.storage_watcher = None
+        self.watch_storage()
+
         # Bind the window close event to save notes
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    @instrumentation.timed("load_settings")
     def load_settings(self):
-        """Load or create the config file."""
-        self.config = configparser.ConfigParser()
-        self.voice_options = asyncio.run(self.get_voice_options())
-
-        if not os.path.exists(self.config_file):
-            self.config['Settings'] = {
-                'Voice': self.default_voice,
-                'SkipReadVerses': str(self.default_skip_read_verses),
-                'TextSize': str(self.default_text_size),
-                'Translation': self.default_translation,
-            }
-            with open(self.config_file, 'w') as configfile:
-                self.config.write(configfile)
+        """Load settings from storage, filling in defaults for any that are missing."""
+        defaults = {
+            'Voice': self.default_voice,
+            'SkipReadVerses': str(self.default_skip_read_verses),
+            'TextSize': str(self.default_text_size),
+            'Speed': str(self.default_speed),
+            'Translation': self.default_translation,
+            'TranslationMemoryMB': str(DEFAULT_MEMORY_BUDGET_MB),
+            'PlaybackChunkFrames': str(DEFAULT_CHUNK_FRAMES),
+            'PlaybackBufferChunks': str(DEFAULT_BUFFER_CHUNKS),
+            'SilencePadMs': str(DEFAULT_SILENCE_PAD_MS),
+            'TargetLoudnessDBFS': str(DEFAULT_TARGET_DBFS),
+            'Plan': '',
+            'PlanStartDate': '',
+            'PlanWeights': '',
+        }
+        self.storage.migrate_settings(self.config_file, defaults.keys())
+        self.settings = self.storage.get_settings()
+        missing = {key: value for key, value in defaults.items() if key not in self.settings}
+        if missing:
+            self.settings.update(missing)
+            self.storage.set_settings(missing)
+
+        self.voice = self.settings['Voice']
+        self.skip_read_verses = self.settings['SkipReadVerses'].strip().lower() in ('true', '1', 'yes', 'on')
+        self.text_size = int(self.settings['TextSize'])
+        self.speed = min(max(float(self.settings['Speed']), SPEEDS[0]), SPEEDS[-1])
+        self.current_translation = self.settings['Translation']
+        self.translation_memory_mb = int(self.settings['TranslationMemoryMB'])
+        self.playback_chunk_frames = int(self.settings['PlaybackChunkFrames'])
+        self.playback_buffer_chunks = int(self.settings['PlaybackBufferChunks'])
+        self.silence_pad_ms = self.optional_number(self.settings['SilencePadMs'])
+        self.target_dbfs = self.optional_number(self.settings['TargetLoudnessDBFS'])
+        self.plan_name = self.settings['Plan'] if self.settings['Plan'] in reading_plans.PLANS else ''
+
+    @staticmethod
+    def optional_number(value):
+        """Parse a numeric setting that can be turned off with "off"."""
+        if value.strip().lower() in ('off', 'none', ''):
+            return None
+        return float(value)
+
+    def save_setting(self, key, value):
+        """Update a single setting in memory and queue it for storage."""
+        self.settings[key] = str(value)
+        self.storage.set_setting(key, value)
+
+    @instrumentation.timed("load_storage_files")
+    def load_storage_files(self):
+        """Load read verses and chapter notes, migrating the older CSV files on first run."""
+        self.storage.migrate_reading_state(self.notes_file, self.translation_key(), self.find_verse_id)
+        self.session.load_read_verses()
+        self.notes = self.storage.load_notes()
+
+    def translation_key(self):
+        """Return the name read verses are stored under for the current translation."""
+        return self.current_translation.split('.')[0]
+
+    def load_plan(self):
+        """Load the selected reading plan for the current translation and let the reading engine follow it."""
+        if self.plan_name:
+            # Days are balanced by the listening time predicted when the plan started, so they stay put when
+            # the voice changes or its duration model is calibrated further
+            weights = self.plan_weights()
+            self.session.plan = reading_plans.load_plan(self.storage, self.plan_name, self.translation_key(),
+                                                        self.corpus, weight_name=f"duration:{weights}",
+                                                        weight=coefficient_weight(weights, self.corpus))
         else:
-            self.config.read(self.config_file)
+            self.session.plan = None
 
-            # Ensure the 'Settings' section exists
-            if 'Settings' not in self.config:
-                self.config['Settings'] = {}
+    def plan_weights(self):
+        """The duration model coefficients the plan was balanced with, frozen on first use."""
+        try:
+            return tuple(float(value) for value in self.settings['PlanWeights'].split(','))
+        except ValueError:
+            weights = self.durations.coefficients(self.voice)
+            self.save_setting('PlanWeights', ','.join(map(repr, weights)))
+            return weights
+
+    def load_bundle(self):
+        """Read verses from the audio bundle of the current translation and voice, if one has been built."""
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), BUNDLE_DIR)
+        old_bundle = self.session.bundle
+        self.session.bundle = open_bundle(directory, self.translation_key(), self.voice)
+        if old_bundle is not None:
+            old_bundle.close()  # Waits for a get() on the reading thread; clips it returned stay readable
+
+    def plan_day(self):
+        """Today's day (1-based) of the reading plan, counted from the day it was chosen."""
+        try:
+            start = date.fromisoformat(self.settings['PlanStartDate'])
+        except ValueError:
+            return 1
+        return max((date.today() - start).days + 1, 1)
+
+    def update_plan_label(self, verse_id=None):
+        """Show the predicted listening time left today (or in the chapter without a plan), today's day of
+        the plan and, if different, the day the selected verse belongs to."""
+        plan = self.session.plan
+        if plan is None:
+            if verse_id is None:
+                self.plan_label.config(text="")
+                return
+            book_number, chapter, _ = self.corpus.verse_locations[verse_id]
+            chapter_verse_ids = self.corpus.chapters[(book_number, chapter)]
+            remaining = chapter_verse_ids[chapter_verse_ids.index(verse_id):]
+            seconds = self.durations.total(self.voice, self.corpus, remaining, self.speed)
+            self.plan_label.config(text=f"About {format_duration(seconds)} left in this chapter")
+            return
+        today = min(self.plan_day(), plan.days)
+        unread = self.session.unread_of(plan.day_verse_ids(today))
+        seconds = self.durations.total(self.voice, self.corpus, unread, self.speed)
+        text = f"Day {today} of {plan.days}, about {format_duration(seconds)} left today"
+        verse_day = plan.day_of(verse_id) if verse_id is not None else None
+        if verse_day is not None and verse_day != today:
+            text += f" (this verse: day {verse_day})"
+        self.plan_label.config(text=text)
+
+    def update_plan(self, event):
+        """Start the selected reading plan today and jump to its first unread verse."""
+        name = self.plan_var.get()
+        self.plan_name = name if name in reading_plans.PLANS else ''
+        self.save_setting('Plan', self.plan_name)
+        self.save_setting('PlanStartDate', date.today().isoformat() if self.plan_name else '')
+        self.save_setting('PlanWeights', '')  # Frozen again by load_plan()
+        self.session.stop()
+        self.load_plan()
+        if self.session.plan is not None:
+            verse_id = self.session.next_unread_verse_id()
+            if verse_id is not None:
+                self.show_position(*self.corpus.verse_locations[verse_id])
+                return
+        self.update_plan_label()
+
+    def find_verse_id(self, book_number, chapter, verse):
+        """Return the Verse ID for a book number, chapter and verse, or None if it doesn't exist."""
+        return self.corpus.location_to_verse_id.get((book_number, chapter, verse))
+
+    def connect_session(self):
+        """Subscribe to the reading engine's events."""
+        self.session.on("state", self.on_session_state)
+        self.session.on("position", self.on_session_position)
+
+    def on_session_state(self, state):
+        """Update the controls when the reading state changes (called from any thread)."""
+        self.ui.call(self.update_reading_controls, state, key="reading_controls")
+
+    def update_reading_controls(self, state):
+        """Disable navigation while a verse is being synthesized or played."""
+        busy = state in (SYNTHESIZING, PLAYING)
+        self.read_button.config(state="disabled" if busy else "normal")
+        self.next_unread_button.config(state="disabled" if busy else "normal")
+        self.book_dropdown.config(state="disabled" if busy else "readonly")
+        self.chapter_dropdown.config(state="disabled" if busy else "readonly")
+        self.verse_dropdown.config(state="disabled" if busy else "readonly")
+
+    def on_session_position(self, book_number, chapter, verse, verse_id):
+        """Show the verse the reading engine moved to (called from any thread)."""
+        self.ui.call(self.show_position, book_number, chapter, verse, key="position")
+
+    @single_redraw
+    def show_position(self, book_number, chapter, verse):
+        """Select and display a verse."""
+        self.save_notes()  # Save notes for the chapter being left
+        book_name = self.corpus.full_book_name(book_number)
+        if book_name != self.book_var.get():
+            self.book_var.set(book_name)
+            self.update_chapters()
+        if str(chapter) != self.chapter_var.get():
+            self.chapter_var.set(str(chapter))
+            self.update_verses()
+        self.verse_var.set(str(verse))
+        self.navigate()
 
-            # Check if the 'Translation' key exists in the 'Settings' section
-            if 'Translation' not in self.config['Settings']:
-                # If not, add it with the default value
-                self.config['Settings']['Translation'] = self.default_translation
-                with open(self.config_file, 'w') as configfile:
-                    self.config.write(configfile)
+    @contextlib.contextmanager
+    def navigation(self):
+        """Batch book, chapter and verse changes: navigate() calls inside the block only mark the chapter
+        for redrawing, and it is redrawn once when the outermost block ends."""
+        self._navigation_depth += 1
+        try:
+            yield
+        finally:
+            self._navigation_depth -= 1
+            if self._navigation_depth == 0 and self._redraw_pending:
+                self._redraw_pending = False
+                self.render_chapter()
+
+    @single_redraw
+    def select(self, book_name, chapter=None, verse=None):
+        """Select a verse, or the first chapter or verse when they are left out, and redraw once."""
+        self.book_var.set(book_name)
+        self.update_chapters()
+        if chapter is not None:
+            self.chapter_var.set(str(chapter))
+            self.update_verses()
+        if verse is not None:
+            self.verse_var.set(str(verse))
+        self.navigate()
 
-        self.voice = self.config['Settings']['Voice']
-        self.skip_read_verses = self.config['Settings'].getboolean('SkipReadVerses')
-        self.text_size = self.config['Settings'].getint('TextSize')
-        self.current_translation = self.config['Settings']['Translation']
+    def request_navigate(self):
+        """Redraw the chapter once the pending UI callbacks have run (safe from any thread)."""
+        self.ui.call(self.navigate, key="navigate")
 
-    async def get_voice_options(self):
-        """Get available voices."""
-        voices = await edge_tts.list_voices()
-        return [v["ShortName"] for v in voices]
+    def sync_session(self):
+        """Pass the selected verse and reading options to the reading engine."""
+        book_abbrev = self.book_full_to_abbrev[self.book_var.get()]
+        self.session.set_position(self.book_to_number[book_abbrev], self.chapter_var.get(), self.verse_var.get())
+        self.session.skip_read_verses = self.skip_read_verses.get()
+
+    def watch_storage(self):
+        """Watch the current profile's database for changes made by other instances or sync tools."""
+        if self.storage_watcher is not None:
+            self.storage_watcher.stop()
+        database = os.path.basename(self.storage.path)
+        self.storage_watcher = FileWatcher(os.path.dirname(self.storage.path) or ".", [database, database + "-wal"],
+                                           functools.partial(self.on_storage_changed, self.storage))
+        self.storage_watcher.start()
+
+    def on_files_changed(self, paths):
+        """Reload translations that changed on disk (called on the watcher thread, so parsing doesn't block the UI)."""
+        for name in sorted(os.path.basename(path) for path in paths):
+            if name == self.current_translation:
+                if self.translations.is_translation_file(name):
+                    corpus, changed = self.translations.reload(name)
+                    self.ui.call(self.apply_translation_reload, corpus, changed)
+            else:
+                self.translations.forget(name)
+                self.ui.call(self.refresh_translation_list, key="translation_list")
 
-    def load_storage_files(self):
-        """Initialize storage files if they don't exist."""
-        # Update read_verses_file path based on current translation
-        self.read_verses_file = f"read_verses_{self.current_translation.split('.')[0]}.csv"
+    def on_storage_changed(self, storage, paths):
+        """Pick up changes after a profile's database changed on disk (called on the storage watcher's thread)."""
+        self.ui.call(self.apply_external_changes, storage, key="external_changes")
 
-        if not os.path.exists(self.read_verses_file):
-            with open(self.read_verses_file, "w", newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Verse ID"])
+    def on_storage_error(self, sql, error):
+        """Report a change that couldn't be saved (called on the storage writer's thread)."""
+        self.ui.call(self.show_storage_error, error, key="storage_error")
 
-        # Clean up and convert the verses file if needed
-        try:
-            # First, migrate any data from old read_verses.csv if it exists
-            old_verses_file = "read_verses.csv"
-            if os.path.exists(old_verses_file):
-                try:
-                    old_df = pd.read_csv(old_verses_file)
-                    # Migrate data to new translation-specific file
-                    if not old_df.empty:
-                        old_df.to_csv(self.read_verses_file, index=False)
-                    # Delete the old file after migration
-                    os.remove(old_verses_file)
-                    print(f"Migrated data from {old_verses_file} to {self.read_verses_file}")
-                except Exception as e:
-                    print(f"Error migrating old verses file: {e}")
-
-            df = pd.read_csv(self.read_verses_file)
-            cleaned_verses = []
-
-            for verse_id in df["Verse ID"]:
-                try:
-                    # If it's already a number, add it directly
-                    if isinstance(verse_id, (int, float)):
-                        cleaned_verses.append(int(verse_id))
-                    else:
-                        # If it's in the format "book:chapter:verse", convert it
-                        parts = str(verse_id).split(":")
-                        if len(parts) == 3:
-                            book_num, chapter, verse = map(int, parts)
-                            # Find the corresponding Verse ID in bible_data
-                            verse_data = self.bible_data[
-                                (self.bible_data["Book Number"] == book_num) &
-                                (self.bible_data["Chapter"] == chapter) &
-                                (self.bible_data["Verse"] == verse)
-                            ]
-                            if not verse_data.empty:
-                                cleaned_verses.append(int(verse_data["Verse ID"].values[0]))
-                except:
-                    continue  # Skip any problematic entries
-
-            # Remove duplicates and sort
-            cleaned_verses = sorted(list(set(cleaned_verses)))
-
-            # Save the cleaned version back to the file
-            with open(self.read_verses_file, "w", newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Verse ID"])
-                for verse_id in cleaned_verses:
-                    writer.writerow([verse_id])
-
-            self.read_verses = cleaned_verses
-            print(f"Loaded {len(self.read_verses)} read verses")
+    def show_storage_error(self, error):
+        messagebox.showerror("Error", f"A change could not be saved to the database: {error}\n"
+                                      "It is lost when the application closes.")
 
-        except Exception as e:
-            print(f"Error loading read verses: {e}")
-            self.read_verses = []
+    def apply_translation_reload(self, corpus, changed):
+        """Switch to a reloaded copy of the current translation, redrawing only if the shown chapter changed."""
+        if corpus.name != self.current_translation:
+            return
+        verse_ids_changed = corpus.verse_ids != self.corpus.verse_ids
+        self.load_bible_data()
+        self.session.update_corpus(self.corpus)
+        self.full_book_names = self.books_data["Full Book Name"].tolist()
+        self.book_dropdown['values'] = self.full_book_names
 
-        # Ensure notes.csv exists
-        if not os.path.exists(self.notes_file):
-            with open(self.notes_file, "w", newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Book Number", "Chapter", "Notes"])
+        # Forget the audio of the verses whose text changed
+        changed_verse_ids = {verse_id for key in changed for verse_id in corpus.chapters.get(key, [])}
+        translation = self.translation_key()
+        self.session.cache.discard(lambda key: key[0] == translation and key[1] in changed_verse_ids)
+        if verse_ids_changed:
+            self.load_plan()
 
-        # Load notes
-        try:
-            self.notes = pd.read_csv(self.notes_file)
-        except Exception as e:
-            print(f"Error loading notes: {e}")
-            self.notes = pd.DataFrame(columns=["Book Number", "Chapter", "Notes"])
+        book_abbrev = self.book_full_to_abbrev.get(self.book_var.get())
+        if book_abbrev is not None and (self.book_to_number[book_abbrev], int(self.chapter_var.get())) in changed:
+            self.navigate()
+
+    def refresh_translation_list(self):
+        """Show translation files that were added or removed while running."""
+        self.translation_files = {name.split('.')[0].upper(): name for name in self.translations.discover()}
+        self.translation_dropdown['values'] = list(self.translation_files)
+
+    def apply_external_changes(self, storage):
+        """Apply the read verses and notes that another instance or a sync tool changed in the database."""
+        if storage is not self.storage:
+            return  # The profile was switched meanwhile; switching loaded its current state
+        if not storage.idle():
+            # Wait until our own queued writes are committed, so they aren't taken for external changes
+            self.after(100, self.on_storage_changed, storage, ())
+            return
+        read_changes, notes = storage.external_changes()
+        read, unread = read_changes.get(self.translation_key(), ((), ()))
+        changed = self.session.apply_read_changes(read, unread)
+
+        book_abbrev = self.book_full_to_abbrev.get(self.book_var.get())
+        current = (self.book_to_number[book_abbrev], int(self.chapter_var.get())) if book_abbrev else None
+        unsaved_edits = self.notes_text.get("1.0", tk.END).strip() != self.notes.get(current, "")
+        for key, text in notes.items():
+            if self.notes.get(key) == text or (key == current and unsaved_edits):
+                continue
+            if text is None:
+                del self.notes[key]
+                self.notes_index.remove(*key)
+            else:
+                self.notes[key] = text
+                self.notes_index.update(*key, text)
+            if key == current:
+                self.load_notes()
+
+        if changed:
+            log.info("Applied %d verses marked as read or unread elsewhere", len(changed))
+            if set(self.corpus.chapters.get(current, [])).intersection(changed):
+                self.navigate()
 
     def on_closing(self):
         """Save notes and close the window."""
         self.save_notes()
+        self.session.stop()
+        self.watcher.stop()
+        self.storage_watcher.stop()
+        self.ui.stop()
+        self.durations.save()
+        self.profiles.close()  # Flush any queued writes of every profile that was opened
         self.destroy()
 
+    def switch_profile(self, name):
+        """Switch to another reading profile, keeping the loaded translations and audio."""
+        if name == self.profile:
+            return
+        try:
+            storage = self.profiles.open(name)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open profile {name}: {e}")
+            self.profile_var.set(self.profile)
+            return
+        self.save_notes()  # Into the profile being left
+        self.session.stop()
+        self.profile = name
+        self.profiles.remember(name)
+        self.storage = storage
+        self.session.storage = storage
+
+        # load_settings() replaces the variables of these controls with plain values
+        text_size, skip_read_verses = self.text_size, self.skip_read_verses
+        translation = self.current_translation
+        self.load_settings()
+        text_size.set(self.text_size)
+        skip_read_verses.set(self.skip_read_verses)
+        self.text_size, self.skip_read_verses = text_size, skip_read_verses
+        self.verse_display.configure(font=("TkDefaultFont", self.text_size.get()))
+        self.voice_var.set(self.voice)
+        self.speed_var.set(f"{self.speed:g}x")
+        self.plan_var.set(self.plan_name or "None")
+        self.session.voice = self.voice
+        self.session.speed = self.speed
+        self.apply_playback_settings()
+        self.session.silence_pad_ms = self.silence_pad_ms
+        self.session.target_dbfs = self.target_dbfs
+
+        # Translations already loaded by another profile are reused
+        if self.current_translation != translation:
+            self.load_bible_data()
+            self.translation_var.set(self.translation_key().upper())
+            self.full_book_names = self.books_data["Full Book Name"].tolist()
+            self.book_dropdown['values'] = self.full_book_names
+            self.session.set_corpus(self.corpus, self.translation_key())
+        else:
+            self.session.load_read_verses()
+        self.load_plan()
+        self.load_bundle()
+        self.notes = storage.load_notes()
+        self.notes_index = NotesIndex.from_notes(self.notes)
+        self.watch_storage()
+        self.load_last_read_verse()
+
+    def create_profile(self):
+        """Ask for a name and switch to a new profile that starts with the current settings."""
+        name = simpledialog.askstring("New Profile", "Name of the new profile:", parent=self)
+        if name is None:
+            return
+        name = name.strip()
+        if not valid_profile_name(name):
+            messagebox.showerror("Error", "Profile names can have up to 40 letters, digits, spaces, dashes "
+                                          "and underscores.")
+            return
+        try:
+            self.profiles.create(name, self.settings)
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.profile_dropdown['values'] = self.profiles.names()
+        self.profile_var.set(name)
+        self.switch_profile(name)
+
     def update_voice(self, event):
-        """Update the selected voice and save to config."""
+        """Update the selected voice and save it."""
         self.voice = self.voice_var.get()
-        self.config['Settings']['Voice'] = self.voice
-        with open(self.config_file, 'w') as configfile:
-            self.config.write(configfile)
+        self.session.voice = self.voice
+        self.save_setting('Voice', self.voice)
+        self.load_bundle()
+
+    def update_speed(self, event):
+        """Update the playback speed and save it. Applies from the next verse."""
+        self.speed = float(self.speed_var.get().rstrip('x'))
+        self.session.speed = self.speed
+        self.save_setting('Speed', self.speed)
 
     def update_translation(self, event):
         """Update the selected translation and reload Bible data."""
-        new_translation = f"{self.translation_var.get().lower()}.csv"
+        new_translation = self.translation_files.get(self.translation_var.get(), self.current_translation)
         if new_translation != self.current_translation:
             self.save_notes()  # Save current notes
             self.current_translation = new_translation
 
-            # Update config
-            self.config['Settings']['Translation'] = self.current_translation
-            with open(self.config_file, 'w') as configfile:
-                self.config.write(configfile)
+            # Save the setting
+            self.save_setting('Translation', self.current_translation)
 
-            # Update read verses file path
-            old_verses_file = self.read_verses_file
-            self.read_verses_file = f"read_verses_{self.current_translation.split('.')[0]}.csv"
-
-            # Load new translation data
+            # Load new translation data and its read verses
             self.load_bible_data()
-            self.load_storage_files()
+            self.session.set_corpus(self.corpus, self.translation_key())
+            self.load_plan()
+            self.load_bundle()
 
             # Reset to Genesis 1:1
-            self.book_var.set("Genesis")
-            self.update_chapters()
-            self.chapter_var.set("1")
-            self.update_verses()
-            self.verse_var.set("1")
-            self.navigate()
-
-    def on_book_change(self, event):
-        """Handle book selection changes."""
-        try:
-            print("Book change detected")
-            self.save_notes()  # Save notes for the current chapter first
-            print("Notes saved for the current chapter")
-            self.stop()  # Stop any current playback
-            time.sleep(0.1)  # Brief pause to ensure cleanup is complete
-            self.update_chapters()  # This will also trigger update_verses
-            print("Chapters updated")
-            self.navigate()
-            print("Navigated to the new chapter")
-        except Exception as e:
-            print(f"Error during book change: {e}")
-
-    def on_chapter_change(self, event):
-        """Handle chapter selection changes."""
-        try:
-            print("Chapter change detected")
-            self.save_notes()  # Save notes for the current chapter first
-            print("Notes saved for the current chapter")
-            self.stop()  # Stop any current playback
-            time.sleep(0.1)  # Brief pause to ensure cleanup is complete
-            self.update_verses()
-            print("Verses updated")
-            self.navigate()
-            print("Navigated to the new verse")
-        except Exception as e:
-            print(f"Error during chapter change: {e}")
+            self.select("Genesis", 1, 1)
 
     def on_verse_change(self, event):
         """Handle verse selection changes."""
         try:
             self.stop()  # Stop any current playback
-            time.sleep(0.1)  # Brief pause to ensure cleanup is complete
             self.save_notes()
             self.navigate()
         except Exception as e:
-            print(f"Error during verse change: {e}")
+            log.error("Error during verse change: %s", e)
 
+    @instrumentation.timed("load_bible_data")
     def load_bible_data(self):
-        """Load the Bible data from the selected CSV file."""
+        """Load the Bible data for the selected translation, parsing the CSV only on first use."""
         try:
-            self.bible_data = pd.read_csv(self.current_translation)
-            self.books_data = self.bible_data[["Book Abbreviation", "Full Book Name", "Book Number"]].drop_duplicates()
-            self.books_data = self.books_data.sort_values("Book Number")
-            self.book_to_number = dict(zip(self.books_data["Book Abbreviation"], self.books_data["Book Number"]))
-            self.number_to_book = dict(zip(self.books_data["Book Number"], self.books_data["Book Abbreviation"]))
-            self.book_abbrev_to_full = dict(zip(self.books_data["Book Abbreviation"], self.books_data["Full Book Name"]))
-            self.book_full_to_abbrev = dict(zip(self.books_data["Full Book Name"], self.books_data["Book Abbreviation"]))
+            self.corpus = self.translations.get(self.current_translation)
+            self.bible_data = self.corpus.bible_data
+            self.books_data = self.corpus.books_data
+            self.book_to_number = self.corpus.book_to_number
+            self.number_to_book = self.corpus.number_to_book
+            self.book_abbrev_to_full = self.corpus.book_abbrev_to_full
+            self.book_full_to_abbrev = self.corpus.book_full_to_abbrev
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load {self.current_translation}: {e}")
             self.current_translation = "net.csv"
             self.load_bible_data()
 
-    def update_books(self):
-        """Update the book dropdown with the full book names from the selected translation."""
-        self.full_book_names = self.books_data["Full Book Name"].tolist()
-        self.book_dropdown['values'] = self.full_book_names
-        if self.full_book_names:  # Set the first book as default
-            self.book_dropdown.set(self.full_book_names[0])
-            self.update_chapters()
-
     def load_last_read_verse(self):
         """Navigate to the last read verse or default to Genesis 1:1."""
-        if self.read_verses:
-            last_verse_id = self.read_verses[-1]
-            print(f"Last verse ID: {last_verse_id}")  # Debugging statement
-
-            # Filter the bible_data DataFrame to find the verse
-            verse_data = self.bible_data[
-                self.bible_data["Verse ID"] == last_verse_id
-            ]
-
-            if not verse_data.empty:
-                verse_data = verse_data.iloc[0]
-                book_abbrev = self.number_to_book[verse_data["Book Number"]]
-                book_name = self.book_abbrev_to_full[book_abbrev]
-                self.book_var.set(book_name)
-                self.update_chapters()
-
-                self.chapter_var.set(str(verse_data["Chapter"]))
-                self.update_verses()
-
-                self.verse_var.set(str(verse_data["Verse"]))
-                self.navigate()
-            else:
-                print(f"Verse ID {last_verse_id} not found in bible_data.")  # Debugging statement
-                # Default to Genesis 1:1
-                self.book_var.set("Genesis")
-                self.update_chapters()
-                self.chapter_var.set("1")
-                self.update_verses()
-                self.verse_var.set("1")
-                self.navigate()
-        else:
-            # Default to Genesis 1:1
-            self.book_var.set("Genesis")
-            self.update_chapters()
-            self.chapter_var.set("1")
-            self.update_verses()
-            self.verse_var.set("1")
-            self.navigate()
+        last_verse_id = self.session.last_read_verse_id()
+        if last_verse_id is not None:
+            log.debug("Last verse ID: %s", last_verse_id)
+            location = self.corpus.verse_locations.get(last_verse_id)
+            if location is not None:
+                book_number, chapter, verse = location
+                self.select(self.corpus.full_book_name(book_number), chapter, verse)
+                return
+            log.warning("Verse ID %s not found in bible_data.", last_verse_id)
+
+        # Default to Genesis 1:1
+        self.select("Genesis", 1, 1)
 
+    @single_redraw
     def update_chapters(self):
         """Update available chapters when a book is selected."""
         try:
@@ -491,7 +770,7 @@ class BibleApp(tk.Tk):
             book_number = self.book_to_number[book_abbrev]
 
             # Get all chapters for the selected book
-            chapters = sorted(self.bible_data[self.bible_data["Book Number"] == book_number]["Chapter"].unique())
+            chapters = self.corpus.book_chapters.get(book_number, [])
 
             # Update chapter dropdown
             self.chapter_dropdown['values'] = chapters
@@ -501,8 +780,9 @@ class BibleApp(tk.Tk):
 
             self.navigate()
         except Exception as e:
-            print(f"Error updating chapters: {e}")
+            log.error("Error updating chapters: %s", e)
 
+    @single_redraw
     def update_verses(self):
         """Update available verses when a chapter is selected."""
         try:
@@ -517,10 +797,7 @@ class BibleApp(tk.Tk):
             chapter = int(selected_chapter)
 
             # Get all verses for the selected book and chapter
-            verses = sorted(self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == chapter)
-            ]["Verse"].unique())
+            verses = self.corpus.chapter_verses.get((book_number, chapter), [])
 
             # Update verse dropdown
             self.verse_dropdown['values'] = verses
@@ -529,9 +806,17 @@ class BibleApp(tk.Tk):
 
             self.navigate()
         except Exception as e:
-            print(f"Error updating verses: {e}")
+            log.error("Error updating verses: %s", e)
 
     def navigate(self, event=None):
+        """Redraw the chapter now, or when the current navigation() block ends."""
+        if self._navigation_depth:
+            self._redraw_pending = True
+        else:
+            self.render_chapter()
+
+    @instrumentation.timed("navigate")
+    def render_chapter(self):
         """Display all verses in the chapter with the selected verse highlighted."""
         # Get current selections
         book = self.book_var.get()
@@ -548,13 +833,9 @@ class BibleApp(tk.Tk):
         chapter = int(chapter)
         verse = int(verse)
 
-        # Get chapter verses
-        chapter_verses = self.bible_data[(
-            self.bible_data["Book Number"] == book_number) &
-            (self.bible_data["Chapter"] == chapter)
-        ]
-
-        if chapter_verses.empty:
+        # Get the chapter's text, formatted once per chapter
+        chapter_text = self.corpus.chapter_text(book_number, chapter)
+        if chapter_text is None:
             return
 
         # Clear display and remove any existing tags
@@ -562,28 +843,22 @@ class BibleApp(tk.Tk):
         self.verse_display.tag_remove("current", "1.0", "end")  # Remove current tag
         self.verse_display.tag_remove("read", "1.0", "end")  # Remove read tag
 
-        # Display verses
-        line_number = 1
-        target_line = None
-
-        for _, row in chapter_verses.iterrows():  # Iterate over each verse in the chapter
-            # Add verse text with abbreviated book name
-            verse_text = f"{book_abbrev} {row['Chapter']}:{row['Verse']} {row['Text']}\n\n"
-            self.verse_display.insert("end", verse_text)
-
-            # Track current verse position
-            if row['Verse'] == verse:
-                target_line = line_number
-                if self.reading and self.current_verse == verse:
-                    self.verse_display.tag_add("current", f"{line_number}.0", f"{line_number + 1}.0")
-
-            # Apply read tag
-            if row['Verse ID'] in self.read_verses:
-                self.verse_display.tag_add("read", f"{line_number}.0", f"{line_number + 1}.0")
+        # Display the whole chapter in one insert
+        self.verse_display.insert("end", chapter_text.text)
 
-            line_number += 2
+        # Apply read tag to every read verse in one call
+        read_verses = self.session.read_verses
+        read_ranges = []
+        for index, verse_id in enumerate(chapter_text.verse_ids):
+            if verse_id in read_verses:
+                line = chapter_text.line_of(index)
+                read_ranges += [f"{line}.0", f"{line + 1}.0"]
+        if read_ranges:
+            self.verse_display.tag_add("read", *read_ranges)
 
         # Apply current tag after read tag to ensure it takes precedence
+        index = chapter_text.index_of(verse)
+        target_line = chapter_text.line_of(index) if index is not None else None
         if target_line:
             self.verse_display.tag_add("current", f"{target_line}.0", f"{target_line + 1}.0")
 
@@ -591,6 +866,9 @@ class BibleApp(tk.Tk):
         if target_line:
             self.center_verse(target_line)
 
+        # Show the plan day of the selected verse
+        self.update_plan_label(self.find_verse_id(book_number, chapter, verse))
+
         # Load chapter notes
         self.load_notes()
 
@@ -612,17 +890,15 @@ class BibleApp(tk.Tk):
                 (center_line - 1) / float(self.verse_display.count("1.0", "end", "lines")[0])
             ))
         except Exception as e:  # Handle any exceptions that may occur
-            print(f"Error centering verse: {e}")
+            log.error("Error centering verse: %s", e)
 
     def change_text_size(self, delta):
-        """Change the font size of the verse display and save to config."""
+        """Change the font size of the verse display and save it."""
         new_size = self.text_size.get() + delta
         if 8 <= new_size <= 48:  # Increase max size to 48
             self.text_size.set(new_size)
             self.verse_display.configure(font=("TkDefaultFont", new_size))  # Update the font size
-            self.config['Settings']['TextSize'] = str(new_size)
-            with open(self.config_file, 'w') as configfile:
-                self.config.write(configfile)
+            self.save_setting('TextSize', new_size)
 
     def reset_chapter_history(self):
         """Reset the read history for the current chapter with confirmation."""
@@ -636,16 +912,10 @@ class BibleApp(tk.Tk):
             chapter = int(self.chapter_var.get())
 
             # Get verse IDs for current chapter
-            chapter_verses = self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == chapter)
-            ]["Verse ID"].tolist()
+            chapter_verses = self.corpus.chapters.get((book_number, chapter), [])
 
             # Remove these verses from read_verses
-            self.read_verses = [v for v in self.read_verses if v not in chapter_verses]
-
-            # Update read_verses file
-            pd.DataFrame({"Verse ID": self.read_verses}).to_csv(self.read_verses_file, index=False)
+            self.session.mark_unread(chapter_verses)
 
             # Refresh display
             self.navigate()
@@ -662,11 +932,9 @@ class BibleApp(tk.Tk):
             chapter = int(self.chapter_var.get())  # Get the chapter number
 
             # Remove notes for this chapter
-            self.notes = self.notes[
-                ~((self.notes["Book Number"] == book_number) & (self.notes["Chapter"] == chapter))]  # Filter out notes for the chapter
-
-            # Update notes file
-            self.notes.to_csv(self.notes_file, index=False)
+            self.notes.pop((book_number, chapter), None)
+            self.storage.delete_note(book_number, chapter)
+            self.notes_index.remove(book_number, chapter)
 
             # Clear notes display
             self.notes_text.delete("1.0", tk.END)
@@ -679,20 +947,31 @@ class BibleApp(tk.Tk):
         )
         if confirmation:
             # Reset settings to defaults
-            self.config['Settings'] = {
-                'Voice': self.default_voice,
-                'SkipReadVerses': str(self.default_skip_read_verses),
-                'TextSize': str(self.default_text_size),
-            }
-            with open(self.config_file, 'w') as configfile:
-                self.config.write(configfile)
+            self.reset_settings()
 
             # Update GUI elements
             self.voice_var.set(self.default_voice)
+            self.speed_var.set(f"{self.default_speed:g}x")
             self.skip_read_verses.set(self.default_skip_read_verses)
             self.text_size.set(self.default_text_size)  # Update the font size
             self.verse_display.configure(font=("TkDefaultFont", self.default_text_size))
 
+    def reset_settings(self):
+        """Reset the voice, skip, text size and speed settings to their defaults."""
+        defaults = {
+            'Voice': self.default_voice,
+            'SkipReadVerses': str(self.default_skip_read_verses),
+            'TextSize': str(self.default_text_size),
+            'Speed': str(self.default_speed),
+        }
+        self.settings.update(defaults)
+        self.storage.set_settings(defaults)
+        self.voice = self.default_voice
+        self.session.voice = self.voice
+        self.load_bundle()
+        self.speed = self.default_speed
+        self.session.speed = self.speed
+
     def reset_all(self):
         """Reset all history, notes, and settings to their defaults with confirmation."""
         confirmation = messagebox.askyesno(
@@ -701,21 +980,14 @@ class BibleApp(tk.Tk):
         )  # Ask for confirmation
         if confirmation:
             # Reset read verses
-            self.read_verses = []
-            with open(self.read_verses_file, "w") as f:
-                f.write("Verse ID\n")
+            self.session.clear_read_verses()
 
             # Reset settings to defaults
-            self.config['Settings'] = {
-                'Voice': self.default_voice,
-                'SkipReadVerses': str(self.default_skip_read_verses),
-                'TextSize': str(self.default_text_size),
-            }
-            with open(self.config_file, 'w') as configfile:
-                self.config.write(configfile)
+            self.reset_settings()
 
             # Update GUI elements
             self.voice_var.set(self.default_voice)
+            self.speed_var.set(f"{self.default_speed:g}x")
             self.skip_read_verses.set(self.default_skip_read_verses)
             self.text_size.set(self.default_text_size)
             self.verse_display.configure(font=("TkDefaultFont", self.default_text_size))
@@ -724,403 +996,54 @@ class BibleApp(tk.Tk):
             self.navigate()
 
     def stop(self):
-        """Stop the current audio playback and reset reading state."""
-        print("=== Stopping playback ===")
-
-        # Set flags first
-        self.reading = False
-        self.audio_paused = False
-
-        # Enable buttons
-        try:
-            print("Resetting button states...")
-            self.read_button.config(state="normal")
-            self.next_unread_button.config(state="normal")
-        except Exception as e:
-            print(f"Error resetting buttons: {e}")
-
-        try:
-            # Stop and close audio stream
-            if hasattr(self, 'audio_stream') and self.audio_stream:
-                print("Closing audio stream...")
-                try:
-                    self.audio_stream.stop_stream()
-                    self.audio_stream.close()
-                except Exception as e:
-                    print(f"Error closing audio stream: {e}")
-                self.audio_stream = None
-
-            # Close wave file
-            if hasattr(self, 'audio_wave') and self.audio_wave:
-                print("Closing wave file...")
-                try:
-                    self.audio_wave.close()
-                except Exception as e:
-                    print(f"Error closing wave file: {e}")
-                self.audio_wave = None
-
-            # Clean up PyAudio instance
-            if hasattr(self, 'pyaudio_instance') and self.pyaudio_instance:
-                print("Terminating PyAudio...")
-                try:
-                    self.pyaudio_instance.terminate()
-                except Exception as e:
-                    print(f"Error terminating PyAudio: {e}")
-                self.pyaudio_instance = None
-
-        except Exception as e:
-            print(f"Error during cleanup: {e}")
-        finally:
-            # Reset audio variables
-            self.audio_data = None
-            self.audio_index = 0
-            self.current_verse = None
-            print("=== Stop completed ===")
+        """Stop the current audio playback."""
+        self.session.stop()
 
     def read(self):
-        """Handle the reading of verses."""
-        print("=== Read method started ===")
-
-        if self.audio_paused:
-            print("Audio was paused, resuming...")
-            self.resume()
-            return
-
-        # Get current verse information
-        book_abbrev = self.book_full_to_abbrev[self.book_var.get()]
-        book_number = self.book_to_number[book_abbrev]
-        chapter = int(self.chapter_var.get())
-        verse = int(self.verse_var.get())
-
-        current_verse_data = self.bible_data[
-            (self.bible_data["Book Number"] == book_number) &
-            (self.bible_data["Chapter"] == chapter) &
-            (self.bible_data["Verse"] == verse)
-        ]
-
-        if current_verse_data.empty:
-            print("No verse data found!")
-            return
-
-        verse_id = int(current_verse_data["Verse ID"].values[0])  # Get numeric Verse ID
-
-        # Check if we should skip read verses
-        if self.skip_read_verses.get() and verse_id in self.read_verses:
-            print(f"Skipping read verse: {verse_id}")
-            self.next_unread()
-            return
-
-        # Stop any existing reading before starting new one
-        print("Stopping any existing playback...")
-        self.stop()
-
-        print("Setting up new reading...")
-        self.reading = True
-
-        # Mark verse as read if not already marked
-        if verse_id not in self.read_verses:
-            print(f"DEBUG - read() method writing verse_id: {verse_id}")  # Debug print
-            self.read_verses.append(verse_id)
-            # Save only the numeric Verse ID to CSV
-            with open(self.read_verses_file, "a", newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([verse_id])  # Only save the numeric ID
-
-        text_to_speak = current_verse_data["Text"].values[0]
-        self.current_verse = verse
-
-        print(f"Starting text-to-speech for verse {verse_id}")
-        print(f"Text to speak: {text_to_speak}")
-
-        # Update the display to show the verse as read
-        self.navigate()
-
-        # Disable dropdowns
-        self.book_dropdown.config(state="disabled")
-        self.chapter_dropdown.config(state="disabled")
-        self.verse_dropdown.config(state="disabled")
-
-        # Start new reading in a separate thread
-        threading.Thread(target=self.speak_text, args=(text_to_speak,)).start()
-        print("=== Read method completed ===")
-
-    def speak_text(self, text):
-        """Convert text to speech using edge-tts and play the audio."""
-        print("DEBUG - speak_text() called")  # Debug print
-        try:
-            print("Starting speak_text")
-            # Stop any existing playback
-            self.stop()
-
-            # Get the current script directory
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-
-            # Set full paths for temporary files
-            self.temp_mp3 = os.path.join(script_dir, "temp.mp3")
-            self.temp_wav = os.path.join(script_dir, "temp.wav")
-
-            print(f"Using temp files: MP3={self.temp_mp3}, WAV={self.temp_wav}")
-            # Create and play the audio
-            asyncio.run(self.save_and_play_audio(text))
-        except Exception as e:
-            print(f"Error in speak_text: {e}")
-            self.stop()
-
-    async def save_and_play_audio(self, text):
-        """Generate and play audio for the given text."""
-        print("DEBUG - save_and_play_audio() called")  # Debug print
-        try:
-            print("Starting save_and_play_audio")
-            # Clean up any existing temporary files
-            for temp_file in [self.temp_mp3, self.temp_wav]:
-                if os.path.exists(temp_file):
-                    try:
-                        os.remove(temp_file)
-                        print(f"Removed existing {temp_file}")
-                    except Exception as e:
-                        print(f"Error removing temporary file {temp_file}: {e}")
-
-            # Generate MP3
-            print("Generating MP3...")
-            communicate = edge_tts.Communicate(text, self.voice)
-            await communicate.save(self.temp_mp3)
-
-            # Wait for MP3 file to be created
-            print("Waiting for MP3 file...")
-            for i in range(50):
-                if os.path.exists(self.temp_mp3):
-                    print("MP3 file created successfully")
-                    break
-                await asyncio.sleep(0.1)
-
-            if not os.path.exists(self.temp_mp3):
-                raise FileNotFoundError(f"MP3 file was not created at {self.temp_mp3}")
-
-            # Convert to WAV
-            print("Converting to WAV...")
-            try:
-                audio = AudioSegment.from_mp3(self.temp_mp3)
-                audio.export(self.temp_wav, format="wav")
-                print("WAV file created successfully")
-            except Exception as e:
-                raise Exception(f"Error converting MP3 to WAV: {e}")
-
-            # Verify the WAV file
-            print("Verifying WAV file...")
-            try:
-                with wave.open(self.temp_wav, 'rb') as test_wav:
-                    frames = test_wav.getnframes()
-                    print(f"WAV file frames: {frames}")
-                    if frames == 0:
-                        raise Exception("WAV file is empty")
-            except Exception as e:
-                raise Exception(f"Invalid WAV file: {e}")
-
-            # Play the audio
-            print("Starting playback...")
-            if self.reading:
-                print("Reading flag is True, calling play_audio...")
-                # Use after to schedule playback in the main thread
-                self.after(100, lambda: self.play_audio(self.temp_wav))
-            else:
-                print("Reading flag is False, setting it to True and calling play_audio...")
-                self.reading = True
-                self.after(100, lambda: self.play_audio(self.temp_wav))
-
-        except Exception as e:
-            print(f"Error in save_and_play_audio: {e}")
-            self.stop()
-
-    def convert_mp3_to_wav(self, mp3_file, wav_file):
-        """Convert MP3 audio file to WAV format using pydub."""
-        try:
-            audio = AudioSegment.from_mp3(mp3_file)
-            audio.export(wav_file, format="wav")
-        except Exception as e:
-            print(f"Error converting MP3 to WAV: {e}")
-
-    def play_audio(self, filename):
-        """Play audio file and handle verse progression."""
-        print(f"=== Play_audio started with file: {filename} ===")
-
-        try:
-            if not os.path.exists(filename):
-                print(f"Audio file not found: {filename}")
-                return
-
-            # Set reading state
-            print("Setting reading state...")
-            self.reading = True
-            self.audio_paused = False
-
-            # Update UI
-            self.read_button.config(state="disabled")
-            self.next_unread_button.config(state="disabled")
-
-            # Start playback in a separate thread
-            threading.Thread(target=self._play_audio_thread, args=(filename,), daemon=True).start()
-
-        except Exception as e:
-            print(f"Error in play_audio: {e}")
-            import traceback
-            traceback.print_exc()
-            self.stop()
-
-    def _play_audio_thread(self, filename):
-        """Handle audio playback in a separate thread."""
-        try:
-            # Initialize PyAudio
-            self.pyaudio_instance = pyaudio.PyAudio()
-
-            # Open wave file
-            self.audio_wave = wave.open(filename, 'rb')
-
-            # Get wave file properties
-            channels = self.audio_wave.getnchannels()
-            width = self.audio_wave.getsampwidth()
-            rate = self.audio_wave.getframerate()
-
-            # Create audio stream
-            self.audio_stream = self.pyaudio_instance.open(
-                format=self.pyaudio_instance.get_format_from_width(width),
-                channels=channels,
-                rate=rate,
-                output=True
-            )
-
-            # Read and play the audio data
-            chunk_size = 1024
-            data = self.audio_wave.readframes(chunk_size)
-
-            while data and self.reading:
-                if not self.audio_paused:
-                    self.audio_stream.write(data)
-                    data = self.audio_wave.readframes(chunk_size)
-                else:
-                    time.sleep(0.1)
-
-            # After playback, schedule next verse in main thread
-            if self.reading:
-                self.after(100, self.progress_to_next_verse)
-
-        except Exception as e:
-            print(f"Error in _play_audio_thread: {e}")
-        finally:
-            self.after(100, self.stop)  # Schedule cleanup in main thread
-
-    def progress_to_next_verse(self):
-        """Progress to the next verse after current verse finishes."""
-        try:
-            print("=== Progressing to next verse ===")
-            self.save_notes()  # Save any notes before progressing
-
-            book_abbrev = self.book_full_to_abbrev[self.book_var.get()]
-            book_number = self.book_to_number[book_abbrev]
-            chapter = int(self.chapter_var.get())
-            current_verse = int(self.verse_var.get())
-
-            # Get current verse ID
-            current_verse_data = self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == chapter) &
-                (self.bible_data["Verse"] == current_verse)
-            ]
-
-            if not current_verse_data.empty:
-                verse_id = int(current_verse_data["Verse ID"].values[0])
-
-                # Mark current verse as read if not already marked
-                if verse_id not in self.read_verses:
-                    print(f"DEBUG - progress_to_next_verse() writing verse_id: {verse_id}")  # Debug print
-                    self.read_verses.append(verse_id)
-                    with open(self.read_verses_file, "a", newline='') as f:
-                        writer = csv.writer(f)
-                        writer.writerow([verse_id])
-
-            next_verse = current_verse + 1
-            max_verse = max([int(v) for v in self.verse_dropdown['values']])
-
-            if next_verse <= max_verse:
-                print(f"Moving to next verse: {next_verse}")
-                self.verse_var.set(str(next_verse))
-                self.navigate()
-                self.read()  # Start reading the next verse
-            else:
-                print("Reached end of chapter, moving to next chapter")
-                self.next_chapter()
-
-        except Exception as e:
-            print(f"Error progressing to next verse: {e}")
-
-    def check_pause(self):
-        """Check if the audio should be resumed."""
-        if not self.audio_paused and self.reading:
-            self.audio_stream.start_stream()
+        """Start reading from the selected verse, or resume if paused."""
+        self.sync_session()
+        self.session.read()
+        self.request_navigate()  # Update the display to show the verse as read
 
     def pause(self):
         """Pause the current audio playback."""
-        if self.reading:  # Ensure we are currently reading
-            self.audio_paused = True
-            self.read_button.config(state="normal")  # Re-enable the Read button
-            self.next_unread_button.config(state="normal")  # Re-enable the Next Unread button
-            self.book_dropdown.config(state="readonly")  # Re-enable the Book dropdown
-            self.chapter_dropdown.config(state="readonly")  # Re-enable the Chapter dropdown
-            self.verse_dropdown.config(state="readonly")  # Re-enable the Verse dropdown
+        self.session.pause()
 
     def resume(self):
         """Resume paused audio playback."""
-        if self.reading:  # Ensure we are currently reading
-            self.audio_paused = False
-            self.read_button.config(state="disabled")  # Disable the Read button while resuming
-            self.next_unread_button.config(state="disabled")  # Disable the Next Unread button while resuming
-
-            if self.audio_stream:
-                self.audio_stream.start_stream()
+        self.session.resume()
 
     def save_notes(self):
         """Save notes for the current chapter."""
-        print("Saving notes")
+        log.debug("Saving notes")
         book_abbrev = self.book_full_to_abbrev[self.book_var.get()]
         book_number = self.book_to_number[book_abbrev]
         chapter = int(self.chapter_var.get())  # Convert chapter to integer
         notes_text = self.notes_text.get("1.0", tk.END).strip()
 
         if notes_text:  # Only save if there are notes
-            # Remove existing notes for this chapter
-            self.notes = self.notes[
-                ~((self.notes["Book Number"] == book_number) & (self.notes["Chapter"] == chapter))
-            ]
-
-            # Add new note
-            new_note = pd.DataFrame({
-                "Book Number": [book_number],
-                "Chapter": [chapter],
-                "Notes": [notes_text]
-            })
-            self.notes = pd.concat([self.notes, new_note], ignore_index=True)
-            self.notes.to_csv(self.notes_file, index=False)
-            print("Notes saved to file")
+            if self.notes.get((book_number, chapter)) != notes_text:
+                self.notes[(book_number, chapter)] = notes_text
+                self.storage.save_note(book_number, chapter, notes_text)
+                self.notes_index.update(book_number, chapter, notes_text)
+                log.debug("Notes saved")
 
     def load_notes(self):
         """Load notes for the current chapter."""
-        print("Loading notes")
+        log.debug("Loading notes")
         self.notes_text.delete("1.0", tk.END)
 
         book_abbrev = self.book_full_to_abbrev[self.book_var.get()]
         book_number = self.book_to_number[book_abbrev]
         chapter = int(self.chapter_var.get())  # Convert chapter to integer
 
-        chapter_notes = self.notes[
-            (self.notes["Book Number"] == book_number) &
-            (self.notes["Chapter"] == chapter)
-        ]
+        chapter_notes = self.notes.get((book_number, chapter))
 
-        if not chapter_notes.empty:
-            latest_note = chapter_notes.iloc[-1]["Notes"]
-            self.notes_text.insert("1.0", latest_note)
-            print("Notes loaded from file")
+        if chapter_notes:
+            self.notes_text.insert("1.0", chapter_notes)
+            log.debug("Notes loaded")
         else:
-            print("No notes found for this chapter")
+            log.debug("No notes found for this chapter")
 
     def copy_notes(self):
         """Copy the current chapter notes to the clipboard."""
@@ -1129,6 +1052,129 @@ class BibleApp(tk.Tk):
             pyperclip.copy(notes_text)
             messagebox.showinfo("Notes Copied", "The notes have been copied to the clipboard.")
 
+    def create_search_notes_dialog(self):
+        """Create a dialog to search chapter notes and jump to a matching chapter."""
+        self.save_notes()  # Make sure the current chapter's notes are searchable
+
+        dialog = Toplevel(self)
+        dialog.title("Search Notes")
+        dialog.geometry("500x350")
+        dialog.grid_columnconfigure(0, weight=1)
+        dialog.grid_rowconfigure(1, weight=1)
+
+        query_var = tk.StringVar()
+        query_entry = ttk.Entry(dialog, textvariable=query_var)
+        query_entry.grid(row=0, column=0, columnspan=2, padx=5, pady=5, sticky="ew")
+
+        results_list = tk.Listbox(dialog, activestyle="none")
+        results_list.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+
+        results_scroll = ttk.Scrollbar(dialog, command=results_list.yview)
+        results_scroll.grid(row=1, column=1, pady=5, sticky="ns")
+        results_list.configure(yscrollcommand=results_scroll.set)
+
+        results = []
+
+        def update_results(*args):
+            results.clear()
+            results.extend(self.notes_index.search(query_var.get()))
+            results_list.delete(0, tk.END)
+            for book_number, chapter, snippet in results:
+                book_name = self.book_abbrev_to_full.get(self.number_to_book.get(book_number), str(book_number))
+                results_list.insert(tk.END, f"{book_name} {chapter}: {snippet}")
+
+        def open_result(event=None):
+            selection = results_list.curselection()
+            if not selection and not results:
+                return
+            book_number, chapter, _ = results[selection[0] if selection else 0]
+            if book_number not in self.number_to_book:
+                return
+
+            self.stop()
+            self.save_notes()
+
+            # Jump to the first verse of the chapter
+            self.select(self.book_abbrev_to_full[self.number_to_book[book_number]], chapter)
+
+        query_var.trace_add("write", update_results)
+        results_list.bind('<Double-Button-1>', open_result)
+        results_list.bind('<Return>', open_result)
+        query_entry.bind('<Return>', open_result)  # Opens the selected or first result
+
+        query_entry.focus_set()
+
+    def apply_playback_settings(self):
+        """Let the reading engine play with the current buffer settings, starting with the next verse."""
+        self.session.player = Player(chunk_frames=self.playback_chunk_frames,
+                                     buffer_chunks=self.playback_buffer_chunks)
+
+    def create_audio_settings_dialog(self):
+        """Create a dialog to change how audio is played and polished."""
+        dialog = Toplevel(self)
+        dialog.title("Audio Settings")
+
+        fields = [
+            ('PlaybackChunkFrames', "Frames per playback buffer:"),
+            ('PlaybackBufferChunks', "Buffers queued ahead:"),
+        ]
+        variables = {}
+        for row, (key, label) in enumerate(fields):
+            tk.Label(dialog, text=label).grid(row=row, column=0, padx=5, pady=5, sticky="w")
+            variables[key] = tk.StringVar(value=self.settings[key])
+            ttk.Entry(dialog, textvariable=variables[key], width=10).grid(row=row, column=1, padx=5, pady=5)
+        tk.Label(dialog, text="Raise these if playback crackles or stutters; lower them to make\n"
+                              "Pause and Stop react faster.", justify="left").grid(
+            row=len(fields), column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
+        # Silence and loudness apply to reading aloud and created MP3s; "off" keeps the voice's own
+        polish_fields = [
+            ('SilencePadMs', "Silence around each verse (ms):"),
+            ('TargetLoudnessDBFS', "Loudness (dBFS):"),
+        ]
+        for row, (key, label) in enumerate(polish_fields, start=len(fields) + 1):
+            tk.Label(dialog, text=label).grid(row=row, column=0, padx=5, pady=5, sticky="w")
+            variables[key] = tk.StringVar(value=self.settings[key])
+            ttk.Entry(dialog, textvariable=variables[key], width=10).grid(row=row, column=1, padx=5, pady=5)
+        tk.Label(dialog, text='Enter "off" to keep the silence or volume of the voice.', justify="left").grid(
+            row=len(fields) + len(polish_fields) + 1, column=0, columnspan=2, padx=5, pady=5, sticky="w")
+
+        def save_audio_settings():
+            try:
+                chunk_frames = int(variables['PlaybackChunkFrames'].get())
+                buffer_chunks = int(variables['PlaybackBufferChunks'].get())
+                if chunk_frames < 64 or buffer_chunks < 1:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Input", "Use at least 64 frames per buffer and at least 1 buffer.",
+                                     parent=dialog)
+                return
+            try:
+                silence_pad_ms = self.optional_number(variables['SilencePadMs'].get())
+                target_dbfs = self.optional_number(variables['TargetLoudnessDBFS'].get())
+                if (silence_pad_ms is not None and silence_pad_ms < 0) or (target_dbfs is not None and target_dbfs > 0):
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Input", 'Use a silence of 0 ms or more and a loudness of 0 dBFS or '
+                                                      'less, or "off".', parent=dialog)
+                return
+
+            self.playback_chunk_frames, self.playback_buffer_chunks = chunk_frames, buffer_chunks
+            self.save_setting('PlaybackChunkFrames', chunk_frames)
+            self.save_setting('PlaybackBufferChunks', buffer_chunks)
+            self.apply_playback_settings()
+
+            # Clips are cached per silence and loudness, so new verses simply use the new values
+            self.silence_pad_ms, self.target_dbfs = silence_pad_ms, target_dbfs
+            self.save_setting('SilencePadMs', variables['SilencePadMs'].get().strip())
+            self.save_setting('TargetLoudnessDBFS', variables['TargetLoudnessDBFS'].get().strip())
+            self.session.silence_pad_ms = silence_pad_ms
+            self.session.target_dbfs = target_dbfs
+            dialog.destroy()
+
+        ttk.Button(dialog, text="Save", command=save_audio_settings).grid(
+            row=len(fields) + len(polish_fields) + 2, column=0, columnspan=2, pady=10)
+
     def create_mp3(self):
         """Create an MP3 file for a selected range of verses."""
         # Create a dialog to select the starting and ending verses
@@ -1172,7 +1218,7 @@ class BibleApp(tk.Tk):
                 return
             book_abbrev = self.book_full_to_abbrev[book_name]
             book_number = self.book_to_number[book_abbrev]
-            chapters = sorted(self.bible_data[self.bible_data["Book Number"] == book_number]["Chapter"].unique())
+            chapters = self.corpus.book_chapters.get(book_number, [])
             start_chapter_dropdown['values'] = chapters
             if chapters:
                 start_chapter_dropdown.set(chapters[0])
@@ -1186,11 +1232,8 @@ class BibleApp(tk.Tk):
             book_abbrev = self.book_full_to_abbrev[book_name]  # Get the book abbreviation
             book_number = self.book_to_number[book_abbrev]  # Get the book number
             chapter = int(chapter)  # Convert chapter to integer
-            # Filter verses for the selected book and chapter
-            verses = sorted(self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == chapter)
-            ]["Verse"].unique())
+            # Verses of the selected book and chapter
+            verses = self.corpus.chapter_verses.get((book_number, chapter), [])
             start_verse_dropdown['values'] = verses  # Update verse dropdown values
             if verses:
                 start_verse_dropdown.set(verses[0])  # Set the first verse as default
@@ -1201,7 +1244,7 @@ class BibleApp(tk.Tk):
                 return
             book_abbrev = self.book_full_to_abbrev[book_name]
             book_number = self.book_to_number[book_abbrev]
-            chapters = sorted(self.bible_data[self.bible_data["Book Number"] == book_number]["Chapter"].unique())
+            chapters = self.corpus.book_chapters.get(book_number, [])
             end_chapter_dropdown['values'] = chapters
             if chapters:
                 end_chapter_dropdown.set(chapters[0])  # Set the first chapter as default
@@ -1215,11 +1258,8 @@ class BibleApp(tk.Tk):
             book_abbrev = self.book_full_to_abbrev[book_name]  # Get the book abbreviation
             book_number = self.book_to_number[book_abbrev]  # Get the book number
             chapter = int(chapter)  # Convert chapter to integer
-            # Filter verses for the selected book and chapter
-            verses = sorted(self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == chapter)
-            ]["Verse"].unique())
+            # Verses of the selected book and chapter
+            verses = self.corpus.chapter_verses.get((book_number, chapter), [])
             end_verse_dropdown['values'] = verses  # Update verse dropdown values
             if verses:
                 end_verse_dropdown.set(verses[-1])  # Set the last verse as default
@@ -1259,16 +1299,10 @@ class BibleApp(tk.Tk):
                 return
 
             # Get the verses in the specified range
-            selected_verses = self.bible_data[
-                ((self.bible_data["Book Number"] >= start_book_number) &
-                 (self.bible_data["Book Number"] <= end_book_number) &
-                 (self.bible_data["Chapter"] >= start_chapter) &
-                 (self.bible_data["Chapter"] <= end_chapter) &
-                 (self.bible_data["Verse"].astype(int) >= start_verse) &
-                 (self.bible_data["Verse"].astype(int) <= end_verse))
-            ]
-
-            if selected_verses.empty:
+            verse_ids = self.verse_ids_in_range(start_book_number, start_chapter, start_verse,
+                                                end_book_number, end_chapter, end_verse)
+
+            if not verse_ids:
                 messagebox.showerror("No Verses Found", "No verses found in the specified range.")
                 return
 
@@ -1282,32 +1316,46 @@ class BibleApp(tk.Tk):
             end_verse_id = f"{end_book_abbrev}-{end_chapter}-{end_verse}"
             filename = os.path.join(saved_mp3s_dir, f"{start_verse_id} to {end_verse_id}.mp3")
 
-            # Combine the text of the selected verses
-            text_to_speak = " ".join(selected_verses["Text"])
-
             # Create a progress bar dialog
             progress_dialog = Toplevel(dialog)
             progress_dialog.title("Creating MP3")
-            progress_dialog.geometry("300x100")
+            progress_dialog.geometry("340x120")
 
+            length = self.durations.total(self.voice, self.corpus, verse_ids)
+            Label(progress_dialog, text=f"Estimated length: {format_duration(length)}").pack(pady=2)
             progress_label = Label(progress_dialog, text="Generating MP3...")
             progress_label.pack(pady=5)
 
-            progress_bar = Progressbar(progress_dialog, mode='indeterminate')
+            progress_bar = Progressbar(progress_dialog, mode='determinate', maximum=len(verse_ids))
             progress_bar.pack(pady=5)
-            progress_bar.start()
+
+            started = time.monotonic()
+
+            def show_progress(done, total):
+                progress_bar['value'] = done
+                left = (time.monotonic() - started) / done * (total - done)
+                progress_label.config(text=f"Generating MP3... verse {done} of {total}, {format_duration(left)} left")
 
             def update_progress():
-                progress_bar.stop()
                 progress_dialog.destroy()
                 messagebox.showinfo("MP3 Created", f"MP3 file saved as {filename}")
                 dialog.destroy()
 
             # Save the audio to a file in a separate thread
-            threading.Thread(target=self.save_audio_threaded, args=(text_to_speak, filename, update_progress, progress_dialog, dialog)).start()
+            sidecars = {"json": json_var.get(), "lrc": lrc_var.get()}
+            threading.Thread(target=self.save_audio_threaded,
+                             args=(verse_ids, filename, sidecars, show_progress, update_progress, progress_dialog)).start()
+
+        # Timing files written next to the MP3
+        sidecar_frame = tk.Frame(dialog)
+        sidecar_frame.grid(row=2, column=0, columnspan=4, pady=5)
+        json_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(sidecar_frame, text="Save verse timings (JSON)", variable=json_var).grid(row=0, column=0, padx=5)
+        lrc_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(sidecar_frame, text="Save lyrics file (LRC)", variable=lrc_var).grid(row=0, column=1, padx=5)
 
         save_button = ttk.Button(dialog, text="Save MP3", command=save_mp3)
-        save_button.grid(row=2, column=0, columnspan=4, pady=5)
+        save_button.grid(row=3, column=0, columnspan=4, pady=5)
 
         # Set default values to the current book, chapter, and verse
         start_book_dropdown.set(self.book_var.get())  # Set the current book
@@ -1323,102 +1371,53 @@ class BibleApp(tk.Tk):
         update_end_chapters(None)
         update_end_verses(None)
 
-    def save_audio_threaded(self, text, filename, update_progress, progress_dialog, main_dialog):
-        """Generate and save audio for the given text in a separate thread."""
+    def save_audio_threaded(self, verse_ids, filename, sidecars, show_progress, update_progress, progress_dialog):
+        """Generate and save audio for the given verses in a separate thread."""
         try:
-            asyncio.run(self.save_audio(text, filename))
-            update_progress()
-        except Exception as e:
-            progress_dialog.destroy()
-            messagebox.showerror("Error", f"Failed to create MP3: {e}")
+            def progress(done, total):
+                # Keyed by file, so exports running side by side each keep updating their own dialog
+                self.ui.call(show_progress, done, total, key=("mp3_progress", filename))
 
-    async def save_audio(self, text, filename):
-        """Generate and save audio for the given text."""
-        communicate = edge_tts.Communicate(text, self.voice)
-        await communicate.save(filename)
+            asyncio.run(self.save_audio(verse_ids, filename, sidecars, progress))
+            self.ui.call(update_progress)
+        except Exception as e:
+            self.ui.call(self.show_mp3_error, progress_dialog, e)
+
+    def show_mp3_error(self, progress_dialog, error):
+        """Close the progress dialog and report a failed MP3 export."""
+        progress_dialog.destroy()
+        messagebox.showerror("Error", f"Failed to create MP3: {error}")
+
+    async def save_audio(self, verse_ids, filename, sidecars=None, progress=None):
+        """Generate and save audio for the given verses with chapter markers and optional timing files."""
+        timings = await render_verses(self.tts, self.voice, self.corpus, verse_ids, filename,
+                                      self.silence_pad_ms, self.target_dbfs, progress, estimator=self.durations)
+        sidecars = sidecars or {}
+        if sidecars.get("json"):
+            write_json_sidecar(filename, timings)
+        if sidecars.get("lrc"):
+            write_lrc_sidecar(filename, timings)
 
     def next_unread(self):
-        """Navigate to the next unread verse."""
-        print("=== Finding next unread verse ===")
-        if self.reading:
-            self.stop()
-
-        try:
-            book_abbrev = self.book_full_to_abbrev[self.book_var.get()]
-            book_number = self.book_to_number[book_abbrev]
-            current_chapter = int(self.chapter_var.get())
-            current_verse = int(self.verse_var.get())
-
-            # Get current verse ID
-            current_verse_data = self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == current_chapter) &
-                (self.bible_data["Verse"] == current_verse)
-            ]
-
-            if not current_verse_data.empty:
-                current_verse_id = int(current_verse_data["Verse ID"].values[0])
-
-                # Find the next unread verse
-                next_verses = self.bible_data[self.bible_data["Verse ID"] > current_verse_id]
-
-                for _, verse_data in next_verses.iterrows():
-                    verse_id = int(verse_data["Verse ID"])
-                    if verse_id not in self.read_verses:
-                        # Found next unread verse
-                        self.book_var.set(self.full_book_names[verse_data["Book Number"] - 1])
-                        self.update_chapters()
-                        self.chapter_var.set(str(verse_data["Chapter"]))
-                        self.update_verses()
-                        self.verse_var.set(str(verse_data["Verse"]))
-                        self.navigate()
-                        self.read()
-                        return
-
-            print("No unread verses found")
+        """Navigate to the next unread verse and read it."""
+        self.sync_session()
+        if self.session.next_unread() is None:
             messagebox.showinfo("Complete", "No unread verses found!")
 
-        except Exception as e:
-            print(f"Error in next_unread: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def next_chapter(self):
-        """Navigate to the next chapter or book if the current chapter is the last one."""
-        if self.reading:
-            self.stop()
-
-        book_abbrev = self.book_full_to_abbrev[self.book_var.get()]
-        book_number = self.book_to_number[book_abbrev]
-        current_chapter = int(self.chapter_var.get())
-
-        # Get the next chapter in the current book
-        next_chapter = current_chapter + 1
-        chapters = sorted(self.bible_data[self.bible_data["Book Number"] == book_number]["Chapter"].unique())
-        if next_chapter in chapters:
-            self.chapter_var.set(str(next_chapter))
-            self.update_verses()
-            self.verse_var.set("1")  # Start from the first verse of the next chapter
-            self.navigate()
-            self.read()  # Start reading the first verse of the next chapter
-            return
-
-        # If no next chapter in the current book, move to the next book
-        next_book_index = self.full_book_names.index(self.book_var.get()) + 1
-        if next_book_index < len(self.full_book_names):
-            self.book_var.set(self.full_book_names[next_book_index])
-            self.update_chapters()
-            self.chapter_var.set("1")  # Start from the first chapter of the next book
-            self.update_verses()
-            self.verse_var.set("1")  # Start from the first verse of the first chapter of the next book
-            self.navigate()
-            self.read()  # Start reading the first verse of the first chapter of the next book
-            return
-
-        # If no next book, stay at the last verse
-        self.verse_var.set(str(self.verse_dropdown['values'][-1]))
-        self.navigate()
-        self.pause()
+    def verse_ids_in_range(self, start_book_number, start_chapter, start_verse, end_book_number, end_chapter, end_verse):
+        """Return the Verse IDs from the start verse to the end verse, inclusive."""
+        return self.bible_data[
+            ((self.bible_data["Book Number"] > start_book_number) |
+            ((self.bible_data["Book Number"] == start_book_number) & 
+            ((self.bible_data["Chapter"] > start_chapter) |
+            ((self.bible_data["Chapter"] == start_chapter) & 
+                (self.bible_data["Verse"] >= start_verse))))) &
+            ((self.bible_data["Book Number"] < end_book_number) |
+            ((self.bible_data["Book Number"] == end_book_number) & 
+            ((self.bible_data["Chapter"] < end_chapter) |
+            ((self.bible_data["Chapter"] == end_chapter) & 
+                (self.bible_data["Verse"] <= end_verse)))))
+        ]["Verse ID"].astype(int).tolist()
 
     def create_mark_section_dialog(self):
         """Create a dialog to select a range of verses to mark as completed."""
@@ -1463,7 +1462,7 @@ class BibleApp(tk.Tk):
                 return
             book_abbrev = self.book_full_to_abbrev[book_name]
             book_number = self.book_to_number[book_abbrev]
-            chapters = sorted(self.bible_data[self.bible_data["Book Number"] == book_number]["Chapter"].unique())
+            chapters = self.corpus.book_chapters.get(book_number, [])
             start_chapter_dropdown['values'] = chapters
             if chapters:
                 start_chapter_dropdown.set(chapters[0])
@@ -1477,10 +1476,7 @@ class BibleApp(tk.Tk):
             book_abbrev = self.book_full_to_abbrev[book_name]
             book_number = self.book_to_number[book_abbrev]
             chapter = int(chapter)
-            verses = sorted(self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == chapter)
-            ]["Verse"].unique())
+            verses = self.corpus.chapter_verses.get((book_number, chapter), [])
             start_verse_dropdown['values'] = verses
             if verses:
                 start_verse_dropdown.set(verses[0])
@@ -1491,7 +1487,7 @@ class BibleApp(tk.Tk):
                 return
             book_abbrev = self.book_full_to_abbrev[book_name]
             book_number = self.book_to_number[book_abbrev]
-            chapters = sorted(self.bible_data[self.bible_data["Book Number"] == book_number]["Chapter"].unique())
+            chapters = self.corpus.book_chapters.get(book_number, [])
             end_chapter_dropdown['values'] = chapters
             if chapters:
                 end_chapter_dropdown.set(chapters[0])
@@ -1505,10 +1501,7 @@ class BibleApp(tk.Tk):
             book_abbrev = self.book_full_to_abbrev[book_name]
             book_number = self.book_to_number[book_abbrev]
             chapter = int(chapter)
-            verses = sorted(self.bible_data[
-                (self.bible_data["Book Number"] == book_number) &
-                (self.bible_data["Chapter"] == chapter)
-            ]["Verse"].unique())
+            verses = self.corpus.chapter_verses.get((book_number, chapter), [])
             end_verse_dropdown['values'] = verses
             if verses:
                 end_verse_dropdown.set(verses[-1])
@@ -1546,28 +1539,9 @@ class BibleApp(tk.Tk):
                 messagebox.showerror("Invalid Range", "The starting verse must come before the ending verse.")
                 return
 
-            # Get all verse IDs in the range
-            verses_in_range = self.bible_data[
-                ((self.bible_data["Book Number"] > start_book_number) |
-                ((self.bible_data["Book Number"] == start_book_number) & 
-                ((self.bible_data["Chapter"] > start_chapter) |
-                ((self.bible_data["Chapter"] == start_chapter) & 
-                    (self.bible_data["Verse"] >= start_verse))))) &
-                ((self.bible_data["Book Number"] < end_book_number) |
-                ((self.bible_data["Book Number"] == end_book_number) & 
-                ((self.bible_data["Chapter"] < end_chapter) |
-                ((self.bible_data["Chapter"] == end_chapter) & 
-                    (self.bible_data["Verse"] <= end_verse)))))
-            ]["Verse ID"].astype(int).tolist()
-
-            # Add these verse IDs to read_verses if not already present
-            new_verses = [v for v in verses_in_range if v not in self.read_verses]
-            if new_verses:
-                self.read_verses.extend(new_verses)
-                with open(self.read_verses_file, "a", newline='') as f:
-                    writer = csv.writer(f)
-                    for verse_id in new_verses:
-                        writer.writerow([verse_id])
+            # Add the verse IDs in the range to read_verses if not already present
+            self.session.mark_read(self.verse_ids_in_range(start_book_number, start_chapter, start_verse,
+                                                   end_book_number, end_chapter, end_verse))
 
             # Refresh display
             self.navigate()
@@ -1593,5 +1567,12 @@ class BibleApp(tk.Tk):
         update_end_verses(None)
 
 if __name__ == "__main__":
-    app = BibleApp()
+    parser = argparse.ArgumentParser(description="Bible Reader")
+    parser.add_argument("--profile", help="reading profile to open, created if it doesn't exist "
+                                          "(default: the one used last)")
+    args = parser.parse_args()
+    if args.profile is not None and not valid_profile_name(args.profile):
+        parser.error(f"Invalid profile name: {args.profile}")
+    instrumentation.configure_from_environment()
+    app = BibleApp(args.profile)
     app.mainloop()
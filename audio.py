@@ -0,0 +1,379 @@
+# This module holds the audio stages of the reading pipeline: the text-to-speech backend that turns
+# verse text into an MP3 file, MP3 decoding into PCM and streaming MP3 encoding, silence trimming and
+# loudness normalization, pitch-preserving time-stretching for faster playback, an in-memory cache of
+# decoded clips, and playback of PCM on an output device.
+# None of it depends on Tk, so it can be driven by the headless reading engine and the benchmarks.
+
+import io
+import os
+import queue
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+
+import numpy as np
+import edge_tts
+import pyaudio
+from pydub import AudioSegment
+
+import instrumentation
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_FRAMES = 512
+DEFAULT_BUFFER_CHUNKS = 4
+DEFAULT_CACHE_MB = 64
+DEFAULT_SILENCE_PAD_MS = 80
+DEFAULT_TARGET_DBFS = -20.0
+SPEEDS = (0.75, 1.0, 1.25, 1.5, 1.75, 2.0, 2.5, 3.0)
+
+
+class EdgeTTS:
+    """Text-to-speech through the edge-tts online voices."""
+    max_rate = 2.0  # Fastest speaking rate requested from the service; faster speeds are time-stretched
+
+    async def list_voices(self):
+        voices = await edge_tts.list_voices()
+        return [v["ShortName"] for v in voices]
+
+    async def synthesize(self, text, voice, filename, rate=1.0):
+        """Synthesize text with the given voice and speaking rate (1.0 = normal) and save it as an MP3 file."""
+        with instrumentation.span("tts.synthesize", characters=len(text), rate=rate):
+            communicate = edge_tts.Communicate(text, voice, rate=f"{round((rate - 1) * 100):+d}%")
+            await communicate.save(filename)
+
+
+class Clip:
+    """Decoded PCM audio."""
+
+    def __init__(self, data, sample_width, channels, frame_rate):
+        self.data = data
+        self.sample_width = sample_width
+        self.channels = channels
+        self.frame_rate = frame_rate
+
+    @property
+    def frame_size(self):
+        return self.sample_width * self.channels
+
+    @property
+    def frame_count(self):
+        return len(self.data) // self.frame_size
+
+    @property
+    def duration(self):
+        """Length in seconds."""
+        return self.frame_count / self.frame_rate
+
+
+def decode_mp3(source):
+    """Decode an MP3 file, or MP3 data (bytes or a memoryview), into a Clip."""
+    with instrumentation.span("audio.decode"):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            segment = AudioSegment.from_mp3(io.BytesIO(source))
+            source = "MP3 data"
+        else:
+            segment = AudioSegment.from_mp3(source)
+    clip = Clip(segment.raw_data, segment.sample_width, segment.channels, segment.frame_rate)
+    if clip.frame_count == 0:
+        raise ValueError(f"{source} contains no audio")
+    return clip
+
+
+class Mp3Encoder:
+    """Encodes clips into an MP3 file as they are written, through one ffmpeg process.
+
+    Memory use doesn't grow with the length of the file: every clip goes straight into the encoder pipe.
+    """
+    _PCM_FORMATS = {1: "u8", 2: "s16le", 4: "s32le"}
+
+    def __init__(self, path, sample_width, channels, frame_rate):
+        self.path = path
+        self.format = (sample_width, channels, frame_rate)
+        self.frames = 0
+        self._process = subprocess.Popen(
+            [AudioSegment.converter, "-y", "-loglevel", "error",
+             "-f", self._PCM_FORMATS[sample_width], "-ar", str(frame_rate), "-ac", str(channels), "-i", "pipe:0",
+             "-f", "mp3", path],
+            stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, clip):
+        if (clip.sample_width, clip.channels, clip.frame_rate) != self.format:
+            raise ValueError("Clips written to one MP3 must have the same audio format")
+        with instrumentation.span("audio.encode", frames=clip.frame_count):
+            try:
+                self._process.stdin.write(clip.data)
+            except BrokenPipeError:
+                self.close()  # Raises with ffmpeg's error message
+                raise
+        self.frames += clip.frame_count
+
+    def close(self):
+        """Finish the file. Raises RuntimeError if ffmpeg failed."""
+        if self._process.stdin and not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+        error = self._process.stderr.read().decode("utf-8", "replace").strip()
+        self._process.stderr.close()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"Encoding {self.path} failed: {error}")
+
+    def abort(self):
+        """Stop encoding and remove the unfinished file."""
+        self._process.kill()
+        self._process.wait()
+        for stream in (self._process.stdin, self._process.stderr):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+_SAMPLE_TYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def _to_float(clip):
+    """Return the clip's samples as a float32 (frames, channels) array centred on 0, and the sample type."""
+    dtype = _SAMPLE_TYPES[clip.sample_width]
+    samples = np.frombuffer(clip.data, dtype=dtype).reshape(-1, clip.channels).astype(np.float32)
+    if dtype is np.uint8:
+        samples -= 128
+    return samples, dtype
+
+
+def _from_float(samples, dtype, clip):
+    """Build a clip like clip from float samples produced by _to_float."""
+    if dtype is np.uint8:
+        samples = samples + 128
+    info = np.iinfo(dtype)
+    data = np.clip(np.rint(samples), info.min, info.max).astype(dtype).tobytes()
+    return Clip(data, clip.sample_width, clip.channels, clip.frame_rate)
+
+
+def _full_scale(dtype):
+    return 128.0 if dtype is np.uint8 else float(np.iinfo(dtype).max)
+
+
+def trim_silence(clip, pad_ms=DEFAULT_SILENCE_PAD_MS, threshold_dbfs=-50.0):
+    """Cut leading and trailing audio quieter than threshold_dbfs, keeping pad_ms of it at each end."""
+    if clip.sample_width not in _SAMPLE_TYPES:
+        return clip
+    samples, dtype = _to_float(clip)
+    level = np.abs(samples).max(axis=1)
+    loud = np.flatnonzero(level > _full_scale(dtype) * 10 ** (threshold_dbfs / 20))
+    if not loud.size:
+        return clip  # All silence; leave it alone rather than produce an empty clip
+    pad = int(clip.frame_rate * pad_ms / 1000)
+    start = max(0, loud[0] - pad)
+    end = min(len(samples), loud[-1] + 1 + pad)
+    return Clip(clip.data[start * clip.frame_size:end * clip.frame_size],
+                clip.sample_width, clip.channels, clip.frame_rate)
+
+
+def normalize_loudness(clip, target_dbfs=DEFAULT_TARGET_DBFS, peak_dbfs=-1.0):
+    """Scale clip to an RMS level of target_dbfs, without letting its peak go above peak_dbfs."""
+    if clip.sample_width not in _SAMPLE_TYPES:
+        return clip
+    samples, dtype = _to_float(clip)
+    full_scale = _full_scale(dtype)
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+    peak = float(np.abs(samples).max())
+    if rms == 0:
+        return clip
+    gain = min(full_scale * 10 ** (target_dbfs / 20) / rms, full_scale * 10 ** (peak_dbfs / 20) / peak)
+    if abs(gain - 1.0) < 0.01:
+        return clip
+    return _from_float(samples * gain, dtype, clip)
+
+
+def polish(clip, pad_ms=DEFAULT_SILENCE_PAD_MS, target_dbfs=DEFAULT_TARGET_DBFS):
+    """Trim the silence around a freshly synthesized clip and normalize its loudness.
+
+    pad_ms None keeps the silence and target_dbfs None keeps the volume.
+    """
+    with instrumentation.span("audio.polish", frames=clip.frame_count):
+        if pad_ms is not None:
+            clip = trim_silence(clip, pad_ms)
+        if target_dbfs is not None:
+            clip = normalize_loudness(clip, target_dbfs)
+    return clip
+
+
+def time_stretch(clip, speed, window_ms=30, tolerance_ms=10):
+    """Return clip played speed times faster without changing its pitch.
+
+    Uses WSOLA: overlapping windows are taken from the input at speed times the output hop, each one
+    shifted by up to tolerance_ms to line up with the waveform already written, and overlap-added. The
+    input after the middle of the last window is kept as is; a clip shorter than one window plus the
+    tolerance is returned unchanged.
+    """
+    if clip.sample_width not in _SAMPLE_TYPES or abs(speed - 1.0) < 0.01:
+        return clip
+    window_frames = max(32, int(clip.frame_rate * window_ms / 1000)) & ~1
+    tolerance = int(clip.frame_rate * tolerance_ms / 1000)
+    if clip.frame_count < window_frames + tolerance:
+        return clip
+
+    with instrumentation.span("audio.time_stretch", speed=speed, frames=clip.frame_count):
+        samples, dtype = _to_float(clip)
+        mono = samples.mean(axis=1)
+        hop_out = window_frames // 2
+        hop_in = hop_out * speed
+        window = np.hanning(window_frames).astype(np.float32)
+
+        steps = int((len(samples) - window_frames - tolerance) / hop_in) + 1
+        out = np.zeros((steps * hop_out + window_frames, clip.channels), dtype=np.float32)
+        weight = np.zeros(len(out), dtype=np.float32)
+        previous = None
+        for step in range(steps):
+            start = int(step * hop_in)
+            if previous is not None:
+                # Pick the offset whose window best continues the previous window's waveform
+                target = mono[previous + hop_out:previous + hop_out + window_frames]
+                low = max(0, start - tolerance)
+                region = mono[low:start + tolerance + window_frames]
+                if len(target) == window_frames and len(region) >= window_frames:
+                    start = low + int(np.argmax(np.correlate(region, target, mode="valid")))
+            position = step * hop_out
+            out[position:position + window_frames] += samples[start:start + window_frames] * window[:, None]
+            weight[position:position + window_frames] += window
+            previous = start
+
+        out /= np.maximum(weight, 1e-3)[:, None]
+        # Before the middle of the first window and after the middle of the last one only that window
+        # contributes, so the input is used as is there (its near-zero weights would amplify rounding)
+        out[:hop_out] = samples[:hop_out]
+        out = np.concatenate((out[:steps * hop_out], samples[previous + hop_out:]))
+        return _from_float(out, dtype, clip)
+
+
+class ClipCache:
+    """Least recently used cache of decoded clips, limited to max_mb of PCM."""
+
+    def __init__(self, max_mb=DEFAULT_CACHE_MB):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.size = 0
+        self._clips = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            clip = self._clips.get(key)
+            if clip is not None:
+                self._clips.move_to_end(key)
+        instrumentation.count("audio.cache_hits" if clip is not None else "audio.cache_misses")
+        return clip
+
+    def put(self, key, clip):
+        with self._lock:
+            old = self._clips.pop(key, None)
+            if old is not None:
+                self.size -= len(old.data)
+            self._clips[key] = clip
+            self.size += len(clip.data)
+            while self.size > self.max_bytes and len(self._clips) > 1:
+                _, evicted = self._clips.popitem(last=False)
+                self.size -= len(evicted.data)
+
+    def clear(self):
+        with self._lock:
+            self._clips.clear()
+            self.size = 0
+
+    def discard(self, predicate):
+        """Drop the clips whose key matches predicate(key)."""
+        with self._lock:
+            for key in [key for key in self._clips if predicate(key)]:
+                self.size -= len(self._clips.pop(key).data)
+
+
+class Player:
+    """Plays clips on an output device in PyAudio callback mode.
+
+    chunk_frames is the size of each buffer handed to the device and buffer_chunks how many buffers are
+    queued ahead of it. Smaller values make pause and stop react faster; larger values ride out a busy
+    machine without underruns.
+    """
+
+    def __init__(self, interface_factory=pyaudio.PyAudio, chunk_frames=DEFAULT_CHUNK_FRAMES,
+                 buffer_chunks=DEFAULT_BUFFER_CHUNKS):
+        self.interface_factory = interface_factory
+        self.chunk_frames = max(64, int(chunk_frames))
+        self.buffer_chunks = max(1, int(buffer_chunks))
+
+    def play(self, clip, token):
+        """Play clip until it ends or token is cancelled. Returns True if it played to the end."""
+        chunk_bytes = self.chunk_frames * clip.frame_size
+        silence = bytes(chunk_bytes)
+        data = memoryview(clip.data)
+        # The clip's chunks followed by None; a short last chunk also ends playback
+        pending = (bytes(data[offset:offset + chunk_bytes]) or None
+                   for offset in range(0, len(data) + 1, chunk_bytes))
+        chunks = queue.Queue(maxsize=self.buffer_chunks)
+        done = threading.Event()
+
+        def callback(in_data, frame_count, time_info, status):
+            if status & pyaudio.paOutputUnderflow:
+                instrumentation.count("audio.underruns")
+            if token.cancelled:
+                done.set()
+                return silence[:frame_count * clip.frame_size], pyaudio.paComplete
+            if token.paused:
+                return silence[:frame_count * clip.frame_size], pyaudio.paContinue
+            try:
+                chunk = chunks.get_nowait()
+            except queue.Empty:
+                instrumentation.count("audio.underruns")  # The feeder fell behind the device
+                return silence[:frame_count * clip.frame_size], pyaudio.paContinue
+            if chunk is None or len(chunk) < chunk_bytes:
+                done.set()
+                return chunk or b"", pyaudio.paComplete
+            return chunk, pyaudio.paContinue
+
+        # Fill the buffer before the device starts asking for audio
+        for chunk in pending:
+            chunks.put_nowait(chunk)
+            if chunks.full() or chunk is None:
+                break
+
+        with instrumentation.span("audio.device_open"):
+            interface = self.interface_factory()
+            stream = interface.open(
+                format=interface.get_format_from_width(clip.sample_width),
+                channels=clip.channels,
+                rate=clip.frame_rate,
+                output=True,
+                frames_per_buffer=self.chunk_frames,
+                stream_callback=callback
+            )
+        instrumentation.gauge("audio.output_latency_ms", stream.get_output_latency() * 1000)
+
+        token.add_callback(done.set)
+        try:
+            chunk_seconds = self.chunk_frames / clip.frame_rate
+            with instrumentation.span("audio.playback", frames=clip.frame_count):
+                for chunk in pending:
+                    # Wait for room in the buffer, giving up as soon as playback ends
+                    while not done.is_set():
+                        try:
+                            chunks.put(chunk, timeout=chunk_seconds)
+                            break
+                        except queue.Full:
+                            pass
+                    if chunk is None or done.is_set():
+                        break
+                done.wait()
+            return not token.cancelled
+        finally:
+            token.remove_callback(done.set)
+            try:
+                stream.stop_stream()
+                stream.close()
+            except Exception as e:
+                log.error("Error closing audio stream: %s", e)
+            interface.terminate()
@@ -0,0 +1,289 @@
+# This module reads and writes audio bundles: the synthesized audio of every verse of a translation in one
+# voice, packed into a single file so reading aloud works offline and without synthesis delay, and so the
+# audio can be copied to another machine as one file instead of tens of thousands.
+#
+# Layout (native byte order, little-endian on every supported platform):
+#   header     magic "BIBLEAUD", version (u16), reserved (u16), verse count (u32), metadata length (u32)
+#   metadata   JSON (translation, voice, format), padded to 8 bytes
+#   index      data offsets (u64 each), then Verse IDs (u32, sorted), clip lengths (u32) and CRC-32 of
+#              each verse's text (u32), one entry per verse
+#   data       the verses' MP3 clips, back to back
+#
+# Bundles are memory-mapped. The index and the clips are read straight from the mapping without copying
+# them into memory, and the text checksums let a reader skip verses whose text has changed since the
+# bundle was built. Building a bundle again reuses every clip that is still current.
+#
+# Usage:
+#   python audio_bundle.py --translation kjv.csv --voice en-US-SteffanNeural
+
+import os
+import mmap
+import json
+import zlib
+import bisect
+import struct
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+from array import array
+
+import instrumentation
+from audio import EdgeTTS
+from file_lock import FileLock
+from profiles import Profiles, DEFAULT_PROFILE
+from storage import Storage
+from translations import TranslationManager
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"BIBLEAUD"
+VERSION = 1
+HEADER = struct.Struct("=8sHHII")
+BUNDLE_DIR = "Audio_Bundles"
+BATCH_SIZE = 64  # Verses synthesized before they are written out in order
+DEFAULT_CONCURRENCY = 8
+
+
+def bundle_path(directory, translation, voice):
+    return os.path.join(directory, f"{translation} {voice}.bundle")
+
+
+def text_checksum(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _padded(length):
+    return (length + 7) & ~7
+
+
+class AudioBundle:
+    def __init__(self, path):
+        self.path = path
+        # get() may run on the reading thread while the Tk thread closes a bundle it replaced
+        self._lock = threading.Lock()
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # Empty file
+            self._file.close()
+            raise ValueError(f"{path} is not an audio bundle")
+        view = memoryview(self._map)
+        if len(view) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not an audio bundle")
+        magic, version, _, count, metadata_length = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} audio bundle")
+
+        position = HEADER.size
+        self.metadata = json.loads(bytes(view[position:position + metadata_length]))
+        position += _padded(metadata_length)
+        self._views = [view]
+
+        def table(code, size):
+            nonlocal position
+            table = view[position:position + count * size].cast(code)
+            position += count * size
+            self._views.append(table)
+            return table
+
+        self._offsets = table("Q", 8)
+        self.verse_ids = table("I", 4)
+        self._lengths = table("I", 4)
+        self._checksums = table("I", 4)
+
+    @property
+    def translation(self):
+        return self.metadata.get("translation")
+
+    @property
+    def voice(self):
+        return self.metadata.get("voice")
+
+    def __len__(self):
+        return len(self.verse_ids)
+
+    def __contains__(self, verse_id):
+        return self._index(verse_id) is not None
+
+    def _index(self, verse_id):
+        index = bisect.bisect_left(self.verse_ids, verse_id)
+        if index < len(self.verse_ids) and self.verse_ids[index] == verse_id:
+            return index
+        return None
+
+    def get(self, verse_id, text=None):
+        """The MP3 clip of a verse as a memoryview into the bundle, or None.
+
+        With text, None is also returned if the verse's text has changed since the bundle was built, and
+        always once the bundle has been closed.
+        """
+        with self._lock:
+            if not self._views:
+                return None
+            index = self._index(verse_id)
+            if index is None:
+                return None
+            if text is not None and self._checksums[index] != text_checksum(text):
+                return None
+            offset = self._offsets[index]
+            return self._views[0][offset:offset + self._lengths[index]]
+
+    def close(self):
+        """Unmap the bundle (safe while another thread calls get()). Clips returned by get() stay readable;
+        the mapping is closed once the last of them is released."""
+        with self._lock:
+            for view in reversed(getattr(self, "_views", [])):
+                view.release()
+            self._views = []
+            try:
+                self._map.close()
+            except (AttributeError, BufferError):
+                pass  # Still in use by a clip being decoded; the mapping is closed when it is released
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_bundle(directory, translation, voice):
+    """Open the bundle of a translation and voice in directory, or return None if there isn't a usable one."""
+    path = bundle_path(directory, translation, voice)
+    if not os.path.exists(path):
+        return None
+    try:
+        bundle = AudioBundle(path)
+    except (OSError, ValueError) as e:
+        log.error("Could not open audio bundle %s: %s", path, e)
+        return None
+    if bundle.voice != voice or bundle.translation != translation:
+        bundle.close()
+        return None
+    log.info("Using audio bundle %s (%d verses)", path, len(bundle))
+    return bundle
+
+
+async def build_bundle(tts, voice, corpus, translation, path, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    """Write the bundle of a translation and voice to path, reusing the clips of an existing bundle there.
+
+    progress(done, total) is called after each batch. Returns (verses synthesized, verses reused).
+    Raises RuntimeError if another process is building the same bundle.
+    """
+    lock = FileLock(path + ".lock")
+    if not lock.acquire(blocking=False):
+        raise RuntimeError(f"{path} is already being built by another process")
+    try:
+        return await _build_bundle(tts, voice, corpus, translation, path, concurrency, progress)
+    finally:
+        lock.release()
+
+
+async def _build_bundle(tts, voice, corpus, translation, path, concurrency, progress):
+    old = None
+    if os.path.exists(path):
+        try:
+            old = AudioBundle(path)
+            if old.voice != voice:
+                old.close()
+                old = None
+        except (OSError, ValueError):
+            old = None
+
+    verse_ids = list(corpus.verse_ids)
+    metadata = json.dumps({"translation": translation, "voice": voice, "format": "mp3"}).encode("utf-8")
+    data_start = HEADER.size + _padded(len(metadata)) + len(verse_ids) * 20
+    offsets, lengths, checksums = array("Q"), array("I"), array("I")
+    semaphore = asyncio.Semaphore(concurrency)
+    synthesized = reused = 0
+
+    async def synthesize(temp_dir, verse_id):
+        mp3_file = os.path.join(temp_dir, f"{verse_id}.mp3")
+        async with semaphore:
+            await tts.synthesize(corpus.verse_texts[verse_id], voice, mp3_file)
+        with open(mp3_file, "rb") as f:
+            data = f.read()
+        os.remove(mp3_file)
+        return data
+
+    temp_path = path + ".tmp"
+    try:
+        with instrumentation.span("bundle.build", verses=len(verse_ids)), \
+                tempfile.TemporaryDirectory(prefix="bible_bundle_") as temp_dir, open(temp_path, "wb") as f:
+            f.seek(data_start)
+            for start in range(0, len(verse_ids), BATCH_SIZE):
+                batch = verse_ids[start:start + BATCH_SIZE]
+                clips = [old.get(verse_id, corpus.verse_texts[verse_id]) if old else None for verse_id in batch]
+                missing = [index for index, clip in enumerate(clips) if clip is None]
+                results = await asyncio.gather(*(synthesize(temp_dir, batch[index]) for index in missing))
+                for index, data in zip(missing, results):
+                    clips[index] = data
+                synthesized += len(missing)
+                reused += len(batch) - len(missing)
+
+                for verse_id, clip in zip(batch, clips):
+                    offsets.append(f.tell())
+                    lengths.append(len(clip))
+                    checksums.append(text_checksum(corpus.verse_texts[verse_id]))
+                    f.write(clip)
+                if progress:
+                    progress(start + len(batch), len(verse_ids))
+
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(verse_ids), len(metadata)))
+            f.write(metadata.ljust(_padded(len(metadata)), b" "))
+            for table in (offsets, array("I", verse_ids), lengths, checksums):
+                table.tofile(f)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        if old is not None:
+            old.close()
+
+    os.replace(temp_path, path)
+    return synthesized, reused
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline audio bundle of a translation.")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="reading profile (default: %(default)s)")
+    parser.add_argument("--translation", help="translation file (default: the one selected in the app)")
+    parser.add_argument("--voice", help="voice (default: the one selected in the app)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="synthesis requests in flight")
+    args = parser.parse_args()
+    instrumentation.configure_from_environment()
+
+    profiles = Profiles()
+    if not profiles.exists(args.profile):
+        parser.error(f"No profile named {args.profile}")
+    storage = Storage(profiles.database(args.profile))
+    settings = storage.get_settings()
+    storage.close()
+
+    translation_file = args.translation or settings.get("Translation", "net.csv")
+    voice = args.voice or settings.get("Voice", "en-US-SteffanNeural")
+    corpus = TranslationManager(".").get(translation_file)
+    translation = translation_file.split(".")[0]
+
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), BUNDLE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    path = bundle_path(directory, translation, voice)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} verses", end="", flush=True)
+
+    synthesized, reused = asyncio.run(build_bundle(EdgeTTS(), voice, corpus, translation, path,
+                                                   args.concurrency, progress))
+    print(f"\nSynthesized {synthesized} verses and reused {reused} into {path}")
+
+
+if __name__ == "__main__":
+    main()
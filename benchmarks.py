@@ -0,0 +1,435 @@
+# This script runs a headless benchmark suite over the application's hot paths and writes the results
+# as JSON so runs can be compared. It generates a synthetic 31,102-verse corpus in the same CSV schema as
+# net.csv, drives the BibleApp methods with stand-in widgets (no display needed) and the ReadingSession
+# engine with stub text-to-speech and audio output backends, so no network or sound device is used.
+#
+# Usage:
+#   python benchmarks.py --output results.json
+#   python benchmarks.py --output new.json --compare results.json
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+
+import pyaudio
+
+import Bible
+from audio import Player
+from duration_model import DurationEstimator
+from reading_session import ReadingSession
+from storage import Storage
+from ui_dispatch import UIDispatcher
+from translations import TranslationManager, REQUIRED_COLUMNS
+
+# (abbreviation, full name, chapters) for the 66 books
+BOOKS = [
+    ("Gen", "Genesis", 50), ("Exo", "Exodus", 40), ("Lev", "Leviticus", 27), ("Num", "Numbers", 36),
+    ("Deu", "Deuteronomy", 34), ("Jos", "Joshua", 24), ("Jdg", "Judges", 21), ("Rut", "Ruth", 4),
+    ("1Sa", "1 Samuel", 31), ("2Sa", "2 Samuel", 24), ("1Ki", "1 Kings", 22), ("2Ki", "2 Kings", 25),
+    ("1Ch", "1 Chronicles", 29), ("2Ch", "2 Chronicles", 36), ("Ezr", "Ezra", 10), ("Neh", "Nehemiah", 13),
+    ("Est", "Esther", 10), ("Job", "Job", 42), ("Psa", "Psalms", 150), ("Pro", "Proverbs", 31),
+    ("Ecc", "Ecclesiastes", 12), ("Sng", "Song of Solomon", 8), ("Isa", "Isaiah", 66), ("Jer", "Jeremiah", 52),
+    ("Lam", "Lamentations", 5), ("Eze", "Ezekiel", 48), ("Dan", "Daniel", 12), ("Hos", "Hosea", 14),
+    ("Joe", "Joel", 3), ("Amo", "Amos", 9), ("Oba", "Obadiah", 1), ("Jon", "Jonah", 4),
+    ("Mic", "Micah", 7), ("Nah", "Nahum", 3), ("Hab", "Habakkuk", 3), ("Zep", "Zephaniah", 3),
+    ("Hag", "Haggai", 2), ("Zec", "Zechariah", 14), ("Mal", "Malachi", 4), ("Mat", "Matthew", 28),
+    ("Mar", "Mark", 16), ("Luk", "Luke", 24), ("Joh", "John", 21), ("Act", "Acts", 28),
+    ("Rom", "Romans", 16), ("1Co", "1 Corinthians", 16), ("2Co", "2 Corinthians", 13), ("Gal", "Galatians", 6),
+    ("Eph", "Ephesians", 6), ("Phi", "Philippians", 4), ("Col", "Colossians", 4), ("1Th", "1 Thessalonians", 5),
+    ("2Th", "2 Thessalonians", 3), ("1Ti", "1 Timothy", 6), ("2Ti", "2 Timothy", 4), ("Tit", "Titus", 3),
+    ("Phm", "Philemon", 1), ("Heb", "Hebrews", 13), ("Jam", "James", 5), ("1Pe", "1 Peter", 5),
+    ("2Pe", "2 Peter", 3), ("1Jo", "1 John", 5), ("2Jo", "2 John", 1), ("3Jo", "3 John", 1),
+    ("Jud", "Jude", 1), ("Rev", "Revelation", 22),
+]
+TOTAL_VERSES = 31102
+WORDS = ("the and of to that in he shall unto for i his a lord they be is him not them it with all thou "
+         "thy was god which my me said but ye their have will said people house land king day").split()
+
+
+def generate_corpus(path, seed=1):
+    """Write a synthetic translation CSV with 31,102 verses and the same columns as net.csv."""
+    rng = random.Random(seed)
+    chapters = [(book_number, chapter) for book_number, (_, _, count) in enumerate(BOOKS, 1)
+                for chapter in range(1, count + 1)]
+    verse_counts = {key: rng.randint(10, 40) for key in chapters}
+    verse_counts[(19, 119)] = 176  # Psalm 119, the longest chapter
+
+    # Adjust random chapters until the total matches the real verse count
+    adjustable = [key for key in chapters if key != (19, 119)]
+    difference = TOTAL_VERSES - sum(verse_counts.values())
+    while difference:
+        key = rng.choice(adjustable)
+        step = 1 if difference > 0 else -1
+        if verse_counts[key] + step >= 2:
+            verse_counts[key] += step
+            difference -= step
+
+    with open(path, "w", newline='', encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(REQUIRED_COLUMNS)
+        verse_id = 1
+        for book_number, chapter in chapters:
+            abbreviation, full_name, _ = BOOKS[book_number - 1]
+            for verse in range(1, verse_counts[(book_number, chapter)] + 1):
+                text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 45))).capitalize() + "."
+                writer.writerow([verse_id, book_number, abbreviation, full_name, chapter, verse, text])
+                verse_id += 1
+
+
+# === Stand-ins for the Tk widgets and variables ===
+
+class FakeVar:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeWidget:
+    """Accepts any widget call and remembers option assignments such as widget['values'] = [...]."""
+
+    def __init__(self):
+        self.options = {}
+
+    def __setitem__(self, key, value):
+        self.options[key] = value
+
+    def __getitem__(self, key):
+        return self.options.get(key, ())
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeText(FakeWidget):
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def delete(self, *args):
+        self.chunks.clear()
+
+    def insert(self, index, text):
+        self.chunks.append(text)
+
+    def get(self, *args):
+        return "".join(self.chunks)
+
+    def count(self, *args):
+        return (self.get().count("\n") + 1,)
+
+    def winfo_height(self):
+        return 400
+
+
+# === Stub audio backends ===
+
+class StubTTS:
+    """Replaces EdgeTTS; every verse "synthesizes" to a copy of the same MP3 file."""
+
+    def __init__(self, stub_mp3=None):
+        self.stub_mp3 = stub_mp3
+
+    async def list_voices(self):
+        return []
+
+    async def synthesize(self, text, voice, filename, rate=1.0):
+        shutil.copyfile(self.stub_mp3, filename)
+
+
+class NullAudioStream:
+    """Pulls buffers from the stream callback at the clip's real-time rate without playing them."""
+
+    def __init__(self, rate, frames_per_buffer, stream_callback):
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.callback = stream_callback
+        self.active = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        NullAudioInterface.stream_starts.append(time.perf_counter())
+        while self.active:
+            data, flag = self.callback(None, self.frames_per_buffer, {}, 0)
+            if flag != pyaudio.paContinue:
+                NullAudioInterface.stream_ends.append(time.perf_counter())
+                break
+            time.sleep(self.frames_per_buffer / self.rate)
+
+    def get_output_latency(self):
+        return 0.0
+
+    def stop_stream(self):
+        self.active = False
+
+    def close(self):
+        pass
+
+
+class NullAudioInterface:
+    """Replaces pyaudio.PyAudio; records when each clip starts and stops instead of playing it."""
+    stream_starts = []
+    stream_ends = []
+
+    def get_format_from_width(self, width):
+        return width
+
+    def open(self, rate, frames_per_buffer, stream_callback, **kwargs):
+        return NullAudioStream(rate, frames_per_buffer, stream_callback)
+
+    def terminate(self):
+        pass
+
+
+class HeadlessApp(Bible.BibleApp):
+    """BibleApp without a Tk window. UI callbacks run when ui.drain() is called."""
+
+    def __init__(self, directory):
+        self.tk = None  # Keeps tk.Tk.__getattr__ from recursing
+        self.ui = UIDispatcher(self)
+        self._navigation_depth = 0
+        self._redraw_pending = False
+        self.default_voice = "en-US-SteffanNeural"
+        self.default_skip_read_verses = False
+        self.default_text_size = 12
+        self.default_translation = "bench.csv"
+        self.default_speed = 1.0
+        self.voice = self.default_voice
+        self.speed = self.default_speed
+        self.current_translation = self.default_translation
+
+        self.tts = StubTTS()
+        self.storage = Storage(os.path.join(directory, "bible_reader.db"))
+        self.storage.set_meta("migrated_reading_state", 1)  # Don't import CSV files from the working directory
+        self.shared_storage = self.storage
+        self.durations = DurationEstimator(self.storage)
+        self.settings = self.storage.get_settings()
+        self.config_file = os.path.join(directory, "config.ini")
+        self.notes_file = os.path.join(directory, "notes.csv")
+        self.translations = TranslationManager(directory)
+
+        self.book_var, self.chapter_var, self.verse_var = FakeVar(), FakeVar(), FakeVar()
+        self.skip_read_verses = FakeVar(False)
+        self.text_size = FakeVar(12)
+        for name in ("book_dropdown", "chapter_dropdown", "verse_dropdown", "read_button",
+                     "next_unread_button", "pause_button", "plan_label"):
+            setattr(self, name, FakeWidget())
+        self.verse_display = FakeText()
+        self.notes_text = FakeText()
+
+        self.notes = {}
+
+        self.load_bible_data()
+        self.full_book_names = self.books_data["Full Book Name"].tolist()
+        self.session = ReadingSession(self.corpus, self.voice, translation=self.translation_key(),
+                                      storage=self.storage, tts=self.tts, temp_dir=directory,
+                                      player=Player(interface_factory=NullAudioInterface))
+        self.connect_session()
+
+    # Tk replacement; timers are never fired
+    def after(self, ms, func=None, *args):
+        return None
+
+    def settle(self):
+        """Run UI callbacks, including the ones they queue, until none are left."""
+        while self.ui.drain():
+            pass
+
+    def go_to(self, book_name, chapter, verse):
+        self.select(book_name, chapter, verse)
+
+
+# === Benchmarks ===
+
+def measure(func, repeat, setup=None):
+    """Return the durations in milliseconds of repeat calls of func, running setup before each."""
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def summarize(durations):
+    return {
+        "runs": len(durations),
+        "min_ms": min(durations),
+        "median_ms": statistics.median(durations),
+        "mean_ms": statistics.fmean(durations),
+        "max_ms": max(durations),
+    }
+
+
+def set_read_verses(app, count):
+    """Replace the stored read verses with the first count verses of the corpus."""
+    app.storage.clear_read_verses(app.translation_key())
+    app.storage.add_read_verses(app.translation_key(), app.corpus.verse_ids[:count])
+    app.storage.flush()
+
+
+def run_benchmarks(directory, repeat, boundary_verses):
+    results = {}
+    corpus_path = os.path.join(directory, "bench.csv")
+    generate_corpus(corpus_path)
+
+    # Corpus load, always from disk
+    def load_corpus():
+        app.translations = TranslationManager(directory)
+        app.load_bible_data()
+
+    app = HeadlessApp(directory)
+    results["load_bible_data"] = summarize(measure(load_corpus, repeat))
+
+    # Read-state load at different amounts of progress
+    for count in (0, 10000, TOTAL_VERSES):
+        set_read_verses(app, count)
+        results[f"load_storage_files[{count}_read]"] = summarize(measure(app.load_storage_files, repeat))
+
+    # Chapter rendering on the longest chapter
+    set_read_verses(app, 10000)
+    app.load_storage_files()
+    app.go_to("Psalms", 119, 1)
+    results["navigate[psalm_119]"] = summarize(measure(app.navigate, repeat))
+
+    # Next unread, skipping the reading itself
+    app.session.read = lambda: None
+    set_read_verses(app, TOTAL_VERSES - 1)
+    app.load_storage_files()
+    def next_unread():
+        app.next_unread()
+        app.settle()
+
+    results["next_unread[from_start]"] = summarize(
+        measure(next_unread, repeat, setup=lambda: app.go_to("Genesis", 1, 1)))
+    book_number, chapter, verse = app.corpus.verse_locations[app.corpus.verse_ids[-2]]
+    results["next_unread[from_end]"] = summarize(
+        measure(next_unread, repeat, setup=lambda: app.go_to(app.full_book_names[book_number - 1], chapter, verse)))
+    del app.session.read
+
+    # Marking whole books as read
+    def clear_read():
+        set_read_verses(app, 0)
+        app.load_storage_files()
+
+    def mark_books(first, last):
+        end = max(location for location in app.corpus.verse_locations.values() if location[0] == last)
+        return lambda: app.session.mark_read(app.verse_ids_in_range(first, 1, 1, *end))
+
+    results["mark_section[genesis]"] = summarize(measure(mark_books(1, 1), repeat, setup=clear_read))
+    results["mark_section[psalms]"] = summarize(measure(mark_books(19, 19), repeat, setup=clear_read))
+    results["mark_section[whole_bible]"] = summarize(measure(mark_books(1, 66), repeat, setup=clear_read))
+    app.storage.flush()
+
+    # Verse boundary latency through the reading engine with stub TTS and audio output
+    results["verse_boundary"] = benchmark_verse_boundary(app.corpus, directory, boundary_verses)
+
+    app.storage.close()
+    return results
+
+
+def benchmark_verse_boundary(corpus, directory, verses):
+    """Time from the last audio chunk of one verse to the first chunk of the next."""
+    try:
+        from pydub import AudioSegment
+        stub_mp3 = os.path.join(directory, "stub.mp3")
+        AudioSegment.silent(duration=300).export(stub_mp3, format="mp3")
+    except Exception as e:
+        return {"skipped": f"Could not create the stub MP3 (is ffmpeg installed?): {e}"}
+
+    session = ReadingSession(corpus, "en-US-SteffanNeural", tts=StubTTS(stub_mp3), temp_dir=directory,
+                             player=Player(interface_factory=NullAudioInterface))
+    session.set_position(19, 119, 1)
+
+    def wait_for(until, timeout):
+        deadline = time.perf_counter() + timeout
+        while not until() and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        return until()
+
+    starts, ends = NullAudioInterface.stream_starts, NullAudioInterface.stream_ends
+    starts.clear()
+    ends.clear()
+    session.read()
+    advanced = wait_for(lambda: len(starts) > verses, timeout=30 * (verses + 1))
+    session.stop()
+    session.wait(5)
+    if not advanced:
+        return {"skipped": "Playback did not advance within 30 seconds per verse"}
+    return summarize([(start - end) * 1000 for start, end in zip(starts[1:], ends)])
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    """Print the median of each benchmark next to the baseline's."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"{'benchmark':<36}{'baseline ms':>14}{'current ms':>14}{'ratio':>9}")
+    for name, result in results.items():
+        old = baseline.get(name, {})
+        if "median_ms" not in result or "median_ms" not in old:
+            print(f"{name:<36}{'-':>14}{result.get('median_ms', float('nan')):>14.3f}{'-':>9}")
+            continue
+        ratio = result["median_ms"] / old["median_ms"] if old["median_ms"] else float("inf")
+        print(f"{name:<36}{old['median_ms']:>14.3f}{result['median_ms']:>14.3f}{ratio:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Bible Reader benchmark suite.")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark")
+    parser.add_argument("--boundary-verses", type=int, default=10, help="verse boundaries to time")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bible_bench_")
+    try:
+        results = run_benchmarks(directory, args.repeat, args.boundary_verses)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    else:
+        for name, result in results.items():
+            print(f"{name:<36}{result.get('median_ms', float('nan')):>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# This module provides the cancellation token shared by the stages of a reading run (synthesis, decoding
+# and playback). Stopping and pausing are threading.Event based, so waiting code wakes up as soon as the
+# state changes instead of polling with sleep(). Coroutines can be cancelled through run_cancellable().
+
+import asyncio
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class CancelToken:
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()  # Cleared while paused
+        self._running.set()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def cancel(self):
+        """Cancel the run. Wakes up anything waiting on the token and runs the cancel callbacks once."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            self._running.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log.error("Error in cancel callback: %s", e)
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def wait_while_paused(self):
+        """Block while paused. Returns False if the run was cancelled."""
+        self._running.wait()
+        return not self.cancelled
+
+    def add_callback(self, callback):
+        """Call callback() on cancel, or right away if already cancelled."""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+async def run_cancellable(coroutine, token):
+    """Await coroutine, cancelling it as soon as token is cancelled. Returns False if it was cancelled."""
+    loop = asyncio.get_running_loop()
+    task = loop.create_task(coroutine)
+
+    def cancel_task():
+        loop.call_soon_threadsafe(task.cancel)
+
+    token.add_callback(cancel_task)
+    try:
+        await task
+        return True
+    except asyncio.CancelledError:
+        if token.cancelled:
+            return False
+        raise
+    finally:
+        token.remove_callback(cancel_task)
@@ -0,0 +1,151 @@
+# This module predicts how long a verse takes to read aloud without synthesizing it. The estimate is a
+# linear model per voice over a few text features (characters, words, pauses and sentence ends), fitted by
+# least squares to the durations of verses that were actually synthesized for reading or MP3 export. Only
+# the running sums of the fit are kept, so a voice's model is a few hundred bytes in the database and each
+# new observation is O(1). Until a voice has been heard, a typical speaking rate is assumed.
+#
+# Durations are of the polished audio (trimmed silence included) at normal speed; divide by the playback
+# speed for the listening time.
+
+import threading
+import logging
+from array import array
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+FEATURES = 5  # bias, characters, words, pauses (, ; : and dashes), sentence ends (. ! ?)
+# Seconds per feature for an average English voice, used until a voice has been calibrated
+DEFAULT_COEFFICIENTS = (0.35, 0.055, 0.02, 0.2, 0.35)
+# How strongly the defaults are trusted, in verses; observations outweigh them after a few dozen verses
+PRIOR_VERSES = 20
+TYPICAL_FEATURES = (1.0, 140.0, 26.0, 2.0, 1.5)  # Scale of each feature in a typical verse
+DECAY = 0.998  # Older observations fade so the model follows changes to a voice or the audio settings
+SAVE_EVERY = 25  # Observations between saves of a model
+
+
+def text_features(text):
+    return (1.0, float(len(text)), float(text.count(" ") + 1),
+            float(sum(map(text.count, ",;:—–"))), float(sum(map(text.count, ".!?"))))
+
+
+def predict(coefficients, text):
+    """Duration of text in seconds at normal speed predicted by a model's coefficients."""
+    return max(0.2, sum(c * f for c, f in zip(coefficients, text_features(text))))
+
+
+def coefficient_weight(coefficients, corpus):
+    """Per-verse weight function for balancing reading plans, from coefficients that were saved when the
+    plan started, so later calibration doesn't move its days."""
+    return lambda verse_id: predict(coefficients, corpus.verse_texts[verse_id])
+
+
+class DurationModel:
+    def __init__(self, voice, stats=None):
+        """stats are the serialized running sums from to_bytes(), or None for an uncalibrated voice."""
+        self.voice = voice
+        self.count = 0.0  # Decayed number of observations
+        self.xtx = np.zeros((FEATURES, FEATURES))
+        self.xty = np.zeros(FEATURES)
+        if stats:
+            values = array("d")
+            values.frombytes(stats)
+            self.count = values[0]
+            self.xty = np.array(values[1:1 + FEATURES])
+            upper = np.triu_indices(FEATURES)
+            self.xtx[upper] = values[1 + FEATURES:]
+            self.xtx.T[upper] = values[1 + FEATURES:]
+        self._coefficients = None
+
+    def to_bytes(self):
+        values = array("d", [self.count])
+        values.extend(self.xty)
+        values.extend(self.xtx[np.triu_indices(FEATURES)])
+        return values.tobytes()
+
+    def observe(self, text, seconds):
+        """Fit a verse's actual duration."""
+        x = np.array(text_features(text))
+        self.xtx = self.xtx * DECAY + np.outer(x, x)
+        self.xty = self.xty * DECAY + x * seconds
+        self.count = self.count * DECAY + 1
+        self._coefficients = None
+
+    @property
+    def coefficients(self):
+        """Least-squares coefficients, pulled towards the defaults by PRIOR_VERSES typical verses."""
+        if self._coefficients is None:
+            prior = np.diag(PRIOR_VERSES * np.square(TYPICAL_FEATURES))
+            solution = np.linalg.solve(self.xtx + prior, self.xty + prior @ np.array(DEFAULT_COEFFICIENTS))
+            self._coefficients = tuple(float(c) for c in solution)
+        return self._coefficients
+
+    def estimate(self, text):
+        """Predicted duration of text in seconds at normal speed."""
+        return predict(self.coefficients, text)
+
+
+class DurationEstimator:
+    """The duration models of every voice, loaded from and saved to storage."""
+
+    def __init__(self, storage=None):
+        self.storage = storage  # Models are only kept in memory when this is None
+        self._models = {}
+        self._unsaved = {}  # voice -> observations since the last save
+        self._lock = threading.Lock()
+
+    def model(self, voice):
+        with self._lock:
+            model = self._models.get(voice)
+            if model is None:
+                stats = self.storage.load_duration_model(voice) if self.storage is not None else None
+                model = self._models[voice] = DurationModel(voice, stats)
+            return model
+
+    def observe(self, voice, text, seconds):
+        """Record a verse's actual duration at normal speed (safe from any thread)."""
+        model = self.model(voice)
+        with self._lock:
+            model.observe(text, seconds)
+            self._unsaved[voice] = self._unsaved.get(voice, 0) + 1
+            if self._unsaved[voice] >= SAVE_EVERY:
+                self._save(voice)
+
+    def _save(self, voice):
+        if self.storage is not None:
+            self.storage.save_duration_model(voice, self._models[voice].to_bytes())
+        self._unsaved.pop(voice, None)
+
+    def save(self):
+        """Save the models that changed since they were last saved."""
+        with self._lock:
+            for voice in list(self._unsaved):
+                self._save(voice)
+
+    def estimate(self, voice, text, speed=1.0):
+        """Predicted listening time of text in seconds."""
+        model = self.model(voice)
+        with self._lock:
+            return model.estimate(text) / speed
+
+    def total(self, voice, corpus, verse_ids, speed=1.0):
+        """Predicted listening time of several verses in seconds."""
+        model = self.model(voice)
+        with self._lock:
+            return sum(model.estimate(corpus.verse_texts[verse_id]) for verse_id in verse_ids) / speed
+
+    def coefficients(self, voice):
+        """The current coefficients of a voice's model."""
+        model = self.model(voice)
+        with self._lock:
+            return model.coefficients
+
+
+def format_duration(seconds):
+    """Short human-readable duration, e.g. "1 h 05 min" or "4 min"."""
+    minutes = round(seconds / 60)
+    if minutes < 1:
+        return f"{round(seconds)} s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} h {minutes:02d} min" if hours else f"{minutes} min"
@@ -0,0 +1,94 @@
+# This module provides an exclusive lock on a file that works between processes, so several running
+# instances (or the command-line tools) never write the same shared file at the same time. It uses
+# fcntl.flock on Linux and macOS and msvcrt.locking on Windows. The lock belongs to the open file, so the
+# operating system releases it if a process exits without unlocking.
+
+import os
+import time
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+log = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05  # Seconds between attempts while waiting for a lock on Windows
+
+
+class FileLock:
+    def __init__(self, path, timeout=None):
+        """Lock on path (created if needed; usually "<file>.lock" next to the file it guards).
+
+        acquire() waits at most timeout seconds when it is given, and forever otherwise.
+        """
+        self.path = path
+        self.timeout = timeout
+        self._file = None
+
+    @property
+    def locked(self):
+        return self._file is not None
+
+    def acquire(self, blocking=True):
+        """Take the lock. Returns False if it is held elsewhere and blocking is False or the timeout passed."""
+        if self._file is not None:
+            raise RuntimeError(f"{self.path} is already locked by this object")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.path, "a+b")
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            while not self._try_lock(f, blocking and deadline is None):
+                if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                    f.close()
+                    return False
+                time.sleep(POLL_INTERVAL)
+        except BaseException:
+            f.close()
+            raise
+        self._file = f
+        return True
+
+    @staticmethod
+    def _try_lock(f, wait):
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                return False
+        # msvcrt locks a byte range from the current position; LK_LOCK gives up after 10 seconds, so the
+        # caller polls instead
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError as e:
+            log.warning("Could not unlock %s: %s", self.path, e)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f"Timed out waiting for the lock on {self.path}")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
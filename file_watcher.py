@@ -0,0 +1,172 @@
+# This module watches files for changes made outside the application, such as a corrected translation
+# CSV or a database updated by a sync tool or another running instance. On Linux it uses inotify, so
+# nothing is read until a file actually changes; elsewhere (or if inotify is unavailable) it compares
+# the size and modification time of the files once per poll interval. Changes are collected for a short
+# settle time, because editors and sync tools write a file in several steps, and then reported in one
+# callback from the watcher thread.
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import fnmatch
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_SETTLE_TIME = 0.5
+
+# inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+    def __init__(self, directory, patterns, callback, poll_interval=DEFAULT_POLL_INTERVAL,
+                 settle_time=DEFAULT_SETTLE_TIME, use_inotify=True):
+        """Call callback(paths) with the set of changed files in directory whose names match patterns
+        (shell-style, e.g. "*.csv"). The callback runs on the watcher thread."""
+        self.directory = os.path.abspath(directory)
+        self.patterns = patterns
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.use_inotify = use_inotify and sys.platform.startswith("linux")
+        self._stop = threading.Event()
+        self._wake = None  # Pipe that interrupts the wait for inotify events when stopping
+        self._thread = None
+
+    def matches(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def start(self):
+        if self.use_inotify:
+            self._wake = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"\0")
+        if self._thread is not None:
+            self._thread.join(5)
+        if self._wake is not None:
+            for fd in self._wake:
+                os.close(fd)
+            self._wake = None
+
+    def _run(self):
+        fd = self._inotify() if self.use_inotify else None
+        try:
+            if fd is not None:
+                log.debug("Watching %s with inotify", self.directory)
+                self._watch_inotify(fd)
+            else:
+                log.debug("Watching %s by polling every %s s", self.directory, self.poll_interval)
+                self._watch_polling()
+        except Exception as e:
+            log.exception("File watcher stopped: %s", e)
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _report(self, paths):
+        if paths:
+            try:
+                self.callback(paths)
+            except Exception as e:
+                log.exception("Error handling changed files %s: %s", sorted(paths), e)
+
+    # === inotify ===
+
+    def _inotify(self):
+        """An inotify descriptor watching the directory, or None if inotify is unavailable."""
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) < 0:
+                error = ctypes.get_errno()
+                os.close(fd)
+                raise OSError(error, "inotify_add_watch failed")
+            return fd
+        except (OSError, AttributeError) as e:
+            log.info("inotify is not available (%s), polling for file changes instead", e)
+            return None
+
+    def _read_events(self, fd):
+        """Names of the matching files in the pending inotify events."""
+        names = set()
+        while True:
+            try:
+                data = os.read(fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return names
+                raise
+            position = 0
+            while position + _EVENT.size <= len(data):
+                _, _, _, length = _EVENT.unpack_from(data, position)
+                name = data[position + _EVENT.size:position + _EVENT.size + length].rstrip(b"\0")
+                position += _EVENT.size + length
+                name = os.fsdecode(name)
+                if name and self.matches(name):
+                    names.add(os.path.join(self.directory, name))
+
+    def _watch_inotify(self, fd):
+        waiting = [fd, self._wake[0]]
+        while not self._stop.is_set():
+            readable, _, _ = select.select(waiting, [], [])
+            if fd not in readable:
+                continue
+            changed = self._read_events(fd)
+            # Collect the rest of a burst of writes
+            deadline = time.monotonic() + self.settle_time
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                readable, _, _ = select.select(waiting, [], [], max(deadline - time.monotonic(), 0))
+                if fd in readable:
+                    changed |= self._read_events(fd)
+            if not self._stop.is_set():
+                self._report(changed)
+
+    # === Polling ===
+
+    def _snapshot(self):
+        snapshot = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return snapshot
+        for name in names:
+            if self.matches(name):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def _watch_polling(self):
+        previous = self._snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = {path for path in previous.keys() | current.keys() if previous.get(path) != current.get(path)}
+            if changed and not self._stop.wait(self.settle_time):
+                current = self._snapshot()  # Let the writer finish before reporting
+            previous = current
+            self._report(changed)
@@ -0,0 +1,183 @@
+# This module provides lightweight timing instrumentation and logging setup for the application.
+# Named spans and counters are recorded only while instrumentation is enabled. When it is disabled,
+# span() returns a shared no-op object and count() returns after a single flag check, so the calls can
+# stay in hot paths. Recorded data can be exported as a JSON trace that opens in chrome://tracing
+# (or https://ui.perfetto.dev).
+#
+# Environment variables read by configure_from_environment():
+#   BIBLE_READER_TRACE=trace.json   enable instrumentation and write the trace to this file on exit
+#   BIBLE_READER_LOG_LEVEL=DEBUG    log level (DEBUG, INFO, WARNING, ERROR); defaults to WARNING
+
+import os
+import json
+import time
+import atexit
+import logging
+import functools
+import threading
+from collections import defaultdict
+
+log = logging.getLogger(__name__)
+
+enabled = False
+
+_lock = threading.Lock()
+_events = []  # Chrome trace events
+_span_totals = defaultdict(lambda: [0, 0.0, 0.0])  # name -> [count, total seconds, max seconds]
+_counters = defaultdict(float)
+_start = time.perf_counter()
+_pid = os.getpid()
+
+
+class _NullSpan:
+    """Span used while instrumentation is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        duration = end - self.begin
+        event = {
+            "name": self.name,
+            "ph": "X",
+            "ts": (self.begin - _start) * 1e6,
+            "dur": duration * 1e6,
+            "pid": _pid,
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        with _lock:
+            _events.append(event)
+            totals = _span_totals[self.name]
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+        return False
+
+
+def enable(flag=True):
+    """Turn recording on or off."""
+    global enabled
+    enabled = flag
+
+
+def reset():
+    """Discard everything recorded so far."""
+    with _lock:
+        _events.clear()
+        _span_totals.clear()
+        _counters.clear()
+
+
+def span(name, **args):
+    """Return a context manager that records how long its block takes."""
+    if not enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def timed(name=None):
+    """Decorator that records every call of the function as a span."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    """Add value to a named counter."""
+    if not enabled:
+        return
+    _record_counter(name, value, add=True)
+
+
+def gauge(name, value):
+    """Set a named counter to value."""
+    if not enabled:
+        return
+    _record_counter(name, value, add=False)
+
+
+def _record_counter(name, value, add):
+    now = time.perf_counter()
+    with _lock:
+        _counters[name] = _counters[name] + value if add else value
+        _events.append({
+            "name": name,
+            "ph": "C",
+            "ts": (now - _start) * 1e6,
+            "pid": _pid,
+            "args": {name: _counters[name]},
+        })
+
+
+def summary():
+    """Return {span name: {count, total_ms, mean_ms, max_ms}} and the current counter values."""
+    with _lock:
+        spans = {
+            name: {
+                "count": count_,
+                "total_ms": total * 1000,
+                "mean_ms": total * 1000 / count_ if count_ else 0.0,
+                "max_ms": maximum * 1000,
+            }
+            for name, (count_, total, maximum) in _span_totals.items()
+        }
+        return {"spans": spans, "counters": dict(_counters)}
+
+
+def export_trace(path):
+    """Write everything recorded so far as a Chrome trace JSON file."""
+    with _lock:
+        events = list(_events)
+        thread_names = [
+            {"name": "thread_name", "ph": "M", "pid": _pid, "tid": thread.ident, "args": {"name": thread.name}}
+            for thread in threading.enumerate()
+        ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": thread_names + events, "displayTimeUnit": "ms"}, f)
+    log.info("Wrote %d trace events to %s", len(events), path)
+
+
+def setup_logging(level="WARNING"):
+    """Configure leveled logging for the application."""
+    logging.basicConfig(
+        level=getattr(logging, str(level).upper(), logging.WARNING),
+        format="%(asctime)s %(levelname)-7s %(name)s: %(message)s",
+    )
+
+
+def configure_from_environment():
+    """Set up logging and tracing from the BIBLE_READER_* environment variables."""
+    setup_logging(os.environ.get("BIBLE_READER_LOG_LEVEL", "WARNING"))
+
+    trace_path = os.environ.get("BIBLE_READER_TRACE")
+    if trace_path:
+        enable()
+        atexit.register(export_trace, trace_path)
+        log.info("Tracing enabled, writing to %s on exit", trace_path)
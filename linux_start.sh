@@ -31,7 +31,7 @@ if ! "$PYTHON_EXEC" -c "import tkinter" &> /dev/null; then
 fi
 
 # Run the Bible Reader application
-"$PYTHON_EXEC" "Bible.py"
+"$PYTHON_EXEC" "Bible.py" "$@"
 
 # Wait for user input before closing
 read -p "Press [Enter] key to continue..."
@@ -0,0 +1,273 @@
+# This module renders a range of verses into one MP3 file. Every verse is synthesized, decoded and
+# polished on its own and streamed in order into a single ffmpeg encoder, so memory use doesn't grow with
+# the length of the range and the start and end of each verse in the file are known exactly while it is
+# generated. Those offsets are written into the MP3 as ID3v2.3 chapter
+# frames (CHAP/CTOC, shown as chapters by podcast and audiobook players) and, optionally, into a JSON
+# or LRC sidecar file next to it.
+#
+# Chapter markers: one per verse when the range is a single chapter, one per chapter when it is a
+# single book, and one per chapter grouped under a table of contents per book otherwise (an ID3 table
+# of contents holds at most 255 entries).
+
+import os
+import json
+import shutil
+import struct
+import asyncio
+import logging
+import tempfile
+from collections import deque
+
+import instrumentation
+from audio import Mp3Encoder, decode_mp3, polish
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 4  # Verses synthesized at the same time
+
+
+class VerseTiming:
+    """Where one verse is in the rendered file."""
+
+    def __init__(self, verse_id, book_name, chapter, verse, text, start_ms, end_ms):
+        self.verse_id = verse_id
+        self.book_name = book_name
+        self.chapter = chapter
+        self.verse = verse
+        self.text = text
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+
+    @property
+    def label(self):
+        return f"{self.book_name} {self.chapter}:{self.verse}"
+
+    def to_dict(self):
+        return {
+            "verse_id": self.verse_id,
+            "book": self.book_name,
+            "chapter": self.chapter,
+            "verse": self.verse,
+            "start_ms": self.start_ms,
+            "end_ms": self.end_ms,
+        }
+
+
+async def render_verses(tts, voice, corpus, verse_ids, filename, pad_ms=None, target_dbfs=None,
+                        progress=None, concurrency=DEFAULT_CONCURRENCY, estimator=None):
+    """Synthesize verse_ids into filename and return their VerseTimings.
+
+    Verses are synthesized up to concurrency at a time and streamed into the encoder in order, so at most
+    a few verses of audio are held in memory however long the range is. progress(done, total) is called
+    from the rendering thread after each verse. The verse durations are recorded in estimator (a
+    DurationEstimator) if given.
+    """
+    verses = verse_details(corpus, verse_ids)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    with tempfile.TemporaryDirectory(prefix="bible_export_") as temp_dir:
+        async def render(index):
+            verse_id, text = verses[index][0], verses[index][4]
+            mp3_file = os.path.join(temp_dir, f"{index}.mp3")
+            async with semaphore:
+                await tts.synthesize(text, voice, mp3_file)
+            clip = await asyncio.to_thread(decode_mp3, mp3_file)
+            os.remove(mp3_file)
+            clip = polish(clip, pad_ms, target_dbfs)
+            if estimator is not None:
+                estimator.observe(voice, text, clip.duration)
+            return clip
+
+        pending = deque()
+        writer = TimingWriter(filename)
+        try:
+            with instrumentation.span("export.render", verses=len(verses)):
+                for index, verse in enumerate(verses):
+                    # Keep the next few verses synthesizing while this one is encoded
+                    while len(pending) < concurrency * 2 and index + len(pending) < len(verses):
+                        pending.append(asyncio.ensure_future(render(index + len(pending))))
+                    clip = await pending.popleft()
+                    await asyncio.to_thread(writer.write, verse, clip)
+                    if progress:
+                        progress(index + 1, len(verses))
+            timings = writer.close()
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            writer.abort()
+            raise
+
+    write_chapters(filename, timings, title=os.path.splitext(os.path.basename(filename))[0])
+    return timings
+
+
+def verse_details(corpus, verse_ids):
+    """(verse_id, book_name, chapter, verse, text) of each verse, for assemble()."""
+    details = []
+    for verse_id in verse_ids:
+        book_number, chapter, verse = corpus.verse_locations[verse_id]
+        details.append((verse_id, corpus.full_book_name(book_number), chapter, verse, corpus.verse_texts[verse_id]))
+    return details
+
+
+class TimingWriter:
+    """Streams verse clips into an MP3 file and keeps track of where each verse starts and ends."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.timings = []
+        self._encoder = None  # Started with the audio format of the first clip
+
+    def write(self, verse, clip):
+        """Append the clip of a verse from verse_details()."""
+        if self._encoder is None:
+            self._encoder = Mp3Encoder(self.filename, clip.sample_width, clip.channels, clip.frame_rate)
+        verse_id, book_name, chapter, number, text = verse
+        start_ms = self._encoder.frames * 1000 // clip.frame_rate
+        try:
+            self._encoder.write(clip)
+        except ValueError:
+            raise ValueError(f"Verse {verse_id} was synthesized in a different audio format")
+        end_ms = self._encoder.frames * 1000 // clip.frame_rate
+        self.timings.append(VerseTiming(verse_id, book_name, chapter, number, text, start_ms, end_ms))
+
+    def close(self):
+        """Finish the MP3 file and return the VerseTimings."""
+        if self._encoder is None:
+            raise ValueError("No verses to save")
+        self._encoder.close()
+        return self.timings
+
+    def abort(self):
+        if self._encoder is not None:
+            self._encoder.abort()
+
+
+def assemble(filename, clips, verses, title=None):
+    """Encode the clips of verses (from verse_details()) into an MP3 file with chapter markers.
+
+    Returns their VerseTimings. Doesn't need the corpus, so it can run in a worker process.
+    """
+    writer = TimingWriter(filename)
+    try:
+        for verse, clip in zip(verses, clips):
+            writer.write(verse, clip)
+        timings = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+    write_chapters(filename, timings, title=title or os.path.splitext(os.path.basename(filename))[0])
+    return timings
+
+
+# === ID3 chapters ===
+
+def _syncsafe(size):
+    return bytes(((size >> shift) & 0x7F) for shift in (21, 14, 7, 0))
+
+
+def _frame(frame_id, data):
+    """An ID3v2.3 frame."""
+    return frame_id.encode("ascii") + struct.pack(">IH", len(data), 0) + data
+
+
+def _text_frame(frame_id, text):
+    return _frame(frame_id, b"\x01" + text.encode("utf-16") + b"\x00\x00")
+
+
+def _chap(element_id, title, start_ms, end_ms):
+    data = element_id.encode("ascii") + b"\x00" + struct.pack(">IIII", start_ms, end_ms, 0xFFFFFFFF, 0xFFFFFFFF)
+    return _frame("CHAP", data + _text_frame("TIT2", title))
+
+
+def _ctoc(element_id, title, children, top_level=False):
+    flags = 0x01 | (0x02 if top_level else 0)  # Ordered, and top-level for the root
+    data = element_id.encode("ascii") + b"\x00" + bytes([flags, len(children)])
+    data += b"".join(child.encode("ascii") + b"\x00" for child in children)
+    return _frame("CTOC", data + _text_frame("TIT2", title))
+
+
+def chapter_frames(timings, title):
+    """Build the CTOC and CHAP frames for timings."""
+    def span(group):
+        return group[0].start_ms, group[-1].end_ms
+
+    def group_by(items, key):
+        groups = []
+        for item in items:
+            if groups and key(groups[-1][0]) == key(item):
+                groups[-1].append(item)
+            else:
+                groups.append([item])
+        return groups
+
+    frames = []
+    chapters = group_by(timings, lambda t: (t.book_name, t.chapter))
+    if len(chapters) == 1:
+        children = []
+        for index, timing in enumerate(timings):
+            children.append(f"v{index}")
+            frames.append(_chap(f"v{index}", timing.label, timing.start_ms, timing.end_ms))
+        return [_ctoc("toc", title, children, top_level=True)] + frames
+
+    books = group_by(chapters, lambda group: group[0].book_name)
+    tocs = []
+    for book_index, book in enumerate(books):
+        children = []
+        for chapter in book:
+            element_id = f"c{len(frames)}"
+            children.append(element_id)
+            frames.append(_chap(element_id, f"{chapter[0].book_name} {chapter[0].chapter}", *span(chapter)))
+        tocs.append((f"b{book_index}", book[0][0].book_name, children))
+
+    if len(books) == 1:
+        return [_ctoc("toc", title, tocs[0][2], top_level=True)] + frames
+    root = _ctoc("toc", title, [element_id for element_id, _, _ in tocs], top_level=True)
+    return [root] + [_ctoc(*toc) for toc in tocs] + frames
+
+
+def _id3_size(header):
+    """Length of the ID3v2 tag (such as ffmpeg's encoder tag) starting an MP3 file, from its first 10 bytes."""
+    if header[:3] != b"ID3" or len(header) < 10:
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def write_chapters(filename, timings, title):
+    """Replace the ID3v2 tag of an MP3 file with one holding a title and the chapter markers.
+
+    The audio is copied in blocks, so this works on files of any size.
+    """
+    frames = b"".join([_text_frame("TIT2", title)] + chapter_frames(timings, title))
+    temp_file = filename + ".tmp"
+    with open(filename, "rb") as source, open(temp_file, "wb") as f:
+        source.seek(_id3_size(source.read(10)))
+        f.write(b"ID3\x03\x00\x00" + _syncsafe(len(frames)) + frames)
+        shutil.copyfileobj(source, f, 1 << 20)
+    os.replace(temp_file, filename)
+
+
+# === Sidecars ===
+
+def write_json_sidecar(filename, timings):
+    """Write the verse offsets to filename with a .json extension."""
+    path = os.path.splitext(filename)[0] + ".json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"audio": os.path.basename(filename), "verses": [t.to_dict() for t in timings]}, f, indent=1)
+    return path
+
+
+def write_lrc_sidecar(filename, timings):
+    """Write the verses as timed lyrics to filename with a .lrc extension."""
+    path = os.path.splitext(filename)[0] + ".lrc"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"[ti:{os.path.splitext(os.path.basename(filename))[0]}]\n")
+        for timing in timings:
+            minutes, milliseconds = divmod(timing.start_ms, 60000)
+            f.write(f"[{minutes:02d}:{milliseconds / 1000:05.2f}]{timing.label} {timing.text}\n")
+    return path
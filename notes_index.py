@@ -0,0 +1,117 @@
+# This module provides an in-memory inverted index over chapter notes so they can be searched by word.
+# The index is built once when the notes are loaded and is then updated incrementally every time a
+# single chapter note is saved or deleted, so it never has to be rebuilt from storage.
+
+import re
+import bisect
+from collections import defaultdict
+
+TOKEN_PATTERN = re.compile(r"[\w']+")
+
+
+def tokenize(text):
+    """Split text into lowercase search tokens."""
+    return [token.strip("'") for token in TOKEN_PATTERN.findall(str(text).lower()) if token.strip("'")]
+
+
+class NotesIndex:
+    def __init__(self):
+        self.postings = defaultdict(set)  # token -> {(book_number, chapter), ...}
+        self.documents = {}  # (book_number, chapter) -> note text
+        self.vocabulary = []  # Sorted list of tokens, used for prefix matching
+
+    @classmethod
+    def from_notes(cls, notes):
+        """Build an index from a dict of (book_number, chapter) -> note text."""
+        index = cls()
+        for (book_number, chapter), text in notes.items():
+            index.update(book_number, chapter, text)
+        return index
+
+    def __len__(self):
+        return len(self.documents)
+
+    def update(self, book_number, chapter, text):
+        """Replace the indexed note for a chapter."""
+        key = (int(book_number), int(chapter))
+        self.remove(*key)
+
+        if not isinstance(text, str) or not text.strip():
+            return
+
+        self.documents[key] = text
+        for token in set(tokenize(text)):
+            if token not in self.postings:
+                bisect.insort(self.vocabulary, token)
+            self.postings[token].add(key)
+
+    def remove(self, book_number, chapter):
+        """Remove the note for a chapter from the index."""
+        key = (int(book_number), int(chapter))
+        text = self.documents.pop(key, None)
+        if text is None:
+            return
+
+        for token in set(tokenize(text)):
+            keys = self.postings.get(token)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self.postings[token]
+                position = bisect.bisect_left(self.vocabulary, token)
+                if position < len(self.vocabulary) and self.vocabulary[position] == token:
+                    del self.vocabulary[position]
+
+    def _prefix_matches(self, prefix):
+        """Return the set of chapters containing any token starting with prefix."""
+        matches = set()
+        position = bisect.bisect_left(self.vocabulary, prefix)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix):
+            matches |= self.postings[self.vocabulary[position]]
+            position += 1
+        return matches
+
+    def search(self, query, limit=200):
+        """Return (book_number, chapter, snippet) tuples for notes containing every word in query.
+
+        The last word is matched as a prefix so results can be shown while the user is still typing.
+        Results are ordered by book and chapter.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Intersect the smallest posting lists first
+        exact = sorted((self.postings.get(token, set()) for token in tokens[:-1]), key=len)
+        candidates = None
+        for keys in exact:
+            candidates = set(keys) if candidates is None else candidates & keys
+            if not candidates:
+                return []
+
+        prefix = self._prefix_matches(tokens[-1])
+        candidates = prefix if candidates is None else candidates & prefix
+
+        results = []
+        for key in sorted(candidates)[:limit]:
+            results.append((key[0], key[1], self.snippet(self.documents[key], tokens)))
+        return results
+
+    @staticmethod
+    def snippet(text, tokens, width=60):
+        """Return a single-line excerpt of text around the first matching token."""
+        flat = " ".join(text.split())
+        lowered = flat.lower()
+        start = 0
+        for token in tokens:
+            found = lowered.find(token)
+            if found != -1:
+                start = max(0, found - width // 3)
+                break
+        excerpt = flat[start:start + width]
+        if start > 0:
+            excerpt = "..." + excerpt
+        if start + width < len(flat):
+            excerpt = excerpt + "..."
+        return excerpt
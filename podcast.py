@@ -0,0 +1,318 @@
+# This script renders chapters, or the days of a reading plan, into MP3 files under Saved_MP3s/<feed name>/
+# and writes a podcast RSS feed (feed.xml) listing them in reading order with their durations, so they can
+# be subscribed to from a phone. Rendering is incremental: a manifest remembers what each episode was made
+# from (voice, audio settings and verse text), and only missing or stale episodes are synthesized again.
+# With --serve the folder is shared on the local network by a small built-in HTTP server.
+#
+# Usage:
+#   python podcast.py --start Genesis 1 --end Genesis 50
+#   python podcast.py --start Matthew 1 --end John 21 --name Gospels --serve --port 8000
+#   python podcast.py --plan "New Testament in 30 days"
+
+import os
+import json
+import socket
+import asyncio
+import hashlib
+import logging
+import argparse
+import functools
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+import instrumentation
+import reading_plans
+from audio import EdgeTTS, DEFAULT_SILENCE_PAD_MS, DEFAULT_TARGET_DBFS
+from duration_model import coefficient_weight
+from file_lock import FileLock
+from mp3_export import render_verses
+from profiles import Profiles, DEFAULT_PROFILE
+from storage import Storage
+from translations import TranslationManager
+
+log = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+FEED_FILE = "feed.xml"
+FIRST_EPISODE_DATE = datetime(2000, 1, 1, tzinfo=timezone.utc)  # Episodes are dated one day apart, in order
+
+
+def episode_fingerprint(corpus, verse_ids, voice, pad_ms, target_dbfs):
+    """Hash of everything an episode's audio depends on."""
+    digest = hashlib.sha256(json.dumps([voice, pad_ms, target_dbfs]).encode("utf-8"))
+    for verse_id in verse_ids:
+        digest.update(f"\0{verse_id}\0{corpus.verse_texts[verse_id]}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_feed(tts, voice, corpus, episodes, directory, title, pad_ms=DEFAULT_SILENCE_PAD_MS,
+                target_dbfs=DEFAULT_TARGET_DBFS, base_url="", progress=None):
+    """Render the episodes that are missing or stale into directory and write its feed.
+
+    episodes is a list of (title, file name, Verse IDs), e.g. from chapter_episodes() or plan_episodes().
+    Returns (episodes rendered, episodes total).
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    items = []
+    rendered = 0
+
+    for index, (episode_title, filename, verse_ids) in enumerate(episodes):
+        path = os.path.join(directory, filename)
+        fingerprint = episode_fingerprint(corpus, verse_ids, voice, pad_ms, target_dbfs)
+
+        entry = manifest.get(filename)
+        if not (entry and entry["fingerprint"] == fingerprint and os.path.exists(path)):
+            log.info("Rendering %s", episode_title)
+            with instrumentation.span("podcast.render_episode", verses=len(verse_ids)):
+                timings = asyncio.run(render_verses(tts, voice, corpus, verse_ids, path, pad_ms, target_dbfs))
+            entry = {"fingerprint": fingerprint, "duration_ms": timings[-1].end_ms}
+            rendered += 1
+            # Save after every episode so an interrupted run resumes where it stopped
+            update_manifest(directory, filename, entry)
+
+        items.append({
+            "title": episode_title,
+            "file": filename,
+            "size": os.path.getsize(path),
+            "duration_ms": entry["duration_ms"],
+            "number": index + 1,
+        })
+        if progress:
+            progress(index + 1, len(episodes))
+
+    # Forget episodes that are no longer part of the feed (only those it had when this run started)
+    current = {item["file"] for item in items}
+    forget_manifest(directory, [name for name in manifest if name not in current])
+    write_feed(directory, title, items, base_url)
+    return rendered, len(items)
+
+
+def directory_lock(directory):
+    """Lock taken while writing the manifest or feed, so several renderers can share a folder."""
+    return FileLock(os.path.join(directory, ".lock"))
+
+
+def update_manifest(directory, filename, entry):
+    """Record one episode, keeping the entries other renderers of the folder added meanwhile."""
+    with directory_lock(directory):
+        manifest = load_manifest(directory)
+        manifest[filename] = entry
+        _replace_manifest(directory, manifest)
+
+
+def forget_manifest(directory, filenames):
+    """Remove episodes, keeping the entries other renderers of the folder added meanwhile."""
+    if not filenames:
+        return
+    with directory_lock(directory):
+        manifest = load_manifest(directory)
+        for filename in filenames:
+            manifest.pop(filename, None)
+        _replace_manifest(directory, manifest)
+
+
+def _replace_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def _duration(milliseconds):
+    minutes, seconds = divmod(round(milliseconds / 1000), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def write_feed(directory, title, episodes, base_url=""):
+    """Write an RSS 2.0 podcast feed of episodes (in order) to directory/feed.xml."""
+    items = []
+    for episode in episodes:
+        url = base_url + quote(episode["file"])
+        published = format_datetime(FIRST_EPISODE_DATE + timedelta(days=episode["number"] - 1))
+        items.append(f"""    <item>
+      <title>{escape(episode["title"])}</title>
+      <guid isPermaLink="false">{escape(episode["file"])}</guid>
+      <enclosure url="{escape(url)}" length="{episode["size"]}" type="audio/mpeg"/>
+      <pubDate>{published}</pubDate>
+      <itunes:duration>{_duration(episode["duration_ms"])}</itunes:duration>
+      <itunes:episode>{episode["number"]}</itunes:episode>
+    </item>""")
+
+    feed = f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">
+  <channel>
+    <title>{escape(title)}</title>
+    <description>{escape(title)}, read aloud by Bible Reader</description>
+    <link>{escape(base_url or "http://localhost/")}</link>
+    <language>en</language>
+    <itunes:type>serial</itunes:type>
+{chr(10).join(items)}
+  </channel>
+</rss>
+"""
+    path = os.path.join(directory, FEED_FILE)
+    with directory_lock(directory):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(feed)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def local_address():
+    """Best guess at this machine's address on the local network."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            s.connect(("10.255.255.255", 1))  # No packet is sent; this only picks the outgoing interface
+            return s.getsockname()[0]
+        except OSError:
+            return "127.0.0.1"
+
+
+def serve(directory, port=8000):
+    """Serve directory over HTTP on all interfaces from a background thread. Returns the server."""
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    threading.Thread(target=server.serve_forever, name="podcast-server", daemon=True).start()
+    return server
+
+
+def chapters_between(corpus, start, end):
+    """(book_number, chapter) pairs from start to end inclusive, both (book_number, chapter)."""
+    return [key for key in corpus.chapters if start <= key <= end]
+
+
+def chapter_episodes(corpus, chapters):
+    """One episode per (book_number, chapter), for render_feed()."""
+    return [(f"{corpus.full_book_name(book_number)} {chapter}",
+             f"{corpus.number_to_book[book_number]}-{chapter}.mp3", corpus.chapters[(book_number, chapter)])
+            for book_number, chapter in chapters]
+
+
+def passage(corpus, first, last):
+    """Human-readable reference of the verses from first to last, e.g. "Genesis 1:1–3:24"."""
+    (first_book, first_chapter, first_verse), (last_book, last_chapter, last_verse) = (
+        corpus.verse_locations[first], corpus.verse_locations[last])
+    start = f"{corpus.full_book_name(first_book)} {first_chapter}:{first_verse}"
+    if first_book != last_book:
+        return f"{start} – {corpus.full_book_name(last_book)} {last_chapter}:{last_verse}"
+    if first == last:
+        return start
+    return f"{start}–{last_chapter}:{last_verse}"
+
+
+def plan_episodes(corpus, plan):
+    """One episode per day of a compiled reading plan, for render_feed()."""
+    episodes = []
+    for day in range(1, plan.days + 1):
+        verse_ids = plan.day_verse_ids(day)
+        if verse_ids:
+            passages = "; ".join(passage(corpus, first, last) for first, last in plan.day_ranges(day))
+            episodes.append((f"Day {day}: {passages}", f"Day-{day:03d}.mp3", verse_ids))
+    return episodes
+
+
+def load_feed_plan(storage, settings, name, translation, corpus):
+    """Compile a reading plan for a feed, with the same days as in the application when it follows that plan."""
+    weight_name, weight = "characters", None
+    if settings.get("Plan") == name and settings.get("PlanWeights"):
+        try:
+            weights = tuple(float(value) for value in settings["PlanWeights"].split(","))
+            weight_name, weight = f"duration:{weights}", coefficient_weight(weights, corpus)
+        except ValueError:
+            pass
+    return reading_plans.load_plan(storage, name, translation, corpus, weight_name, weight)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render chapters or the days of a reading plan as a podcast feed.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--start", nargs=2, metavar=("BOOK", "CHAPTER"), help="first chapter, e.g. --start Genesis 1")
+    source.add_argument("--plan", choices=list(reading_plans.PLANS), help="one episode per day of a reading plan")
+    parser.add_argument("--end", nargs=2, metavar=("BOOK", "CHAPTER"), help="last chapter (default: same as start)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="reading profile (default: %(default)s)")
+    parser.add_argument("--translation", help="translation file (default: the one selected in the app)")
+    parser.add_argument("--name", help="feed name and folder under Saved_MP3s (default: the chapter range or plan)")
+    parser.add_argument("--serve", action="store_true", help="serve the feed on the local network afterwards")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--base-url", help="URL the folder is reachable at (default: this machine with --port)")
+    args = parser.parse_args()
+    instrumentation.configure_from_environment()
+    if args.plan and args.end:
+        parser.error("--end can only be used with --start")
+
+    profiles = Profiles()
+    if not profiles.exists(args.profile):
+        parser.error(f"No profile named {args.profile}")
+    storage = Storage(profiles.database(args.profile))
+    settings = storage.get_settings()
+
+    def setting(key, default):
+        value = settings.get(key, str(default))
+        return None if value.strip().lower() in ("off", "none", "") else float(value)
+
+    translation = args.translation or settings.get("Translation", "net.csv")
+    corpus = TranslationManager(".").get(translation)
+
+    if args.plan:
+        # Stored with the profile's plans, so the next run doesn't compile it again
+        plan = load_feed_plan(storage, settings, args.plan, translation.split(".")[0], corpus)
+        storage.close()
+        episodes = plan_episodes(corpus, plan)
+        default_name = args.plan
+    else:
+        storage.close()
+
+        def chapter_key(book, chapter):
+            abbreviation = corpus.book_full_to_abbrev.get(book, book)
+            if abbreviation not in corpus.book_to_number:
+                parser.error(f"Unknown book: {book}")
+            return int(corpus.book_to_number[abbreviation]), int(chapter)
+
+        start = chapter_key(*args.start)
+        end = chapter_key(*(args.end or args.start))
+        chapters = chapters_between(corpus, start, end)
+        if not chapters:
+            parser.error("No chapters in that range")
+        episodes = chapter_episodes(corpus, chapters)
+        default_name = (f"{corpus.number_to_book[start[0]]}-{start[1]} to "
+                        f"{corpus.number_to_book[end[0]]}-{end[1]}")
+
+    name = args.name or default_name
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Saved_MP3s", name)
+    base_url = args.base_url or f"http://{local_address()}:{args.port}/"
+    if not base_url.endswith("/"):
+        base_url += "/"
+
+    def progress(done, total):
+        print(f"\r{done}/{total} episodes", end="", flush=True)
+
+    rendered, total = render_feed(EdgeTTS(), settings.get("Voice", "en-US-SteffanNeural"), corpus, episodes,
+                                  directory, name, setting("SilencePadMs", DEFAULT_SILENCE_PAD_MS),
+                                  setting("TargetLoudnessDBFS", DEFAULT_TARGET_DBFS), base_url, progress)
+    print(f"\nRendered {rendered} of {total} episodes into {directory}")
+
+    if args.serve:
+        server = serve(directory, args.port)
+        print(f"Serving the feed at {base_url}{FEED_FILE} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
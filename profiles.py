@@ -0,0 +1,111 @@
+# This module manages reading profiles, so several people can share one installation. Each profile has
+# its own database of settings, read verses, chapter notes and compiled reading plans (whose days are
+# balanced with the duration model frozen when the profile started its plan); the default profile keeps
+# using bible_reader.db, so an existing install becomes the "Default" profile, and other profiles live in
+# Profiles/<name>.db. Translations, audio and voice duration models are shared through the default
+# database.
+#
+# A profile's database is opened the first time it is used and then kept open, so switching back and
+# forth only reloads its read verses and notes. Profiles are created under a file lock, so two instances
+# creating or migrating the same profile at once don't both initialize it.
+
+import os
+import re
+import logging
+
+from file_lock import FileLock
+from storage import Storage
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "Default"
+DEFAULT_DATABASE = "bible_reader.db"
+PROFILE_DIR = "Profiles"
+# Letters, digits, spaces, dashes and underscores, so a name is always a valid file name
+PROFILE_NAME = re.compile(r"^\w[\w \-]{0,39}$")
+# Settings that are about the person rather than the installation, so new profiles don't copy them
+PERSONAL_SETTINGS = ("Plan", "PlanStartDate", "PlanWeights")
+
+
+def valid_profile_name(name):
+    return bool(PROFILE_NAME.match(name)) and name.strip() == name
+
+
+class Profiles:
+    def __init__(self, directory=".", on_error=None):
+        """on_error is passed to the Storage of every profile (see Storage)."""
+        self.directory = directory
+        self.on_error = on_error
+        self._storages = {}
+
+    def database(self, name):
+        """Path of a profile's database."""
+        if name == DEFAULT_PROFILE:
+            return os.path.join(self.directory, DEFAULT_DATABASE)
+        return os.path.join(self.directory, PROFILE_DIR, f"{name}.db")
+
+    def lock(self, name):
+        """Lock held while a profile's database is created or migrated from older files."""
+        return FileLock(self.database(name) + ".lock")
+
+    @property
+    def shared(self):
+        """Storage of the default profile, which also holds what all profiles share."""
+        return self.open(DEFAULT_PROFILE)
+
+    def names(self):
+        """Names of all profiles, the default one first."""
+        names = []
+        try:
+            for filename in os.listdir(os.path.join(self.directory, PROFILE_DIR)):
+                name, extension = os.path.splitext(filename)
+                if extension == ".db" and valid_profile_name(name) and name != DEFAULT_PROFILE:
+                    names.append(name)
+        except OSError:
+            pass
+        return [DEFAULT_PROFILE] + sorted(names, key=str.lower)
+
+    def exists(self, name):
+        return name == DEFAULT_PROFILE or os.path.exists(self.database(name))
+
+    def open(self, name):
+        """Storage of a profile, opened on first use."""
+        storage = self._storages.get(name)
+        if storage is None:
+            if not self.exists(name):
+                raise KeyError(f"No profile named {name}")
+            storage = self._storages[name] = Storage(self.database(name), self.on_error)
+        return storage
+
+    def create(self, name, settings=None):
+        """Create a profile, starting from a copy of settings (without the personal ones). Returns its storage."""
+        if not valid_profile_name(name):
+            raise ValueError(f"{name!r} is not a valid profile name")
+        with self.lock(name):
+            if self.exists(name):
+                raise ValueError(f"A profile named {name} already exists")
+            os.makedirs(os.path.dirname(self.database(name)), exist_ok=True)
+            storage = self._storages[name] = Storage(self.database(name), self.on_error)
+            # Nothing to import from the files of older versions; those belong to the default profile
+            storage.set_meta("migrated_settings", 1)
+            storage.set_meta("migrated_reading_state", 1)
+            if settings:
+                storage.set_settings({key: value for key, value in settings.items()
+                                      if key not in PERSONAL_SETTINGS})
+            storage.flush()
+        log.info("Created profile %s", name)
+        return storage
+
+    def last_used(self):
+        """The profile that was used last, if it still exists."""
+        name = self.shared.get_meta("profile", DEFAULT_PROFILE)
+        return name if self.exists(name) else DEFAULT_PROFILE
+
+    def remember(self, name):
+        self.shared.set_meta("profile", name)
+
+    def close(self):
+        """Flush and close every open profile."""
+        for storage in self._storages.values():
+            storage.close()
+        self._storages.clear()
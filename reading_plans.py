@@ -0,0 +1,212 @@
+# This module defines reading plans and compiles them. A plan is compiled once per translation into a
+# compact array of Verse ID ranges in reading order plus the index of the first range of every day.
+# Days are balanced by estimated reading time (or by verse count) and end on chapter boundaries when the
+# plan has at least as many chapters as days. Compiled plans are stored in the database and only rebuilt
+# when the plan definition or the translation changes; following a plan while reading only looks
+# positions up in the compiled arrays.
+
+import bisect
+import logging
+from array import array
+
+import instrumentation
+
+log = logging.getLogger(__name__)
+
+OLD_TESTAMENT = range(1, 40)
+NEW_TESTAMENT = range(40, 67)
+
+# Approximate order in which the books were written or their events took place
+CHRONOLOGICAL_BOOKS = [
+    1, 18, 2, 3, 4, 5, 6, 7, 8, 9, 10, 13, 19, 11, 20, 21, 22, 12, 14, 29, 32, 30, 28, 23, 33, 34, 36, 35,
+    24, 25, 31, 26, 27, 15, 37, 38, 17, 16, 39,
+    40, 41, 42, 43, 44, 59, 48, 52, 53, 46, 47, 45, 49, 50, 51, 57, 54, 56, 60, 55, 61, 58, 65, 62, 63, 64, 66,
+]
+
+# name -> (book streams read side by side each day, number of days)
+PLANS = {
+    "Whole Bible in a year": ([list(range(1, 67))], 365),
+    "Whole Bible in 90 days": ([list(range(1, 67))], 90),
+    "Chronological in a year": ([CHRONOLOGICAL_BOOKS], 365),
+    "Old and New Testament in a year": ([list(OLD_TESTAMENT), list(NEW_TESTAMENT)], 365),
+    "New Testament in 30 days": ([list(NEW_TESTAMENT)], 30),
+}
+
+
+def character_weight(corpus):
+    """Estimate a verse's reading time from its length."""
+    return lambda verse_id: len(corpus.verse_texts[verse_id]) + 10
+
+
+def partition(units, weights, days):
+    """Split units (in order) into days consecutive groups, keeping the heaviest day as light as possible.
+
+    Returns the index of the first unit of each day, plus len(units) at the end.
+    """
+    def pack(capacity):
+        """Fill days greedily up to capacity. Returns the day starts, or None if more days are needed."""
+        starts = [0]
+        load = 0.0
+        for index, weight in enumerate(weights):
+            # Start a new day when this one is full, or when every remaining day needs one of the remaining units
+            if index > starts[-1] and (load + weight > capacity or len(units) - index <= days - len(starts)):
+                if len(starts) == days:
+                    return None
+                starts.append(index)
+                load = 0.0
+            load += weight
+        return starts
+
+    # Binary search for the smallest capacity that fits into the days
+    low, high = max(weights, default=0.0), float(sum(weights))
+    best = pack(high) or [0]
+    for _ in range(40):
+        if high - low <= 1:
+            break
+        middle = (low + high) / 2
+        starts = pack(middle)
+        if starts is None:
+            low = middle
+        else:
+            best, high = starts, middle
+    best = best + [len(units)] * (days - len(best))
+    return best + [len(units)]
+
+
+class CompiledPlan:
+    def __init__(self, name, ranges, day_starts, verse_ids):
+        """ranges is a flat array of first/last Verse ID pairs in reading order; day_starts holds the index
+        of each day's first range plus the number of ranges; verse_ids is the translation's sorted Verse IDs."""
+        self.name = name
+        self.ranges = ranges
+        self.day_starts = day_starts
+        self.verse_ids = verse_ids
+        # Ranges sorted by first verse, to find the range holding a verse
+        order = sorted(range(len(ranges) // 2), key=lambda r: ranges[2 * r])
+        self._sorted_firsts = [ranges[2 * r] for r in order]
+        self._sorted_ranges = order
+
+    @property
+    def days(self):
+        return len(self.day_starts) - 1
+
+    def range_bounds(self, index):
+        return self.ranges[2 * index], self.ranges[2 * index + 1]
+
+    def range_of(self, verse_id):
+        """Index of the range holding verse_id, or None if it isn't part of the plan."""
+        position = bisect.bisect_right(self._sorted_firsts, verse_id) - 1
+        if position < 0:
+            return None
+        index = self._sorted_ranges[position]
+        first, last = self.range_bounds(index)
+        return index if first <= verse_id <= last else None
+
+    def day_of(self, verse_id):
+        """Day (1-based) on which verse_id is read, or None."""
+        index = self.range_of(verse_id)
+        if index is None:
+            return None
+        return bisect.bisect_right(self.day_starts, index)
+
+    def day_ranges(self, day):
+        """(first, last) Verse ID ranges of a day (1-based)."""
+        return [self.range_bounds(index) for index in range(self.day_starts[day - 1], self.day_starts[day])]
+
+    def day_verse_ids(self, day):
+        """Verse IDs of a day (1-based) in reading order."""
+        verse_ids = []
+        for first, last in self.day_ranges(day):
+            start = bisect.bisect_left(self.verse_ids, first)
+            end = bisect.bisect_right(self.verse_ids, last)
+            verse_ids.extend(self.verse_ids[start:end])
+        return verse_ids
+
+    def next_verse_id(self, verse_id):
+        """Verse after verse_id in plan order, or None at the end of the plan (or outside it)."""
+        index = self.range_of(verse_id)
+        if index is None:
+            return None
+        first, last = self.range_bounds(index)
+        if verse_id < last:
+            return self.verse_ids[bisect.bisect_right(self.verse_ids, verse_id)]
+        if index + 1 < len(self.ranges) // 2:
+            return self.ranges[2 * (index + 1)]
+        return None
+
+    def next_unread(self, unread_index, after_verse_id=None):
+        """First unread verse in plan order after after_verse_id (or from the start of the plan), or None."""
+        start = 0
+        if after_verse_id is not None:
+            index = self.range_of(after_verse_id)
+            if index is not None:
+                first, last = self.range_bounds(index)
+                verse_id = unread_index.next_unread(after_verse_id)
+                if verse_id is not None and verse_id <= last:
+                    return verse_id
+                start = index + 1
+        for index in range(start, len(self.ranges) // 2):
+            first, last = self.range_bounds(index)
+            verse_id = unread_index.next_unread(first - 1)
+            if verse_id is not None and verse_id <= last:
+                return verse_id
+        return None
+
+
+def plan_source(name, corpus, weight_name):
+    """Everything a compiled plan depends on; the plan is rebuilt when this changes."""
+    streams, days = PLANS[name]
+    ids = corpus.verse_ids
+    return repr((streams, days, weight_name, len(ids), ids[0] if ids else None, ids[-1] if ids else None))
+
+
+def compile_plan(name, corpus, weight=None):
+    """Compile a plan from PLANS for a translation. weight(verse_id) defaults to character_weight."""
+    streams, days = PLANS[name]
+    weight = weight or character_weight(corpus)
+    with instrumentation.span("plan.compile", plan=name):
+        chapter_keys = list(corpus.chapters)
+        per_day = [[] for _ in range(days)]  # Verse ID runs per day, across streams
+        for books in streams:
+            chapters = [key for book in books for key in chapter_keys if key[0] == book]
+            # Split inside chapters when there are more days than chapters
+            if len(chapters) >= days:
+                units = [corpus.chapters[key] for key in chapters]
+            else:
+                units = [[verse_id] for key in chapters for verse_id in corpus.chapters[key]]
+            weights = [sum(weight(verse_id) for verse_id in unit) for unit in units]
+            starts = partition(units, weights, days)
+            for day in range(days):
+                per_day[day].append([verse_id for unit in units[starts[day]:starts[day + 1]] for verse_id in unit])
+
+        positions = {verse_id: position for position, verse_id in enumerate(corpus.verse_ids)}
+        ranges = array("I")
+        day_starts = array("I")
+        for runs in per_day:
+            day_starts.append(len(ranges) // 2)
+            for run in runs:
+                # Merge verses that follow each other in the translation into one range
+                for verse_id in run:
+                    if len(ranges) // 2 > day_starts[-1] and positions[verse_id] == positions[ranges[-1]] + 1:
+                        ranges[-1] = verse_id
+                    else:
+                        ranges.extend((verse_id, verse_id))
+        day_starts.append(len(ranges) // 2)
+    return CompiledPlan(name, ranges, day_starts, corpus.verse_ids)
+
+
+def load_plan(storage, name, translation, corpus, weight_name="characters", weight=None):
+    """Return the compiled plan from storage, compiling and storing it first if needed."""
+    source = plan_source(name, corpus, weight_name)
+    row = storage.load_plan(name, translation) if storage is not None else None
+    if row is not None and row[0] == source:
+        ranges, day_starts = array("I"), array("I")
+        ranges.frombytes(row[1])
+        day_starts.frombytes(row[2])
+        return CompiledPlan(name, ranges, day_starts, corpus.verse_ids)
+
+    plan = compile_plan(name, corpus, weight)
+    log.info("Compiled plan %s: %d ranges over %d days", name, len(plan.ranges) // 2, plan.days)
+    if storage is not None:
+        storage.save_plan(name, translation, source, plan.ranges.tobytes(), plan.day_starts.tobytes())
+    return plan
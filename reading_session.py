@@ -0,0 +1,375 @@
+# This module contains the headless reading engine. A ReadingSession owns the reading position, the
+# read-verse state of a translation and the synthesize -> decode -> play -> advance pipeline. It has no
+# Tk dependency: the GUI (or a script, or the benchmarks) drives it through its methods and follows it
+# through event callbacks.
+#
+# States:
+#   idle          nothing is being read
+#   synthesizing  the current verse is being turned into audio
+#   playing       the current verse is being played
+#   paused        playback is paused and can be resumed
+#
+# Events (callback keyword arguments):
+#   "state"     state
+#   "position"  book_number, chapter, verse, verse_id    the engine moved to another verse by itself
+#   "finished"                                           reading reached the last verse
+#   "error"     error                                    the pipeline failed and the session stopped
+
+import os
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+import instrumentation
+from audio import (EdgeTTS, Player, ClipCache, decode_mp3, polish, time_stretch,
+                   DEFAULT_SILENCE_PAD_MS, DEFAULT_TARGET_DBFS)
+from cancellation import CancelToken, run_cancellable
+from unread_index import UnreadIndex
+
+log = logging.getLogger(__name__)
+
+IDLE = "idle"
+SYNTHESIZING = "synthesizing"
+PLAYING = "playing"
+PAUSED = "paused"
+
+
+class ReadingSession:
+    def __init__(self, corpus, voice, translation=None, storage=None, tts=None, player=None, temp_dir=None,
+                 cache=None, estimator=None):
+        self.corpus = corpus
+        self.voice = voice
+        self.speed = 1.0  # Playback speed, 0.75 to 3
+        self.silence_pad_ms = DEFAULT_SILENCE_PAD_MS  # None keeps the TTS engine's silence
+        self.target_dbfs = DEFAULT_TARGET_DBFS  # None keeps the TTS engine's volume
+        self.translation = translation
+        self.storage = storage  # Read verses are only kept in memory when this is None
+        self.tts = tts or EdgeTTS()
+        self.player = player or Player()
+        self.temp_dir = temp_dir or os.path.dirname(os.path.abspath(__file__))
+        self.cache = cache or ClipCache()
+        self.estimator = estimator  # DurationEstimator calibrated with every synthesized verse, or None
+        self.bundle = None  # AudioBundle of the translation and voice, read instead of synthesizing
+
+        self.skip_read_verses = False
+        self.plan = None  # CompiledPlan to follow instead of Bible order, or None
+        self.state = IDLE
+        self.position = None  # (book_number, chapter, verse)
+        self._listeners = defaultdict(list)
+        self._lock = threading.Lock()  # Guards the state, the token and the read verses
+        self._token = None  # Cancel token of the running reading thread
+        self._worker = None
+
+        # Empty until load_read_verses() is called, so callers can migrate older data first. The reading
+        # thread updates these, so other threads only iterate them through the methods below.
+        self.read_verses = set()
+        self.unread_index = UnreadIndex(corpus.verse_ids)
+
+    # === Events ===
+
+    def on(self, event, callback):
+        """Call callback(**data) whenever event is emitted."""
+        self._listeners[event].append(callback)
+
+    def _emit(self, event, **data):
+        for callback in self._listeners[event]:
+            try:
+                callback(**data)
+            except Exception as e:
+                log.exception("Error in %s listener: %s", event, e)
+
+    def _set_state(self, state, token=None):
+        """Change state. With a token, only if that reading run hasn't been cancelled."""
+        with self._lock:
+            if token is not None and token.cancelled:
+                return False
+            changed = state != self.state
+            self.state = state
+        if changed:
+            self._emit("state", state=state)
+        return True
+
+    # === Read state ===
+
+    def set_corpus(self, corpus, translation):
+        """Switch to another translation and load its read verses."""
+        self.stop()
+        self.corpus = corpus
+        self.translation = translation
+        self.plan = None  # Plans and bundles are per translation; the caller loads them again
+        if self.bundle is not None:
+            self.bundle.close()
+            self.bundle = None
+        self.load_read_verses()
+
+    def update_corpus(self, corpus):
+        """Use a reloaded copy of the current translation without stopping."""
+        verse_ids_changed = corpus.verse_ids != self.corpus.verse_ids
+        with self._lock:
+            self.corpus = corpus
+            if verse_ids_changed:
+                self.read_verses &= set(corpus.verse_ids)
+                self.unread_index = UnreadIndex(corpus.verse_ids, self.read_verses)
+
+    def apply_read_changes(self, read, unread):
+        """Update the in-memory state with verses marked read or unread elsewhere (already in storage).
+
+        Returns the Verse IDs whose state changed.
+        """
+        with self._lock:
+            positions = self.unread_index.positions
+            new_verses = [verse_id for verse_id in read if verse_id not in self.read_verses and verse_id in positions]
+            old_verses = [verse_id for verse_id in unread if verse_id in self.read_verses]
+            self.read_verses.update(new_verses)
+            self.read_verses.difference_update(old_verses)
+            self.unread_index.mark_read(new_verses)
+            self.unread_index.mark_unread(old_verses)
+        return new_verses + old_verses
+
+    def load_read_verses(self):
+        """Load the read verses for the current translation and index the unread ones."""
+        if self.storage is not None and self.translation is not None:
+            read_verses = set(self.storage.load_read_verses(self.translation))
+        else:
+            read_verses = set()
+        unread_index = UnreadIndex(self.corpus.verse_ids, read_verses)
+        with self._lock:
+            self.read_verses, self.unread_index = read_verses, unread_index
+        log.info("Loaded %s read verses", len(read_verses))
+
+    def mark_read(self, verse_ids):
+        """Mark verses as read in memory, in the unread index and in storage."""
+        with self._lock:
+            new_verses = [verse_id for verse_id in verse_ids if verse_id not in self.read_verses]
+            self.read_verses.update(new_verses)
+            self.unread_index.mark_read(new_verses)
+        if new_verses:
+            instrumentation.count("verses_marked_read", len(new_verses))
+            if self.storage is not None:
+                self.storage.add_read_verses(self.translation, new_verses)
+
+    def mark_unread(self, verse_ids):
+        """Remove verses from the read verses in memory, in the unread index and in storage."""
+        with self._lock:
+            old_verses = [verse_id for verse_id in verse_ids if verse_id in self.read_verses]
+            self.read_verses.difference_update(old_verses)
+            self.unread_index.mark_unread(old_verses)
+        if old_verses and self.storage is not None:
+            self.storage.remove_read_verses(self.translation, old_verses)
+
+    def clear_read_verses(self):
+        """Forget every read verse of the current translation."""
+        with self._lock:
+            self.read_verses = set()
+            self.unread_index = UnreadIndex(self.corpus.verse_ids)
+        if self.storage is not None:
+            self.storage.clear_read_verses(self.translation)
+
+    def last_read_verse_id(self):
+        """The highest read Verse ID, or None."""
+        with self._lock:
+            return max(self.read_verses, default=None)
+
+    def unread_of(self, verse_ids):
+        """The given Verse IDs that haven't been read, in order."""
+        with self._lock:
+            return [verse_id for verse_id in verse_ids if verse_id not in self.read_verses]
+
+    def next_unread_verse_id(self, after_verse_id=None):
+        """First unread verse after after_verse_id (or from the start) in plan or Bible order, or None."""
+        with self._lock:
+            if self.plan is not None:
+                return self.plan.next_unread(self.unread_index, after_verse_id)
+            return self.unread_index.next_unread(after_verse_id)
+
+    # === Position ===
+
+    def set_position(self, book_number, chapter, verse):
+        """Move to a verse without emitting a position event (used when the caller chose it)."""
+        self.position = (int(book_number), int(chapter), int(verse))
+
+    @property
+    def verse_id(self):
+        """Verse ID of the current position, or None."""
+        if self.position is None:
+            return None
+        return self.corpus.location_to_verse_id.get(self.position)
+
+    def _move_to(self, verse_id):
+        self.position = self.corpus.verse_locations[verse_id]
+        book_number, chapter, verse = self.position
+        self._emit("position", book_number=book_number, chapter=chapter, verse=verse, verse_id=verse_id)
+
+    def _next_verse_id(self, verse_id):
+        """Verse ID to read after verse_id, honouring the plan and skip_read_verses, or None at the end."""
+        if self.skip_read_verses:
+            return self.next_unread_verse_id(verse_id)
+        if self.plan is not None:
+            return self.plan.next_verse_id(verse_id)
+        position = self.unread_index.positions.get(verse_id)
+        if position is None or position + 1 >= len(self.corpus.verse_ids):
+            return None
+        return self.corpus.verse_ids[position + 1]
+
+    # === Playback control ===
+
+    def read(self):
+        """Start reading from the current position, or resume if paused."""
+        if self.state == PAUSED:
+            self.resume()
+            return
+
+        verse_id = self.verse_id
+        if verse_id is None:
+            log.warning("No verse data found!")
+            return
+
+        # Skip to the next unread verse if this one has been read
+        if self.skip_read_verses and verse_id in self.read_verses:
+            log.debug("Skipping read verse: %s", verse_id)
+            self.next_unread()
+            return
+
+        self.stop()
+        self.mark_read([verse_id])
+
+        token = CancelToken()
+        with self._lock:
+            self._token = token
+        self._set_state(SYNTHESIZING)
+        self._worker = threading.Thread(target=self._run, args=(verse_id, token), daemon=True)
+        self._worker.start()
+
+    def next_unread(self):
+        """Move to the next unread verse after the current one and start reading it.
+
+        Returns the Verse ID, or None if there are no unread verses left.
+        """
+        self.stop()
+        verse_id = self.next_unread_verse_id(self.verse_id)
+        if verse_id is None:
+            log.info("No unread verses found")
+            return None
+        self._move_to(verse_id)
+        self.read()
+        return verse_id
+
+    def stop(self):
+        """Stop reading without waiting. Synthesis is cancelled and playback stops within one audio chunk."""
+        with self._lock:
+            token, self._token = self._token, None
+        if token is not None:
+            token.cancel()
+        self._set_state(IDLE)
+
+    def _finish(self, token):
+        """End a reading run from the reading thread. Returns False if it was already cancelled."""
+        with self._lock:
+            if token.cancelled:
+                return False
+            token.cancel()
+            self._token = None
+        self._set_state(IDLE)
+        return True
+
+    def pause(self):
+        token = self._token
+        if token is not None and self.state in (SYNTHESIZING, PLAYING):
+            token.pause()
+            self._set_state(PAUSED, token)
+
+    def resume(self):
+        token = self._token
+        if token is not None and self.state == PAUSED:
+            token.resume()
+            self._set_state(PLAYING, token)
+
+    def wait(self, timeout=None):
+        """Block until the reading thread exits (for scripts and benchmarks)."""
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    # === Pipeline ===
+
+    def _run(self, verse_id, token):
+        """Read verses one after another until stopped or the end is reached."""
+        try:
+            while not token.cancelled:
+                clip = self._clip(verse_id, token)
+                if clip is None:
+                    return
+
+                if not token.paused and not self._set_state(PLAYING, token):
+                    return
+                if not self.player.play(clip, token):
+                    return
+
+                next_verse_id = self._next_verse_id(verse_id)
+                if next_verse_id is None:
+                    if self._finish(token):
+                        self._emit("finished")
+                    return
+
+                if token.cancelled:
+                    return
+                verse_id = next_verse_id
+                self.mark_read([verse_id])
+                self._move_to(verse_id)
+                if not token.paused:
+                    self._set_state(SYNTHESIZING, token)
+        except Exception as e:
+            log.exception("Error reading verse %s: %s", verse_id, e)
+            if self._finish(token):
+                self._emit("error", error=e)
+
+    def _clip(self, verse_id, token):
+        """Audio for a verse at the current voice and speed, from the cache or synthesized.
+
+        Returns None if token was cancelled meanwhile.
+        """
+        voice, speed, pad_ms, target_dbfs = self.voice, self.speed, self.silence_pad_ms, self.target_dbfs
+        # Each speed and audio setting has its own entries
+        key = (self.translation, verse_id, voice, speed, pad_ms, target_dbfs)
+        clip = self.cache.get(key)
+        if clip is not None:
+            return clip
+
+        text = self.corpus.verse_texts[verse_id]
+        bundle = self.bundle
+        data = bundle.get(verse_id, text) if bundle is not None and bundle.voice == voice else None
+        if data is not None:
+            # Bundled audio is at normal speed
+            rate = 1.0
+            clip = polish(decode_mp3(data), pad_ms, target_dbfs)
+        else:
+            # Let the TTS backend speak as fast as it can and time-stretch the rest
+            rate = min(speed, getattr(self.tts, "max_rate", 1.0))
+            clip = self._synthesize(text, voice, rate, token)
+            if clip is None:
+                return None
+            clip = polish(clip, pad_ms, target_dbfs)
+            if self.estimator is not None:
+                self.estimator.observe(voice, text, clip.duration * rate)
+        clip = time_stretch(clip, speed / rate)
+        self.cache.put(key, clip)
+        return clip
+
+    def _synthesize(self, text, voice, rate, token):
+        """Synthesize and decode the audio for text. Returns None if token was cancelled meanwhile."""
+        # Named by process and thread, since other instances may share temp_dir
+        mp3_file = os.path.join(self.temp_dir, f"temp_{os.getpid()}_{threading.get_ident()}.mp3")
+        try:
+            coroutine = self.tts.synthesize(text, voice, mp3_file, rate=rate)
+            if not asyncio.run(run_cancellable(coroutine, token)):
+                return None
+            if not os.path.exists(mp3_file):
+                raise FileNotFoundError(f"MP3 file was not created at {mp3_file}")
+            clip = decode_mp3(mp3_file)
+            return None if token.cancelled else clip
+        finally:
+            if os.path.exists(mp3_file):
+                try:
+                    os.remove(mp3_file)
+                except OSError as e:
+                    log.error("Error removing temporary file %s: %s", mp3_file, e)
@@ -0,0 +1,240 @@
+# This script renders a whole translation (or a range of chapters) to one MP3 per chapter using every
+# CPU core. Synthesis is network-bound and runs as async I/O in the main process; decoding, silence
+# trimming, loudness normalization, joining and MP3 encoding of each chapter run in a pool of worker
+# processes, so they no longer take turns on one core. Failed synthesis requests and chapters are
+# retried, and the outcome of the whole run is collected into one report (printed, and saved as
+# render_report.json next to the files).
+#
+# The output uses the same Saved_MP3s/<name>/<Book>-<chapter>.mp3 layout and manifest as podcast.py, so
+# a feed can be written afterwards without rendering anything again.
+#
+# Usage:
+#   python render_farm.py --translation kjv.csv
+#   python render_farm.py --start Matthew 1 --end John 21 --workers 4
+
+import os
+import sys
+import time
+import json
+import asyncio
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+from audio import EdgeTTS, decode_mp3, polish, DEFAULT_SILENCE_PAD_MS, DEFAULT_TARGET_DBFS
+from mp3_export import assemble, verse_details
+from podcast import episode_fingerprint, load_manifest, update_manifest, chapters_between, directory_lock
+from profiles import Profiles, DEFAULT_PROFILE
+from storage import Storage
+from translations import TranslationManager
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8  # Synthesis requests in flight
+MAX_ATTEMPTS = 3  # Tries per synthesis request and per chapter
+RETRY_DELAY = 2.0  # Seconds before the first retry, doubled for each further one
+REPORT_FILE = "render_report.json"
+
+
+class RenderReport:
+    """Progress and outcome of a render run."""
+
+    def __init__(self, chapters):
+        self.chapters = chapters
+        self.rendered = 0
+        self.skipped = 0  # Already up to date
+        self.failed = []  # (chapter title, error)
+        self.retries = 0
+        self.verses = 0
+        self.audio_seconds = 0.0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def done(self):
+        return self.rendered + self.skipped + len(self.failed)
+
+    def to_dict(self):
+        return {
+            "chapters": self.chapters,
+            "rendered": self.rendered,
+            "skipped": self.skipped,
+            "failed": [{"chapter": title, "error": error} for title, error in self.failed],
+            "retries": self.retries,
+            "verses": self.verses,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "elapsed_seconds": round(self.elapsed, 1),
+        }
+
+    def summary(self):
+        rate = self.verses / self.elapsed if self.elapsed else 0.0
+        lines = [f"Rendered {self.rendered} of {self.chapters} chapters ({self.skipped} already up to date, "
+                 f"{len(self.failed)} failed) in {self.elapsed:.0f} s",
+                 f"{self.verses} verses, {self.audio_seconds / 3600:.1f} h of audio, {rate:.1f} verses/s, "
+                 f"{self.retries} retries"]
+        lines += [f"  FAILED {title}: {error}" for title, error in self.failed]
+        return "\n".join(lines)
+
+
+def finish_chapter(mp3_files, verses, filename, pad_ms, target_dbfs, title):
+    """Decode, polish and join a chapter's verse MP3s into filename (runs in a worker process).
+
+    Returns (duration in ms, duration of each verse in seconds).
+    """
+    clips = [polish(decode_mp3(mp3_file), pad_ms, target_dbfs) for mp3_file in mp3_files]
+    timings = assemble(filename, clips, verses, title)
+    return timings[-1].end_ms, [clip.duration for clip in clips]
+
+
+async def render_chapters(tts, voice, corpus, chapters, directory, pad_ms=DEFAULT_SILENCE_PAD_MS,
+                          target_dbfs=DEFAULT_TARGET_DBFS, workers=None, concurrency=DEFAULT_CONCURRENCY,
+                          progress=None, estimator=None):
+    """Render the chapters ((book_number, chapter) pairs) that are missing or stale into directory.
+
+    progress(report) is called after each chapter. Returns the RenderReport.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    report = RenderReport(len(chapters))
+    workers = workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    synthesis_slots = asyncio.Semaphore(concurrency)
+    # Chapters in flight, so synthesized audio doesn't pile up on disk while the workers catch up
+    chapter_slots = asyncio.Semaphore(workers * 2)
+
+    async def synthesize(text, mp3_file):
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                async with synthesis_slots:
+                    await tts.synthesize(text, voice, mp3_file)
+                return
+            except Exception as e:
+                if attempt + 1 == MAX_ATTEMPTS:
+                    raise
+                report.retries += 1
+                log.warning("Retrying synthesis after error: %s", e)
+                await asyncio.sleep(RETRY_DELAY * 2 ** attempt)
+
+    async def render(pool, temp_dir, book_number, chapter):
+        verse_ids = corpus.chapters[(book_number, chapter)]
+        title = f"{corpus.full_book_name(book_number)} {chapter}"
+        filename = f"{corpus.number_to_book[book_number]}-{chapter}.mp3"
+        path = os.path.join(directory, filename)
+        fingerprint = episode_fingerprint(corpus, verse_ids, voice, pad_ms, target_dbfs)
+        entry = manifest.get(filename)
+        if entry and entry["fingerprint"] == fingerprint and os.path.exists(path):
+            report.skipped += 1
+            return
+
+        async with chapter_slots:
+            mp3_files = [os.path.join(temp_dir, f"{verse_id}.mp3") for verse_id in verse_ids]
+            try:
+                await asyncio.gather(*(synthesize(corpus.verse_texts[verse_id], mp3_file)
+                                       for verse_id, mp3_file in zip(verse_ids, mp3_files)))
+                for attempt in range(MAX_ATTEMPTS):
+                    try:
+                        duration_ms, durations = await loop.run_in_executor(
+                            pool, finish_chapter, mp3_files, verse_details(corpus, verse_ids), path, pad_ms,
+                            target_dbfs, title)
+                        break
+                    except Exception as e:
+                        if attempt + 1 == MAX_ATTEMPTS:
+                            raise
+                        report.retries += 1
+                        log.warning("Retrying %s after error: %s", title, e)
+            except Exception as e:
+                log.error("Failed to render %s: %s", title, e)
+                report.failed.append((title, str(e)))
+                return
+            finally:
+                for mp3_file in mp3_files:
+                    if os.path.exists(mp3_file):
+                        os.remove(mp3_file)
+
+        update_manifest(directory, filename, {"fingerprint": fingerprint, "duration_ms": duration_ms})
+        report.rendered += 1
+        report.verses += len(verse_ids)
+        report.audio_seconds += duration_ms / 1000
+        if estimator is not None:
+            for verse_id, seconds in zip(verse_ids, durations):
+                estimator.observe(voice, corpus.verse_texts[verse_id], seconds)
+
+    async def render_and_report(pool, temp_dir, key):
+        await render(pool, temp_dir, *key)
+        report.elapsed = time.monotonic() - report.started
+        if progress:
+            progress(report)
+
+    with instrumentation.span("render_farm.render", chapters=len(chapters), workers=workers):
+        with tempfile.TemporaryDirectory(prefix="bible_render_") as temp_dir:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                await asyncio.gather(*(render_and_report(pool, temp_dir, key) for key in chapters))
+
+    report.elapsed = time.monotonic() - report.started
+    with directory_lock(directory), open(os.path.join(directory, REPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump(report.to_dict(), f, indent=1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render chapters to MP3 files on every CPU core.")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="reading profile (default: %(default)s)")
+    parser.add_argument("--translation", help="translation file (default: the one selected in the app)")
+    parser.add_argument("--voice", help="voice (default: the one selected in the app)")
+    parser.add_argument("--start", nargs=2, metavar=("BOOK", "CHAPTER"), help="first chapter (default: the first)")
+    parser.add_argument("--end", nargs=2, metavar=("BOOK", "CHAPTER"), help="last chapter (default: the last)")
+    parser.add_argument("--name", help="folder under Saved_MP3s (default: translation and voice)")
+    parser.add_argument("--workers", type=int, help="processes for decoding and encoding (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="synthesis requests in flight")
+    args = parser.parse_args()
+    instrumentation.configure_from_environment()
+
+    profiles = Profiles()
+    if not profiles.exists(args.profile):
+        parser.error(f"No profile named {args.profile}")
+    storage = Storage(profiles.database(args.profile))
+    settings = storage.get_settings()
+    storage.close()
+
+    def setting(key, default):
+        value = settings.get(key, str(default))
+        return None if value.strip().lower() in ("off", "none", "") else float(value)
+
+    translation = args.translation or settings.get("Translation", "net.csv")
+    voice = args.voice or settings.get("Voice", "en-US-SteffanNeural")
+    corpus = TranslationManager(".").get(translation)
+
+    def chapter_key(book, chapter):
+        abbreviation = corpus.book_full_to_abbrev.get(book, book)
+        if abbreviation not in corpus.book_to_number:
+            parser.error(f"Unknown book: {book}")
+        return int(corpus.book_to_number[abbreviation]), int(chapter)
+
+    keys = list(corpus.chapters)
+    start = chapter_key(*args.start) if args.start else keys[0]
+    end = chapter_key(*args.end) if args.end else keys[-1]
+    chapters = chapters_between(corpus, start, end)
+    if not chapters:
+        parser.error("No chapters in that range")
+
+    name = args.name or f"{translation.split('.')[0]} {voice}"
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Saved_MP3s", name)
+
+    def progress(report):
+        print(f"\r{report.done}/{report.chapters} chapters, {len(report.failed)} failed", end="", flush=True)
+
+    report = asyncio.run(render_chapters(EdgeTTS(), voice, corpus, chapters, directory,
+                                         setting("SilencePadMs", DEFAULT_SILENCE_PAD_MS),
+                                         setting("TargetLoudnessDBFS", DEFAULT_TARGET_DBFS),
+                                         args.workers, args.concurrency, progress))
+    print()
+    print(report.summary())
+    print(f"Files and {REPORT_FILE} are in {directory}")
+    sys.exit(1 if report.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
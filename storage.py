@@ -0,0 +1,531 @@
+# This module keeps the application's persistent state (settings, read verses, chapter notes, compiled
+# reading plans and audio duration models) in a SQLite database, one per reading profile (see profiles.py).
+# The database runs in WAL mode so the Tk thread can read while a single background writer thread
+# applies queued changes. Writes are batched into one transaction per burst, so marking a whole book as
+# read or rapidly changing settings never blocks the UI on disk I/O. A write that fails is undone on its
+# own, without the rest of its batch, and reported to the owner of the storage.
+# Changes to read verses and notes are logged so sync.py can exchange them with other computers.
+# It also performs a one-time migration from the older config.ini / read_verses_<tr>.csv / notes.csv files.
+
+import os
+import csv
+import glob
+import queue
+import logging
+import sqlite3
+import threading
+import configparser
+
+from file_lock import FileLock
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS read_verses (
+    translation TEXT NOT NULL,
+    verse_id INTEGER NOT NULL,
+    PRIMARY KEY (translation, verse_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS notes (
+    book_number INTEGER NOT NULL,
+    chapter INTEGER NOT NULL,
+    notes TEXT NOT NULL,
+    PRIMARY KEY (book_number, chapter)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS plans (
+    name TEXT NOT NULL,
+    translation TEXT NOT NULL,
+    source TEXT NOT NULL,
+    ranges BLOB NOT NULL,
+    day_starts BLOB NOT NULL,
+    PRIMARY KEY (name, translation)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS duration_models (
+    voice TEXT PRIMARY KEY,
+    stats BLOB NOT NULL
+);
+
+-- Change tracking for sync.py and for noticing changes made by other instances. Every verse marked as read
+-- or unread is logged (read verses with the device they were imported from, or NULL if read here), and every
+-- note has a last-writer-wins stamp (milliseconds since the epoch and
+-- the database's device ID; deleted notes keep theirs), so an export only reads what changed since the
+-- previous one.
+INSERT OR IGNORE INTO meta (key, value) VALUES ('device_id', lower(hex(randomblob(8))));
+CREATE TABLE IF NOT EXISTS read_log (
+    seq INTEGER PRIMARY KEY,
+    translation TEXT NOT NULL,
+    verse_id INTEGER NOT NULL,
+    origin TEXT,
+    read INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS read_log_verse ON read_log (translation, verse_id);
+CREATE TABLE IF NOT EXISTS note_stamps (
+    book_number INTEGER NOT NULL,
+    chapter INTEGER NOT NULL,
+    updated INTEGER NOT NULL,
+    device TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (book_number, chapter)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS note_stamps_seq ON note_stamps (seq);
+CREATE TRIGGER IF NOT EXISTS log_read_verse AFTER INSERT ON read_verses BEGIN
+    INSERT INTO read_log (translation, verse_id) VALUES (NEW.translation, NEW.verse_id);
+END;
+CREATE TRIGGER IF NOT EXISTS log_unread_verse AFTER DELETE ON read_verses BEGIN
+    INSERT INTO read_log (translation, verse_id, read) VALUES (OLD.translation, OLD.verse_id, 0);
+END;
+CREATE TRIGGER IF NOT EXISTS stamp_inserted_note AFTER INSERT ON notes BEGIN
+    INSERT OR REPLACE INTO note_stamps (book_number, chapter, updated, device, seq)
+    VALUES (NEW.book_number, NEW.chapter, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER),
+            (SELECT value FROM meta WHERE key = 'device_id'),
+            (SELECT COALESCE(MAX(seq), 0) + 1 FROM note_stamps));
+END;
+CREATE TRIGGER IF NOT EXISTS stamp_updated_note AFTER UPDATE ON notes BEGIN
+    INSERT OR REPLACE INTO note_stamps (book_number, chapter, updated, device, seq)
+    VALUES (NEW.book_number, NEW.chapter, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER),
+            (SELECT value FROM meta WHERE key = 'device_id'),
+            (SELECT COALESCE(MAX(seq), 0) + 1 FROM note_stamps));
+END;
+CREATE TRIGGER IF NOT EXISTS stamp_deleted_note AFTER DELETE ON notes BEGIN
+    INSERT OR REPLACE INTO note_stamps (book_number, chapter, updated, device, seq)
+    VALUES (OLD.book_number, OLD.chapter, CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER),
+            (SELECT value FROM meta WHERE key = 'device_id'),
+            (SELECT COALESCE(MAX(seq), 0) + 1 FROM note_stamps));
+END;
+"""
+
+MAX_BATCH = 500  # Maximum number of queued writes applied in one transaction
+# Columns added to read_log after it was introduced, with their definitions
+READ_LOG_COLUMNS = {"origin": "origin TEXT", "read": "read INTEGER NOT NULL DEFAULT 1"}
+
+
+class Storage:
+    def __init__(self, path="bible_reader.db", on_error=None):
+        """on_error(sql, error) is called on the writer thread for every queued write that failed."""
+        self.path = path
+        self.on_error = on_error
+        self.failed_writes = 0
+        self._queue = queue.Queue()
+
+        # Connection used for reads on the calling (Tk) thread
+        self.connection = self._connect()
+        self._upgrade_change_log()
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self._start_change_log()
+
+        # Change log positions already seen by external_changes(), and the ranges our own writer logged
+        self._seen = self._change_log_positions(self.connection)
+        self._own_changes = []  # (first, last) positions of our batches, in commit order
+        self._own_changes_lock = threading.Lock()
+
+        # Single writer thread with its own connection
+        self._writer = threading.Thread(target=self._writer_loop, name="storage-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # === Writer ===
+
+    def _writer_loop(self):
+        """Apply queued writes, batching everything that is already waiting into one transaction.
+
+        Each write runs in its own savepoint, so one that fails is undone and reported without losing the
+        rest of the batch.
+        """
+        connection = self._connect()
+        connection.isolation_level = None  # Transactions and savepoints are managed here
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            failed = []
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                before = self._change_log_positions(connection)
+                for item in batch:
+                    if item is None:
+                        running = False
+                        continue
+                    sql, params = item
+                    connection.execute("SAVEPOINT write")
+                    try:
+                        if isinstance(params, list):
+                            connection.executemany(sql, params)
+                        else:
+                            connection.execute(sql, params)
+                    except sqlite3.Error as e:
+                        connection.execute("ROLLBACK TO write")
+                        failed.append((sql, e))
+                    connection.execute("RELEASE write")
+                after = self._change_log_positions(connection)
+                connection.execute("COMMIT")
+                if after != before:
+                    with self._own_changes_lock:
+                        self._own_changes.append((before, after))
+            except Exception as e:  # The transaction itself failed (locked database, full disk, ...)
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                failed = [(item[0], e) for item in batch if item is not None]
+            finally:
+                for sql, error in failed:
+                    self._report_failure(sql, error)
+                for _ in batch:
+                    self._queue.task_done()
+        connection.close()
+
+    def _report_failure(self, sql, error):
+        """Log a write that couldn't be applied and pass it to on_error (called on the writer thread)."""
+        log.error("Error writing to %s: %s (%s)", self.path, error, sql)
+        self.failed_writes += 1
+        if self.on_error is not None:
+            try:
+                self.on_error(sql, error)
+            except Exception as e:
+                log.exception("Error reporting a failed write: %s", e)
+
+    def _read_log_columns(self):
+        return {row[1] for row in self.connection.execute("PRAGMA table_info(read_log)")}
+
+    def _upgrade_change_log(self):
+        """Add the read_log columns of newer versions to a database created by an older one."""
+        columns = self._read_log_columns()
+        if not columns or columns.issuperset(READ_LOG_COLUMNS):
+            return  # New database (the schema creates the table) or already upgraded
+        self.connection.execute("BEGIN IMMEDIATE")  # Another instance may be doing the same
+        try:
+            columns = self._read_log_columns()
+            for column, definition in READ_LOG_COLUMNS.items():
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE read_log ADD COLUMN {definition}")
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+
+    def _start_change_log(self):
+        """Log the read verses and notes saved before changes were tracked, so the first export includes them.
+
+        Their notes get the oldest possible stamp, so any edit made since wins over them.
+        """
+        if self.get_meta("change_log_started"):
+            return
+        self.connection.execute("BEGIN IMMEDIATE")  # Another instance may be doing the same
+        try:
+            if self.connection.execute("SELECT 1 FROM meta WHERE key = 'change_log_started'").fetchone() is None:
+                self.connection.execute("INSERT INTO read_log (translation, verse_id) "
+                                        "SELECT translation, verse_id FROM read_verses ORDER BY translation, verse_id")
+                self.connection.execute("INSERT OR IGNORE INTO note_stamps "
+                                        "(book_number, chapter, updated, device, seq) "
+                                        "SELECT book_number, chapter, 0, '', ROW_NUMBER() OVER () FROM notes")
+                self.connection.execute("INSERT INTO meta (key, value) VALUES ('change_log_started', '1')")
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+
+    def _submit(self, sql, params=()):
+        self._queue.put((sql, params))
+
+    def open_reader(self):
+        """A separate connection for reading from a thread other than the Tk thread."""
+        return self._connect()
+
+    def flush(self):
+        """Block until every queued write has been committed (or reported as failed)."""
+        self._queue.join()
+
+    def idle(self):
+        """Whether every queued write has been committed (or reported as failed)."""
+        return self._queue.unfinished_tasks == 0
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self.connection.close()
+
+    # === Meta ===
+
+    def get_meta(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self._submit("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # === Settings ===
+
+    def get_settings(self):
+        """Return all settings as a dict of strings."""
+        return dict(self.connection.execute("SELECT key, value FROM settings"))
+
+    def set_setting(self, key, value):
+        self._submit("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def set_settings(self, settings):
+        self._submit("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                     [(key, str(value)) for key, value in settings.items()])
+
+    # === Read verses ===
+
+    def load_read_verses(self, translation, connection=None):
+        """Return the sorted Verse IDs read in the given translation."""
+        rows = (connection or self.connection).execute(
+            "SELECT verse_id FROM read_verses WHERE translation = ? ORDER BY verse_id", (translation,))
+        return [row[0] for row in rows]
+
+    def add_read_verses(self, translation, verse_ids):
+        self._submit("INSERT OR IGNORE INTO read_verses (translation, verse_id) VALUES (?, ?)",
+                     [(translation, int(verse_id)) for verse_id in verse_ids])
+
+    def remove_read_verses(self, translation, verse_ids):
+        self._submit("DELETE FROM read_verses WHERE translation = ? AND verse_id = ?",
+                     [(translation, int(verse_id)) for verse_id in verse_ids])
+
+    def clear_read_verses(self, translation):
+        self._submit("DELETE FROM read_verses WHERE translation = ?", (translation,))
+
+    # === Notes ===
+
+    def load_notes(self, connection=None):
+        """Return all chapter notes as a dict of (book_number, chapter) -> text."""
+        rows = (connection or self.connection).execute("SELECT book_number, chapter, notes FROM notes")
+        return {(book_number, chapter): text for book_number, chapter, text in rows}
+
+    def save_note(self, book_number, chapter, text):
+        self._submit("INSERT OR REPLACE INTO notes (book_number, chapter, notes) VALUES (?, ?, ?)",
+                     (int(book_number), int(chapter), text))
+
+    def delete_note(self, book_number, chapter):
+        self._submit("DELETE FROM notes WHERE book_number = ? AND chapter = ?", (int(book_number), int(chapter)))
+
+    # === Sync ===
+
+    def read_log_since(self, seq):
+        """(seq, translation, Verse ID) of the verses marked as read here (not imported) after seq that are
+        still read."""
+        return self.connection.execute(
+            "SELECT l.seq, l.translation, l.verse_id FROM read_log l JOIN read_verses r "
+            "ON r.translation = l.translation AND r.verse_id = l.verse_id "
+            "WHERE l.seq > ? AND l.read AND l.origin IS NULL ORDER BY l.seq", (seq,)).fetchall()
+
+    def import_read_verses(self, translation, verse_ids, origin):
+        """Mark verses read on the device origin as read, logging them as imported from there."""
+        rows = [(translation, int(verse_id)) for verse_id in verse_ids]
+        self._submit("INSERT OR IGNORE INTO read_verses (translation, verse_id) VALUES (?, ?)", rows)
+        # Queued after the verses, so this tags the rows their trigger logs
+        self._submit("UPDATE read_log SET origin = ? WHERE seq = (SELECT MAX(seq) FROM read_log "
+                     "WHERE translation = ? AND verse_id = ?) AND origin IS NULL",
+                     [(origin,) + row for row in rows])
+
+    def missing_read_verses(self, translation, verse_ids):
+        """The given Verse IDs that aren't marked as read."""
+        cursor = self.connection.cursor()
+        query = "SELECT 1 FROM read_verses WHERE translation = ? AND verse_id = ?"
+        return [verse_id for verse_id in verse_ids if cursor.execute(query, (translation, verse_id)).fetchone() is None]
+
+    def note_stamps_since(self, seq):
+        """(seq, book_number, chapter, updated, device, text or None if deleted) of the notes changed after seq."""
+        return self.connection.execute(
+            "SELECT s.seq, s.book_number, s.chapter, s.updated, s.device, n.notes FROM note_stamps s "
+            "LEFT JOIN notes n ON n.book_number = s.book_number AND n.chapter = s.chapter "
+            "WHERE s.seq > ? ORDER BY s.seq", (seq,)).fetchall()
+
+    def note_stamp(self, book_number, chapter):
+        """(updated, device, text or None) of a chapter's note, or None if it was never written."""
+        return self.connection.execute(
+            "SELECT s.updated, s.device, n.notes FROM note_stamps s "
+            "LEFT JOIN notes n ON n.book_number = s.book_number AND n.chapter = s.chapter "
+            "WHERE s.book_number = ? AND s.chapter = ?", (int(book_number), int(chapter))).fetchone()
+
+    def apply_note(self, book_number, chapter, text, updated, device):
+        """Save (or with text None, delete) a note written elsewhere, keeping its original stamp."""
+        key = (int(book_number), int(chapter))
+        if text is None:
+            self.delete_note(*key)
+        else:
+            self.save_note(*key, text)
+        # Queued after the note, so this replaces the stamp its trigger gives it
+        self._submit("INSERT OR REPLACE INTO note_stamps (book_number, chapter, updated, device, seq) "
+                     "VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM note_stamps))",
+                     key + (int(updated), device))
+
+    # === Changes made by other connections ===
+
+    @staticmethod
+    def _change_log_positions(connection):
+        """(last read_log seq, last note_stamps seq)."""
+        return connection.execute("SELECT (SELECT COALESCE(MAX(seq), 0) FROM read_log), "
+                                  "(SELECT COALESCE(MAX(seq), 0) FROM note_stamps)").fetchone()
+
+    def external_changes(self):
+        """Read verses and notes changed by other instances or sync tools since the previous call.
+
+        Returns ({translation: (Verse IDs now read, Verse IDs now unread)}, {(book_number, chapter): text or
+        None if deleted}), both as they are in the database now. Call it when idle(), so our own queued
+        writes are committed and recognized as ours.
+        """
+        seen = self._seen
+        self._seen = self._change_log_positions(self.connection)
+        with self._own_changes_lock:
+            own = self._own_changes
+            # Batches committed after the positions were read are needed again next time
+            self._own_changes = [(before, after) for before, after in own
+                                 if after[0] > self._seen[0] or after[1] > self._seen[1]]
+
+        def external(seq, column):
+            return not any(before[column] < seq <= after[column] for before, after in own)
+
+        verses = {}
+        for seq, translation, verse_id in self.connection.execute(
+                "SELECT seq, translation, verse_id FROM read_log WHERE seq > ? AND seq <= ?",
+                (seen[0], self._seen[0])):
+            if external(seq, 0):
+                verses.setdefault(translation, set()).add(verse_id)
+        read_changes = {}
+        for translation, verse_ids in verses.items():
+            unread = self.missing_read_verses(translation, sorted(verse_ids))
+            read_changes[translation] = (sorted(verse_ids.difference(unread)), unread)
+
+        notes = {}
+        for seq, book_number, chapter, text in self.connection.execute(
+                "SELECT s.seq, s.book_number, s.chapter, n.notes FROM note_stamps s "
+                "LEFT JOIN notes n ON n.book_number = s.book_number AND n.chapter = s.chapter "
+                "WHERE s.seq > ? AND s.seq <= ?", (seen[1], self._seen[1])):
+            if external(seq, 1):
+                notes[(book_number, chapter)] = text
+        return read_changes, notes
+
+    # === Reading plans ===
+
+    def load_plan(self, name, translation):
+        """Return (source, ranges, day_starts) of a compiled plan, or None."""
+        return self.connection.execute(
+            "SELECT source, ranges, day_starts FROM plans WHERE name = ? AND translation = ?",
+            (name, translation)).fetchone()
+
+    def save_plan(self, name, translation, source, ranges, day_starts):
+        self._submit("INSERT OR REPLACE INTO plans (name, translation, source, ranges, day_starts) "
+                     "VALUES (?, ?, ?, ?, ?)", (name, translation, source, ranges, day_starts))
+
+    # === Duration models ===
+
+    def load_duration_model(self, voice):
+        row = self.connection.execute("SELECT stats FROM duration_models WHERE voice = ?", (voice,)).fetchone()
+        return row[0] if row else None
+
+    def save_duration_model(self, voice, stats):
+        self._submit("INSERT OR REPLACE INTO duration_models (voice, stats) VALUES (?, ?)", (voice, stats))
+
+    # === Migration from the older flat files ===
+
+    def migrate_settings(self, config_file, keys):
+        """Import the given setting keys from config.ini once, if it exists.
+
+        configparser lowercases keys when writing, so they are matched case-insensitively.
+        """
+        if self.get_meta("migrated_settings") or not os.path.exists(config_file):
+            return
+        with FileLock(self.path + ".lock"):
+            if self.get_meta("migrated_settings"):
+                return  # Another instance migrated them while we waited
+            try:
+                config = configparser.ConfigParser()
+                config.read(config_file)
+                if 'Settings' in config:
+                    section = config['Settings']
+                    self.set_settings({key: section[key] for key in keys if key in section})
+                log.info("Migrated settings from %s", config_file)
+            except Exception as e:
+                log.error("Error migrating %s: %s", config_file, e)
+            self.set_meta("migrated_settings", 1)
+            self.flush()
+
+    def migrate_reading_state(self, notes_file, current_translation, resolve_verse_id=None):
+        """Import read_verses_<tr>.csv files and notes.csv once.
+
+        The legacy read_verses.csv (from before translations were supported) is imported into
+        current_translation. Entries in the old "book:chapter:verse" format are converted with
+        resolve_verse_id(book_number, chapter, verse) when given.
+        """
+        if self.get_meta("migrated_reading_state"):
+            return
+        with FileLock(self.path + ".lock"):
+            if not self.get_meta("migrated_reading_state"):  # Another instance may have done it while we waited
+                self._migrate_reading_state(notes_file, current_translation, resolve_verse_id)
+
+    def _migrate_reading_state(self, notes_file, current_translation, resolve_verse_id):
+        verse_files = {}
+        for path in glob.glob("read_verses_*.csv"):
+            translation = os.path.basename(path)[len("read_verses_"):-len(".csv")]
+            verse_files.setdefault(translation, []).append(path)
+        if os.path.exists("read_verses.csv"):
+            verse_files.setdefault(current_translation, []).append("read_verses.csv")
+
+        for translation, paths in verse_files.items():
+            verse_ids = set()
+            for path in paths:
+                try:
+                    with open(path, newline='') as f:
+                        for row in csv.DictReader(f):
+                            verse_id = self._parse_verse_id(row.get("Verse ID"), resolve_verse_id)
+                            if verse_id is not None:
+                                verse_ids.add(verse_id)
+                except Exception as e:
+                    log.error("Error migrating %s: %s", path, e)
+            self.add_read_verses(translation, sorted(verse_ids))
+            log.info("Migrated %s read verses for %s", len(verse_ids), translation)
+
+        if os.path.exists(notes_file):
+            try:
+                notes = {}
+                with open(notes_file, newline='') as f:
+                    for row in csv.DictReader(f):
+                        if row.get("Notes"):
+                            # Later rows win, matching how notes were loaded from the CSV
+                            notes[(int(float(row["Book Number"])), int(float(row["Chapter"])))] = row["Notes"]
+                self._submit("INSERT OR REPLACE INTO notes (book_number, chapter, notes) VALUES (?, ?, ?)",
+                             [(book_number, chapter, text) for (book_number, chapter), text in notes.items()])
+                log.info("Migrated %s chapter notes", len(notes))
+            except Exception as e:
+                log.error("Error migrating %s: %s", notes_file, e)
+
+        self.set_meta("migrated_reading_state", 1)
+        self.flush()
+
+    @staticmethod
+    def _parse_verse_id(value, resolve_verse_id):
+        """Convert a Verse ID cell from the old CSV files to an int, or None if it is unusable."""
+        if value is None:
+            return None
+        value = str(value).strip()
+        try:
+            return int(float(value))
+        except ValueError:
+            pass
+        parts = value.split(":")
+        if len(parts) == 3 and resolve_verse_id is not None:
+            try:
+                return resolve_verse_id(*map(int, parts))
+            except Exception:
+                return None
+        return None
@@ -0,0 +1,207 @@
+# This script keeps reading progress and notes in step between computers without either one overwriting
+# the other. Read verses form a grow-only set: merging two computers' progress is their union, so a verse
+# read on either one stays read on both. Each chapter's note is a last-writer-wins register stamped with the
+# time it was written and the ID of the database that wrote it (which breaks ties); the newest version wins,
+# and a deleted note keeps its stamp so the deletion wins over older versions too. Merges can be applied in
+# any order and more than once with the same result.
+#
+# Only changes are exchanged. An export holds what changed on this computer since the previous export to
+# the same peer, read from the change log in storage.py, and an import touches only the verses and notes in
+# the file, so both take time proportional to the changes. Imported changes aren't exported again (that
+# would echo them back to where they came from), so with more than two computers each one exports to
+# every other. Delta files are small: the read verses of each translation
+# are stored as the gaps between their sorted Verse IDs, packed as variable-length integers (7 bits per
+# byte), so a run of consecutive verses costs a byte each and the whole file is compressed.
+#
+# Layout: magic "BIBLESYN", version (u16), reserved (u16), body length (u32), then the zlib-compressed body:
+# JSON metadata (device, packed read verses per translation, notes) followed by the packed IDs back to back.
+#
+# The application doesn't need to be closed; it picks up imported changes while running.
+#
+# Usage:
+#   python sync.py export laptop.bsync             on the laptop, then copy the file to the desktop
+#   python sync.py import laptop.bsync             on the desktop
+#   python sync.py --profile Anna export desktop.bsync --peer laptop
+
+import os
+import json
+import time
+import zlib
+import struct
+import logging
+import argparse
+
+import instrumentation
+from profiles import Profiles, DEFAULT_PROFILE
+from storage import Storage
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"BIBLESYN"
+VERSION = 2
+HEADER = struct.Struct("=8sHHI")
+DEFAULT_PEER = "default"
+
+
+def encode_verse_ids(verse_ids):
+    """Pack a set of Verse IDs as the varint-coded gaps between them in ascending order."""
+    packed = bytearray()
+    previous = 0
+    for verse_id in sorted(verse_ids):
+        gap = verse_id - previous
+        previous = verse_id
+        while gap > 0x7F:
+            packed.append(gap & 0x7F | 0x80)
+            gap >>= 7
+        packed.append(gap)
+    return bytes(packed)
+
+
+def decode_verse_ids(packed):
+    """The sorted Verse IDs packed by encode_verse_ids()."""
+    verse_ids = []
+    previous = gap = shift = 0
+    for byte in packed:
+        gap |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += gap
+        verse_ids.append(previous)
+        gap = shift = 0
+    return verse_ids
+
+
+def write_delta(path, device, read_verses, notes):
+    """Write a delta file. read_verses maps translations to Verse IDs; notes are
+    (book_number, chapter, updated, device, text or None) registers."""
+    entries, packed = [], []
+    for translation, verse_ids in sorted(read_verses.items()):
+        ids = encode_verse_ids(verse_ids)
+        entries.append({"translation": translation, "count": len(verse_ids), "length": len(ids)})
+        packed.append(ids)
+    metadata = json.dumps({"device": device, "created": int(time.time() * 1000), "read": entries,
+                           "notes": [list(note) for note in notes]}, ensure_ascii=False).encode("utf-8")
+    body = zlib.compress(struct.pack("=I", len(metadata)) + metadata + b"".join(packed), 9)
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(body)))
+        f.write(body)
+    os.replace(path + ".tmp", path)
+
+
+def read_delta(path):
+    """Return (metadata, {translation: Verse IDs}) of a delta file."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is not a sync file")
+    magic, version, _, length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} sync file")
+    body = zlib.decompress(data[HEADER.size:HEADER.size + length])
+    (metadata_length,) = struct.unpack_from("=I", body)
+    position = 4 + metadata_length
+    metadata = json.loads(body[4:position])
+    read_verses = {}
+    for entry in metadata["read"]:
+        ids = body[position:position + entry["length"]]
+        position += entry["length"]
+        read_verses[entry["translation"]] = decode_verse_ids(ids)
+    return metadata, read_verses
+
+
+def _cursor_key(peer):
+    return f"sync_sent:{peer}"
+
+
+def export_delta(storage, path, peer=DEFAULT_PEER, full=False):
+    """Write the read verses and notes changed since the last export to peer (or all of them) into path.
+
+    Returns (verses, notes) written.
+    """
+    storage.flush()
+    read_seq, note_seq = 0, 0
+    if not full:
+        read_seq, note_seq = map(int, storage.get_meta(_cursor_key(peer), "0 0").split())
+    with instrumentation.span("sync.export", peer=peer):
+        read_rows = storage.read_log_since(read_seq)
+        note_rows = storage.note_stamps_since(note_seq)
+        read_verses = {}
+        for _, translation, verse_id in read_rows:
+            read_verses.setdefault(translation, set()).add(verse_id)
+        # Notes stamped by another device were imported from it ("" marks notes older than the change log)
+        own_device = storage.get_meta("device_id")
+        notes = [(book_number, chapter, updated, device, text)
+                 for _, book_number, chapter, updated, device, text in note_rows if device in (own_device, "")]
+        write_delta(path, own_device, read_verses, notes)
+
+    # Only move on once the file is written, so nothing is lost if exporting fails
+    read_seq = max([read_seq] + [row[0] for row in read_rows[-1:]])
+    note_seq = max([note_seq] + [row[0] for row in note_rows[-1:]])
+    storage.set_meta(_cursor_key(peer), f"{read_seq} {note_seq}")
+    storage.flush()
+    verses = sum(len(verse_ids) for verse_ids in read_verses.values())
+    log.info("Exported %d read verses and %d notes to %s", verses, len(notes), path)
+    return verses, len(notes)
+
+
+def _register(updated, device, text):
+    """Sort key of a note register; the largest one wins."""
+    return updated, device, text is not None, text or ""
+
+
+def import_delta(storage, path):
+    """Merge a delta file into storage. Returns (verses newly marked as read, notes changed)."""
+    metadata, read_verses = read_delta(path)
+    with instrumentation.span("sync.import"):
+        added = 0
+        for translation, verse_ids in read_verses.items():
+            missing = storage.missing_read_verses(translation, verse_ids)
+            storage.import_read_verses(translation, missing, metadata["device"])
+            added += len(missing)
+
+        changed = 0
+        for book_number, chapter, updated, device, text in metadata["notes"]:
+            local = storage.note_stamp(book_number, chapter)
+            if local is None or _register(updated, device, text) > _register(*local):
+                storage.apply_note(book_number, chapter, text, updated, device)
+                changed += 1
+        storage.flush()
+    log.info("Imported %d read verses and %d notes from %s (device %s)", added, changed, path,
+             metadata.get("device"))
+    return added, changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exchange reading progress and notes with another computer.")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="reading profile (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="write the changes since the last export to a file")
+    export_parser.add_argument("file")
+    export_parser.add_argument("--peer", default=DEFAULT_PEER,
+                               help="computer the file is for; each peer gets the changes it hasn't seen")
+    export_parser.add_argument("--full", action="store_true", help="include everything, not only the changes")
+    import_parser = commands.add_parser("import", help="merge a file exported on another computer")
+    import_parser.add_argument("file")
+    args = parser.parse_args()
+    instrumentation.configure_from_environment()
+
+    profiles = Profiles()
+    if not profiles.exists(args.profile):
+        parser.error(f"No profile named {args.profile}")
+    storage = Storage(profiles.database(args.profile))
+    try:
+        if args.command == "export":
+            verses, notes = export_delta(storage, args.file, args.peer, args.full)
+            print(f"Wrote {verses} read verses and {notes} notes to {args.file}")
+        else:
+            added, changed = import_delta(storage, args.file)
+            print(f"Marked {added} more verses as read and updated {changed} notes")
+    finally:
+        storage.close()
+    if storage.failed_writes:
+        parser.exit(1, f"{storage.failed_writes} changes could not be saved; see the log for details\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# A small generated translation with the same columns as net.csv, for tests that need a Corpus.
+
+import pandas as pd
+
+from translations import Corpus
+
+BOOKS = [(1, "Gen", "Genesis"), (2, "Exo", "Exodus"), (40, "Mat", "Matthew"), (43, "Joh", "John")]
+
+
+def sample_bible_data(chapters=3, verses=4, books=BOOKS):
+    rows = []
+    for book_number, abbreviation, full_name in books:
+        for chapter in range(1, chapters + 1):
+            for verse in range(1, verses + 1):
+                rows.append({
+                    "Verse ID": book_number * 1000000 + chapter * 1000 + verse,
+                    "Book Number": book_number,
+                    "Book Abbreviation": abbreviation,
+                    "Full Book Name": full_name,
+                    "Chapter": chapter,
+                    "Verse": verse,
+                    "Text": f"{full_name} {chapter}:{verse} " + "word " * (verse * chapter),
+                })
+    return pd.DataFrame(rows)
+
+
+def sample_corpus(name="sample.csv", **kwargs):
+    return Corpus(name, sample_bible_data(**kwargs))
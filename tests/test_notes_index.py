@@ -0,0 +1,55 @@
+import unittest
+
+from notes_index import NotesIndex, tokenize
+
+
+class NotesIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = NotesIndex.from_notes({
+            (1, 1): "In the beginning: creation of light",
+            (1, 2): "The garden and the river",
+            (43, 1): "The Word was in the beginning",
+        })
+
+    def keys(self, query):
+        return [(book_number, chapter) for book_number, chapter, _ in self.index.search(query)]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("God's WORD, 'light'!"), ["god's", "word", "light"])
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(self.keys("beginning"), [(1, 1), (43, 1)])
+        self.assertEqual(self.keys("beginning word"), [(43, 1)])
+        self.assertEqual(self.keys("garden light"), [])
+        self.assertEqual(self.keys(""), [])
+
+    def test_last_word_is_a_prefix(self):
+        self.assertEqual(self.keys("the gar"), [(1, 2)])
+        self.assertEqual(self.keys("begin"), [(1, 1), (43, 1)])
+        self.assertEqual(self.keys("begin the"), [])  # Only the last word is a prefix
+        self.assertEqual(self.keys("beginning th"), [(1, 1), (43, 1)])
+
+    def test_update_replaces_a_note(self):
+        self.index.update(1, 2, "The flood")
+        self.assertEqual(self.keys("garden"), [])
+        self.assertEqual(self.keys("flood"), [(1, 2)])
+        self.assertNotIn("garden", self.index.vocabulary)
+        self.assertEqual(len(self.index), 3)
+
+    def test_remove_and_blank_notes(self):
+        self.index.remove(43, 1)
+        self.index.update(1, 1, "   ")
+        self.assertEqual(self.keys("beginning"), [])
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.index.vocabulary, sorted(self.index.postings))
+        self.index.remove(43, 1)  # Removing twice is harmless
+
+    def test_snippet(self):
+        text = "word " * 40 + "needle " + "word " * 40
+        snippet = NotesIndex.snippet(text, ["needle"], width=30)
+        self.assertIn("needle", snippet)
+        self.assertTrue(snippet.startswith("...") and snippet.endswith("..."))
+
+
+if __name__ == "__main__":
+    unittest.main()
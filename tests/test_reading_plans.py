@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import reading_plans
+from storage import Storage
+from tests.sample_corpus import sample_corpus
+
+
+class PartitionTest(unittest.TestCase):
+    def test_balances_the_heaviest_day(self):
+        starts = reading_plans.partition(list(range(6)), [5, 1, 1, 1, 1, 5], 3)
+        self.assertEqual(starts, [0, 1, 5, 6])
+
+    def test_more_days_than_units(self):
+        starts = reading_plans.partition(["a", "b"], [1, 1], 4)
+        self.assertEqual(starts[0], 0)
+        self.assertEqual(starts[-1], 2)
+        self.assertEqual(len(starts), 5)
+
+
+def day_verse_ids(plan, corpus, day):
+    """Verse IDs of a plan day, from its ranges."""
+    return [verse_id for first, last in plan.day_ranges(day) for verse_id in corpus.verse_ids if first <= verse_id <= last]
+
+
+class CompiledPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.corpus = sample_corpus()
+        reading_plans.PLANS["Test plan"] = ([[1, 2], [40, 43]], 3)
+
+    def tearDown(self):
+        del reading_plans.PLANS["Test plan"]
+
+    def test_covers_every_verse_once(self):
+        plan = reading_plans.compile_plan("Test plan", self.corpus)
+        self.assertEqual(plan.days, 3)
+        verse_ids = [verse_id for day in range(1, plan.days + 1) for verse_id in day_verse_ids(plan, self.corpus, day)]
+        self.assertEqual(sorted(verse_ids), self.corpus.verse_ids)
+        for day in range(1, plan.days + 1):
+            for verse_id in day_verse_ids(plan, self.corpus, day):
+                self.assertEqual(plan.day_of(verse_id), day)
+
+    def test_days_read_streams_side_by_side(self):
+        plan = reading_plans.compile_plan("Test plan", self.corpus)
+        first_day_books = {self.corpus.verse_locations[verse_id][0] for verse_id in day_verse_ids(plan, self.corpus, 1)}
+        self.assertEqual(first_day_books, {1, 40})
+
+    def test_days_end_on_chapter_boundaries(self):
+        plan = reading_plans.compile_plan("Test plan", self.corpus)
+        for day in range(1, plan.days + 1):
+            for first, last in plan.day_ranges(day):
+                self.assertEqual(self.corpus.verse_locations[first][2], 1)
+                self.assertEqual(self.corpus.verse_locations[last][2], 4)
+
+    def test_stored_plan_is_reused_until_its_source_changes(self):
+        directory = tempfile.mkdtemp()
+        storage = Storage(os.path.join(directory, "plans.db"))
+        try:
+            compiled = reading_plans.load_plan(storage, "Test plan", "sample", self.corpus)
+            storage.flush()
+            calls = []
+
+            def weight(verse_id):
+                calls.append(verse_id)
+                return 1.0
+
+            loaded = reading_plans.load_plan(storage, "Test plan", "sample", self.corpus, weight=weight)
+            self.assertEqual(calls, [])
+            self.assertEqual(loaded.ranges, compiled.ranges)
+            self.assertEqual(loaded.day_starts, compiled.day_starts)
+
+            reading_plans.load_plan(storage, "Test plan", "sample", self.corpus, "verses", weight)
+            self.assertTrue(calls)
+        finally:
+            storage.close()
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
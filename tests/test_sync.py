@@ -0,0 +1,95 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+import sync
+from storage import Storage
+
+
+class VerseIdEncodingTest(unittest.TestCase):
+    def test_round_trip(self):
+        for verse_ids in ([], [1001001], [1001001, 66022021], list(range(1001001, 1001200)) + [2 ** 40]):
+            self.assertEqual(sync.decode_verse_ids(sync.encode_verse_ids(verse_ids)), sorted(verse_ids))
+
+    def test_size_follows_the_number_of_verses(self):
+        self.assertLessEqual(len(sync.encode_verse_ids({1001001, 66022021})), 8)
+        self.assertEqual(len(sync.encode_verse_ids(range(1001001, 1001101))), 3 + 99)
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.laptop = Storage(os.path.join(self.directory, "laptop.db"))
+        self.desktop = Storage(os.path.join(self.directory, "desktop.db"))
+
+    def tearDown(self):
+        self.laptop.close()
+        self.desktop.close()
+        shutil.rmtree(self.directory)
+
+    def transfer(self, source, target, peer=sync.DEFAULT_PEER):
+        path = os.path.join(self.directory, "delta.bsync")
+        exported = sync.export_delta(source, path, peer)
+        return exported, sync.import_delta(target, path)
+
+    def test_round_trip(self):
+        self.laptop.add_read_verses("net", [1001001, 1001002, 66022021])
+        self.laptop.add_read_verses("kjv", [43003016])
+        self.laptop.save_note(1, 1, "In the beginning")
+        self.laptop.flush()
+
+        self.assertEqual(self.transfer(self.laptop, self.desktop), ((4, 1), (4, 1)))
+        self.assertEqual(self.desktop.load_read_verses("net"), [1001001, 1001002, 66022021])
+        self.assertEqual(self.desktop.load_read_verses("kjv"), [43003016])
+        self.assertEqual(self.desktop.load_notes(), {(1, 1): "In the beginning"})
+
+        # Only what changed since the previous export to the same peer
+        self.laptop.add_read_verses("net", [1001003])
+        self.laptop.flush()
+        self.assertEqual(self.transfer(self.laptop, self.desktop), ((1, 0), (1, 0)))
+
+    def test_imported_changes_are_not_echoed(self):
+        self.laptop.add_read_verses("net", [1001001])
+        self.laptop.save_note(1, 1, "Laptop")
+        self.laptop.flush()
+        self.transfer(self.laptop, self.desktop)
+        self.assertEqual(self.transfer(self.desktop, self.laptop), ((0, 0), (0, 0)))
+
+    def test_newest_note_wins(self):
+        self.laptop.save_note(1, 1, "Old")
+        self.laptop.flush()
+        self.transfer(self.laptop, self.desktop)
+        time.sleep(0.01)  # Stamps are in milliseconds
+        self.desktop.save_note(1, 1, "New")
+        self.desktop.flush()
+
+        self.transfer(self.desktop, self.laptop)
+        self.assertEqual(self.laptop.load_notes(), {(1, 1): "New"})
+        # Importing the older version again changes nothing
+        path = os.path.join(self.directory, "old.bsync")
+        sync.write_delta(path, "other", {}, [(1, 1, 0, "other", "Old")])
+        self.assertEqual(sync.import_delta(self.laptop, path), (0, 0))
+
+    def test_deleted_notes_stay_deleted(self):
+        self.laptop.save_note(2, 3, "Temporary")
+        self.laptop.flush()
+        self.transfer(self.laptop, self.desktop)
+        time.sleep(0.01)
+        self.laptop.delete_note(2, 3)
+        self.laptop.flush()
+
+        self.assertEqual(self.transfer(self.laptop, self.desktop), ((0, 1), (0, 1)))
+        self.assertEqual(self.desktop.load_notes(), {})
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.directory, "not_a_delta.bsync")
+        with open(path, "wb") as f:
+            f.write(b"hello")
+        with self.assertRaises(ValueError):
+            sync.import_delta(self.desktop, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from translations import TranslationManager
+from tests.sample_corpus import sample_bible_data
+
+
+class TranslationManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        sample_bible_data().to_csv(os.path.join(self.directory, "sample.csv"), index=False)
+        with open(os.path.join(self.directory, "notes.csv"), "w") as f:
+            f.write("Book Number,Chapter,Notes\n1,1,hello\n")
+        self.translations = TranslationManager(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_discover_only_lists_translations(self):
+        self.assertEqual(self.translations.discover(), ["sample.csv"])
+
+    def test_corpus_lookups(self):
+        corpus = self.translations.get("sample.csv")
+        self.assertIs(self.translations.get("sample.csv"), corpus)
+        self.assertEqual(len(corpus.verse_ids), 4 * 3 * 4)
+        self.assertEqual(corpus.full_book_name(43), "John")
+        self.assertEqual(corpus.book_to_number["Exo"], 2)
+        self.assertEqual(corpus.chapters[(1, 2)], [1002001, 1002002, 1002003, 1002004])
+        self.assertEqual(corpus.verse_locations[40003002], (40, 3, 2))
+        self.assertEqual(corpus.book_chapters[2], [1, 2, 3])
+
+    def test_chapter_text(self):
+        corpus = self.translations.get("sample.csv")
+        chapter_text = corpus.chapter_text(1, 2)
+        self.assertIs(corpus.chapter_text(1, 2), chapter_text)
+        self.assertEqual(chapter_text.verse_numbers, [1, 2, 3, 4])
+        self.assertTrue(chapter_text.text.startswith("Gen 2:1 Genesis 2:1"))
+        self.assertEqual(chapter_text.index_of(3), 2)
+        self.assertIsNone(corpus.chapter_text(1, 99))
+
+    def test_reload_reports_changed_chapters(self):
+        corpus = self.translations.get("sample.csv")
+        kept = corpus.chapter_text(1, 1)
+        corpus.chapter_text(2, 1)
+        data = sample_bible_data()
+        data.loc[data["Verse ID"] == 2001003, "Text"] = "Changed"
+        data.to_csv(os.path.join(self.directory, "sample.csv"), index=False)
+
+        reloaded, changed = self.translations.reload("sample.csv")
+        self.assertEqual(changed, {(2, 1)})
+        self.assertIs(reloaded.chapter_text(1, 1), kept)
+        self.assertIn("Changed", reloaded.chapter_text(2, 1).text)
+
+    def test_memory_budget_keeps_the_newest(self):
+        sample_bible_data().to_csv(os.path.join(self.directory, "other.csv"), index=False)
+        translations = TranslationManager(self.directory, memory_budget_mb=0)
+        first = translations.get("sample.csv")
+        translations.get("other.csv")
+        self.assertIsNot(translations.get("sample.csv"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import random
+import unittest
+
+from unread_index import UnreadIndex, WORD_BITS
+
+
+def brute_force_next_unread(verse_ids, read, after_verse_id):
+    for verse_id in verse_ids:
+        if verse_id not in read and (after_verse_id is None or verse_id > after_verse_id):
+            return verse_id
+    return None
+
+
+class UnreadIndexTest(unittest.TestCase):
+    def test_empty(self):
+        index = UnreadIndex([])
+        self.assertIsNone(index.next_unread())
+        self.assertEqual(index.unread_count, 0)
+
+    def test_all_read(self):
+        verse_ids = list(range(1, 200))
+        index = UnreadIndex(verse_ids, verse_ids)
+        self.assertIsNone(index.next_unread())
+        self.assertEqual(index.unread_count, 0)
+
+    def test_unknown_verses_are_ignored(self):
+        index = UnreadIndex([10, 20, 30], [15, 20])
+        self.assertFalse(index.is_unread(15))
+        self.assertEqual(index.unread_count, 2)
+        self.assertEqual(index.next_unread(10), 30)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(1234)
+        for size in (1, WORD_BITS - 1, WORD_BITS, WORD_BITS + 1, WORD_BITS * WORD_BITS + 7, 5000):
+            verse_ids = sorted(rng.sample(range(1, size * 3 + 10), size))
+            read = set(rng.sample(verse_ids, rng.randrange(size + 1)))
+            index = UnreadIndex(verse_ids, read)
+            for _ in range(300):
+                verse_id = rng.choice(verse_ids)
+                if rng.random() < 0.5:
+                    index.mark_read([verse_id])
+                    read.add(verse_id)
+                else:
+                    index.mark_unread([verse_id])
+                    read.discard(verse_id)
+                after = rng.choice([None, 0, verse_ids[-1], rng.randrange(size * 3 + 10)])
+                self.assertEqual(index.next_unread(after), brute_force_next_unread(verse_ids, read, after))
+                self.assertEqual(index.is_unread(verse_id), verse_id not in read)
+            self.assertEqual(index.unread_count, len(verse_ids) - len(read))
+
+    def test_long_read_stretches(self):
+        # Whole words and summary words of read verses are skipped
+        verse_ids = list(range(WORD_BITS * WORD_BITS * 3))
+        index = UnreadIndex(verse_ids, verse_ids[:-1])
+        self.assertEqual(index.next_unread(), verse_ids[-1])
+        index.mark_unread([5])
+        self.assertEqual(index.next_unread(), 5)
+        self.assertEqual(index.next_unread(5), verse_ids[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+# This module discovers the Bible translations available as CSV files and loads them on demand.
+# Parsed translations are kept in a least-recently-used cache bounded by a memory budget, so switching
+# back to a translation that was used recently doesn't parse its CSV again. Each translation also keeps
+# the display text of the chapters shown most recently, so redrawing a chapter doesn't format it again.
+
+import os
+import csv
+import glob
+import logging
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Columns every translation CSV must have (the same schema as net.csv)
+REQUIRED_COLUMNS = ("Verse ID", "Book Number", "Book Abbreviation", "Full Book Name", "Chapter", "Verse", "Text")
+
+DEFAULT_MEMORY_BUDGET_MB = 256
+CHAPTER_CACHE_SIZE = 32  # Chapter texts kept per translation
+
+
+class ChapterText:
+    """The display text of a chapter: one line per verse, each followed by a blank line."""
+
+    def __init__(self, text, verse_ids, verse_numbers):
+        self.text = text
+        self.verse_ids = verse_ids
+        self.verse_numbers = verse_numbers
+
+    @staticmethod
+    def line_of(index):
+        """Text widget line number (1-based) of the index-th verse of the chapter."""
+        return 2 * index + 1
+
+    def index_of(self, verse):
+        """Position of a verse number in the chapter, or None."""
+        try:
+            return self.verse_numbers.index(verse)
+        except ValueError:
+            return None
+
+
+class Corpus:
+    """A parsed translation and the book lookup tables built from it."""
+
+    def __init__(self, name, bible_data):
+        self.name = name
+        self.bible_data = bible_data
+        self.books_data = bible_data[["Book Abbreviation", "Full Book Name", "Book Number"]].drop_duplicates()
+        self.books_data = self.books_data.sort_values("Book Number")
+        self.book_to_number = dict(zip(self.books_data["Book Abbreviation"], self.books_data["Book Number"]))
+        self.number_to_book = dict(zip(self.books_data["Book Number"], self.books_data["Book Abbreviation"]))
+        self.book_abbrev_to_full = dict(zip(self.books_data["Book Abbreviation"], self.books_data["Full Book Name"]))
+        self.book_full_to_abbrev = dict(zip(self.books_data["Full Book Name"], self.books_data["Book Abbreviation"]))
+
+        # Verse IDs in reading order, where each one is, and its text
+        self.verse_ids = sorted(int(verse_id) for verse_id in bible_data["Verse ID"])
+        self.verse_locations = {
+            int(verse_id): (int(book_number), int(chapter), int(verse))
+            for verse_id, book_number, chapter, verse in zip(
+                bible_data["Verse ID"], bible_data["Book Number"], bible_data["Chapter"], bible_data["Verse"])
+        }
+        self.location_to_verse_id = {location: verse_id for verse_id, location in self.verse_locations.items()}
+        self.verse_texts = dict(zip((int(verse_id) for verse_id in bible_data["Verse ID"]), bible_data["Text"]))
+        self.chapters = {}  # (book_number, chapter) -> Verse IDs, in reading order
+        for verse_id in self.verse_ids:
+            self.chapters.setdefault(self.verse_locations[verse_id][:2], []).append(verse_id)
+
+        # Dropdown values, shared by the main window and every dialog
+        self.book_chapters = {}  # book_number -> chapter numbers
+        self.chapter_verses = {}  # (book_number, chapter) -> verse numbers
+        for (book_number, chapter), verse_ids in sorted(self.chapters.items()):
+            self.book_chapters.setdefault(book_number, []).append(chapter)
+            self.chapter_verses[(book_number, chapter)] = sorted(
+                self.verse_locations[verse_id][2] for verse_id in verse_ids)
+
+        self.memory_size = int(bible_data.memory_usage(deep=True).sum())
+        self._chapter_texts = OrderedDict()  # (book_number, chapter) -> ChapterText, least recently used first
+        self._chapter_lock = threading.Lock()
+
+    def full_book_name(self, book_number):
+        return self.book_abbrev_to_full[self.number_to_book[book_number]]
+
+    def chapter_text(self, book_number, chapter):
+        """The ChapterText of a chapter, built on first use and cached, or None if it doesn't exist."""
+        key = (int(book_number), int(chapter))
+        with self._chapter_lock:
+            chapter_text = self._chapter_texts.get(key)
+            if chapter_text is not None:
+                self._chapter_texts.move_to_end(key)
+                return chapter_text
+
+        verse_ids = self.chapters.get(key)
+        if not verse_ids:
+            return None
+        abbreviation = self.number_to_book[key[0]]
+        verse_numbers = [self.verse_locations[verse_id][2] for verse_id in verse_ids]
+        text = "".join(f"{abbreviation} {key[1]}:{verse} {self.verse_texts[verse_id]}\n\n"
+                       for verse_id, verse in zip(verse_ids, verse_numbers))
+        chapter_text = ChapterText(text, verse_ids, verse_numbers)
+
+        with self._chapter_lock:
+            self._chapter_texts[key] = chapter_text
+            while len(self._chapter_texts) > CHAPTER_CACHE_SIZE:
+                self._chapter_texts.popitem(last=False)
+        return chapter_text
+
+
+class TranslationManager:
+    def __init__(self, directory=".", memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.directory = directory
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._corpora = OrderedDict()  # File name -> Corpus, least recently used first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_translation_file(path):
+        """Check the CSV header without parsing the rest of the file."""
+        try:
+            with open(path, newline='', encoding="utf-8") as f:
+                header = next(csv.reader(f), [])
+        except (OSError, UnicodeDecodeError):
+            return False
+        return all(column in header for column in REQUIRED_COLUMNS)
+
+    def discover(self):
+        """Return the file names of all translation CSVs in the directory, sorted by name."""
+        paths = glob.glob(os.path.join(self.directory, "*.csv"))
+        return sorted(os.path.basename(path) for path in paths if self.is_translation_file(path))
+
+    def get(self, name):
+        """Return the Corpus for a translation file, parsing it on first use."""
+        with self._lock:
+            corpus = self._corpora.get(name)
+            if corpus is not None:
+                self._corpora.move_to_end(name)
+                return corpus
+
+        # Parse outside the lock so other translations stay available meanwhile
+        corpus = Corpus(name, pd.read_csv(os.path.join(self.directory, name)))
+        log.info("Loaded %s (%.1f MB)", name, corpus.memory_size / (1024 * 1024))
+
+        with self._lock:
+            self._corpora[name] = corpus
+            self._corpora.move_to_end(name)
+            self._evict()
+        return corpus
+
+    def reload(self, name):
+        """Parse a translation file again after it changed on disk.
+
+        Returns the new Corpus and the (book_number, chapter) keys whose verses changed. The display text of
+        unchanged chapters is carried over from the previous Corpus.
+        """
+        with self._lock:
+            old = self._corpora.get(name)
+        corpus = Corpus(name, pd.read_csv(os.path.join(self.directory, name)))
+        changed = set(corpus.chapters)
+        if old is not None:
+            changed = {key for key in old.chapters.keys() | corpus.chapters.keys()
+                       if [(verse_id, old.verse_texts.get(verse_id)) for verse_id in old.chapters.get(key, [])] !=
+                       [(verse_id, corpus.verse_texts.get(verse_id)) for verse_id in corpus.chapters.get(key, [])]}
+            with old._chapter_lock:
+                for key, chapter_text in old._chapter_texts.items():
+                    if key not in changed:
+                        corpus._chapter_texts[key] = chapter_text
+        log.info("Reloaded %s: %d chapters changed", name, len(changed))
+
+        with self._lock:
+            self._corpora[name] = corpus
+            self._corpora.move_to_end(name)
+            self._evict()
+        return corpus, changed
+
+    def forget(self, name):
+        """Drop a translation from the cache, so it is parsed again the next time it is used."""
+        with self._lock:
+            self._corpora.pop(name, None)
+
+    def _evict(self):
+        """Drop least recently used translations until the cache fits the budget, always keeping the newest."""
+        total = sum(corpus.memory_size for corpus in self._corpora.values())
+        while total > self.memory_budget and len(self._corpora) > 1:
+            name, corpus = self._corpora.popitem(last=False)
+            total -= corpus.memory_size
+            log.info("Evicted %s from the translation cache", name)
@@ -0,0 +1,76 @@
+# This module lets background threads update the Tk interface safely. Tk widgets may only be touched
+# from the thread running the main loop, so worker threads (reading, MP3 export, ...) hand callbacks to
+# a UIDispatcher instead. The dispatcher keeps them in a thread-safe queue that the main loop drains on
+# a short periodic after() timer.
+#
+# Calls made with a key are coalesced: while a call with that key is still waiting, newer calls replace
+# its function and arguments instead of queueing again. Redraws such as navigate() therefore run once per
+# drain no matter how often they were requested.
+
+import queue
+import logging
+import threading
+
+import instrumentation
+
+log = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MS = 15
+
+
+class UIDispatcher:
+    def __init__(self, widget, interval_ms=DEFAULT_INTERVAL_MS):
+        """widget is any Tk widget; its after() drives the draining."""
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._queue = queue.SimpleQueue()  # (key, func, args); func is None for keyed calls
+        self._keyed = {}  # key -> (func, args) of the waiting coalesced call
+        self._lock = threading.Lock()
+        self._job = None
+
+    def call(self, func, *args, key=None):
+        """Run func(*args) on the Tk thread. Calls sharing a key are coalesced into the latest one."""
+        if key is None:
+            self._queue.put((None, func, args))
+            return
+        with self._lock:
+            waiting = key in self._keyed
+            self._keyed[key] = (func, args)
+        if waiting:
+            instrumentation.count("ui.coalesced")
+        else:
+            self._queue.put((key, None, None))
+
+    def start(self):
+        """Start draining the queue from the Tk main loop."""
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Stop draining; callbacks still waiting are dropped."""
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def _tick(self):
+        self.drain()
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def drain(self):
+        """Run every callback queued so far and return how many ran. Must be called on the Tk thread."""
+        # Only what is already queued, so callbacks that queue more work can't starve the main loop
+        ran = 0
+        for _ in range(self._queue.qsize()):
+            try:
+                key, func, args = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if key is not None:
+                with self._lock:
+                    func, args = self._keyed.pop(key)
+            ran += 1
+            try:
+                func(*args)
+            except Exception as e:
+                log.exception("Error in UI callback %s: %s", getattr(func, "__name__", func), e)
+        return ran
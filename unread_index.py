@@ -0,0 +1,106 @@
+# This module tracks which verses of a translation are still unread using a two-level bitset.
+# Each verse gets one bit (set = unread) in 64-bit words, and a summary level keeps one bit per word
+# that still has an unread verse in it. Finding the next unread verse therefore scans at most a couple
+# of words, no matter how many verses (or whole books) in between have already been read.
+
+import bisect
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def _lowest_bit(bits):
+    """Return the index of the lowest set bit of a non-zero int."""
+    return (bits & -bits).bit_length() - 1
+
+
+class UnreadIndex:
+    def __init__(self, verse_ids, read_verses=()):
+        """verse_ids must be the translation's Verse IDs in ascending (reading) order."""
+        self.verse_ids = list(verse_ids)
+        self.positions = {verse_id: position for position, verse_id in enumerate(self.verse_ids)}
+
+        word_count = (len(self.verse_ids) + WORD_BITS - 1) // WORD_BITS
+        self.words = [WORD_MASK] * word_count
+        if len(self.verse_ids) % WORD_BITS and word_count:
+            self.words[-1] = (1 << (len(self.verse_ids) % WORD_BITS)) - 1
+
+        summary_count = (word_count + WORD_BITS - 1) // WORD_BITS
+        self.summary = [WORD_MASK] * summary_count
+        if word_count % WORD_BITS and summary_count:
+            self.summary[-1] = (1 << (word_count % WORD_BITS)) - 1
+
+        self.unread_count = len(self.verse_ids)
+        self.mark_read(read_verses)
+
+    def _clear(self, position):
+        word = position // WORD_BITS
+        bit = 1 << (position % WORD_BITS)
+        if self.words[word] & bit:
+            self.words[word] &= ~bit
+            self.unread_count -= 1
+            if not self.words[word]:
+                self.summary[word // WORD_BITS] &= ~(1 << (word % WORD_BITS))
+
+    def _set(self, position):
+        word = position // WORD_BITS
+        bit = 1 << (position % WORD_BITS)
+        if not self.words[word] & bit:
+            self.words[word] |= bit
+            self.unread_count += 1
+            self.summary[word // WORD_BITS] |= 1 << (word % WORD_BITS)
+
+    def mark_read(self, verse_ids):
+        for verse_id in verse_ids:
+            position = self.positions.get(verse_id)
+            if position is not None:
+                self._clear(position)
+
+    def mark_unread(self, verse_ids):
+        for verse_id in verse_ids:
+            position = self.positions.get(verse_id)
+            if position is not None:
+                self._set(position)
+
+    def is_unread(self, verse_id):
+        position = self.positions.get(verse_id)
+        if position is None:
+            return False
+        return bool(self.words[position // WORD_BITS] >> (position % WORD_BITS) & 1)
+
+    def _next_position(self, position):
+        """Return the first unread position >= position, or None."""
+        if position >= len(self.verse_ids):
+            return None
+
+        # Rest of the current word
+        word = position // WORD_BITS
+        bits = self.words[word] >> (position % WORD_BITS)
+        if bits:
+            return position + _lowest_bit(bits)
+
+        # Next non-empty word from the summary level
+        word += 1
+        summary_word = word // WORD_BITS
+        if summary_word >= len(self.summary):
+            return None
+        bits = self.summary[summary_word] >> (word % WORD_BITS)
+        if bits:
+            word += _lowest_bit(bits)
+        else:
+            for summary_word in range(summary_word + 1, len(self.summary)):
+                if self.summary[summary_word]:
+                    word = summary_word * WORD_BITS + _lowest_bit(self.summary[summary_word])
+                    break
+            else:
+                return None
+        return word * WORD_BITS + _lowest_bit(self.words[word])
+
+    def next_unread(self, after_verse_id=None):
+        """Return the first unread Verse ID after after_verse_id (or from the start), or None."""
+        if after_verse_id is None:
+            start = 0
+        else:
+            start = bisect.bisect_right(self.verse_ids, after_verse_id)
+        position = self._next_position(start)
+        return None if position is None else self.verse_ids[position]